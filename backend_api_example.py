@@ -3,10 +3,29 @@
 用于接收Lambda发送的职位数据并存储到MongoDB的jobsprofiles表
 """
 
-from flask import Flask, request, jsonify
-from pymongo import MongoClient
-from datetime import datetime
+from flask import Flask, Response, request, jsonify, stream_with_context
+from pymongo import DeleteMany, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from bson import Binary, ObjectId
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+import functools
+import atexit
+import base64
+import csv
+import gzip
+import hashlib
+import io
+import json
 import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
 import logging
 
 # 配置日志
@@ -19,18 +38,428 @@ app = Flask(__name__)
 MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
 DB_NAME = os.environ.get('DB_NAME', 'jobscraper')
 COLLECTION_NAME = os.environ.get('COLLECTION_NAME', 'jobsprofiles')
+# 每次bulk_write的操作数量
+UPSERT_BATCH_SIZE = int(os.environ.get('UPSERT_BATCH_SIZE', '1000'))
+# NDJSON流式接收：每次从请求流读取的字节数，以及单行的最大长度（防止异常数据占满内存）
+STREAM_READ_SIZE = 64 * 1024
+MAX_NDJSON_LINE_BYTES = int(os.environ.get('MAX_NDJSON_LINE_BYTES', str(8 * 1024 * 1024)))
+# 筛选参数 -> 原始字段及其规范化键、词数组字段
+SEARCH_KEY_FIELDS = {
+    'company': {'source': 'company_name', 'key': 'company_key', 'tokens': 'company_tokens'},
+    'location': {'source': 'location', 'key': 'location_key', 'tokens': 'location_tokens'},
+}
+MATCH_MODES = ('substring', 'exact', 'prefix', 'token')
+# 未指定 match 时与之前的接口一致，按不区分大小写的子串筛选
+DEFAULT_MATCH_MODE = 'substring'
+# 全文搜索的字段权重、可返回的字段和默认返回的字段
+SEARCH_TEXT_WEIGHTS = {'job_title': 10, 'company_name': 5, 'team': 3, 'department': 3, 'requirements': 2, 'description': 1}
+SEARCH_FIELDS = ('job_id', 'job_title', 'company_name', 'company_path', 'location', 'department', 'team',
+                 'description', 'requirements', 'benefits', 'job_url', 'city', 'scraped_at')
+SEARCH_DEFAULT_FIELDS = ('job_id', 'job_title', 'company_name', 'location', 'job_url', 'scraped_at')
+# 排序后最多可翻页到的结果数量
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', '1000'))
+# 导出：游标每批读取的记录数，以及每次向客户端输出的数据块大小
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '2000'))
+EXPORT_CHUNK_BYTES = 256 * 1024
+# 统计文档的ID，以及按公司/地点计数的字段
+STATS_DOC_ID = 'global'
+STATS_COUNTER_FIELDS = {'company_name': 'companies', 'location': 'locations'}
+# 精确总数（include_total=true）的缓存时间
+COUNT_CACHE_TTL = int(os.environ.get('COUNT_CACHE_TTL', '60'))
+# GET接口的响应缓存：进程内LRU+TTL，可选MongoDB共享缓存；接收职位后代数（generation）加一，旧缓存随即失效
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE', 'true').lower() == 'true'
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', '300'))
+RESPONSE_CACHE_MAX_MB = int(os.environ.get('RESPONSE_CACHE_MAX_MB', '64'))
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'local')
+# 其他worker进程的接收通过数据库中的代数感知，最多每隔这么多秒读取一次
+CACHE_GENERATION_CHECK_S = float(os.environ.get('CACHE_GENERATION_CHECK_S', '1'))
+# 异步接收：INGEST_MODE=async 时POST只校验并入队，由后台写入线程合并写入（group commit）
+INGEST_MODE = os.environ.get('INGEST_MODE', 'sync')
+INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', '1000'))
+INGEST_WRITERS = int(os.environ.get('INGEST_WRITERS', '2'))
+GROUP_COMMIT_MAX_JOBS = int(os.environ.get('GROUP_COMMIT_MAX_JOBS', '5000'))
+GROUP_COMMIT_WAIT_MS = int(os.environ.get('GROUP_COMMIT_WAIT_MS', '20'))
+# 队列只在进程内存中，进程崩溃后批次会一直停留在 queued；超过该时间的 queued 批次在重试时视为过期并重新处理
+INGEST_QUEUED_TIMEOUT_S = int(os.environ.get('INGEST_QUEUED_TIMEOUT_S', '600'))
+
+def ensure_index(keys, description, **kwargs):
+    """
+    创建单个索引，失败时记录是哪个索引失败，不影响其他索引
+    """
+    try:
+        collection.create_index(keys, **kwargs)
+        return True
+    except Exception as e:
+        logger.warning(f"创建{description}失败: {str(e)}")
+        return False
+
+def ensure_indexes():
+    """
+    创建职位集合的索引（每个索引单独创建）
+    """
+    # job_id 唯一索引，保证同一职位重复接收时只更新不新增
+    if not ensure_index('job_id', 'job_id唯一索引', unique=True):
+        logger.warning("已有记录中存在旧格式的重复job_id，请运行 python backend_api_example.py migrate-job-ids")
+    # 分页按 (scraped_at, _id) 倒序；不同BSON类型的 scraped_at 分属不同的排序分组，游标分页要求统一为字符串
+    if collection.find_one({'scraped_at': {'$exists': True, '$not': {'$type': 'string'}}}, {'_id': 1}):
+        logger.warning("已有记录的scraped_at不是ISO字符串，请运行 python backend_api_example.py migrate-scraped-at")
+    ensure_index([('scraped_at', -1), ('_id', -1)], '分页索引 (scraped_at, _id)')
+    # 全文搜索：带权重的文本索引（每个集合只能有一个文本索引）
+    ensure_index(
+        [(field, 'text') for field in SEARCH_TEXT_WEIGHTS],
+        '全文搜索索引',
+        weights=SEARCH_TEXT_WEIGHTS,
+        default_language='english',
+        language_override='text_language',
+        name='job_text_search'
+    )
+    # 公司/地点筛选使用规范化的小写键和词数组，与分页排序组成复合索引
+    for field in SEARCH_KEY_FIELDS.values():
+        ensure_index([(field['key'], 1), ('scraped_at', -1), ('_id', -1)], f"筛选索引 {field['key']}")
+        ensure_index([(field['tokens'], 1), ('scraped_at', -1), ('_id', -1)], f"筛选索引 {field['tokens']}")
 
 # 初始化MongoDB连接
 try:
     client = MongoClient(MONGO_URI)
     db = client[DB_NAME]
     collection = db[COLLECTION_NAME]
+    # 已处理请求的幂等键，重复投递时直接返回第一次的结果；记录保留一天
+    ingest_requests = db['ingest_requests']
+    ingest_requests.create_index('created_at', expireAfterSeconds=86400)
+    # 异步接收的批次状态，保留一天
+    ingest_batches = db['ingest_batches']
+    ingest_batches.create_index('created_at', expireAfterSeconds=86400)
+    # 物化的统计文档，接收职位时增量更新
+    job_stats = db['job_stats']
+    response_cache_store = db['response_cache']
+    if RESPONSE_CACHE_BACKEND == 'mongo':
+        response_cache_store.create_index('expires_at', expireAfterSeconds=0)
     logger.info(f"成功连接到MongoDB: {DB_NAME}.{COLLECTION_NAME}")
+    ensure_indexes()
 except Exception as e:
     logger.error(f"MongoDB连接失败: {str(e)}")
     client = None
     db = None
     collection = None
+    ingest_requests = None
+    ingest_batches = None
+    job_stats = None
+    response_cache_store = None
+
+def stable_job_id(job):
+    """
+    根据职位URL中的Lever职位ID生成稳定的job_id，同一职位每次接收得到相同的ID
+    """
+    job_url = job.get('job_url') or ''
+    segments = [segment for segment in urlparse(job_url).path.split('/') if segment]
+    if segments and segments[-1] == 'apply':
+        segments = segments[:-1]
+    if segments:
+        company = job.get('company_path') or (segments[0] if len(segments) > 1 else 'unknown')
+        return f"lever_{company}_{segments[-1]}"
+    
+    # 没有URL时退回到公司、职位和地点的哈希
+    fingerprint = '|'.join(str(job.get(field, '')) for field in ('company_path', 'company_name', 'job_title', 'location'))
+    return f"lever_{hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]}"
+
+def normalize_scraped_at(value, default=None):
+    """
+    将 scraped_at 统一为ISO格式字符串（时间戳和datetime都转换），分页按同一类型排序
+    """
+    if isinstance(value, str) and value:
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value).isoformat()
+    return default or datetime.now().isoformat()
+
+def upsert_jobs(transformed_jobs):
+    """
+    按job_id批量upsert（无序bulk_write），返回 matched/upserted/modified 数量
+    """
+    counts = {'matched_count': 0, 'upserted_count': 0, 'modified_count': 0}
+    for start in range(0, len(transformed_jobs), UPSERT_BATCH_SIZE):
+        batch = transformed_jobs[start:start + UPSERT_BATCH_SIZE]
+        operations = [
+            UpdateOne(
+                {'job_id': job['job_id']},
+                {'$set': job, '$setOnInsert': {'first_seen_at': job['processed_at']}},
+                upsert=True
+            )
+            for job in batch
+        ]
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # 无序写入时其余操作仍会执行；客户端按幂等键重试整个请求即可
+            logger.error(f"批量写入部分失败: {len(e.details.get('writeErrors', []))} 个错误，"
+                         f"新增 {e.details.get('nUpserted', 0)}，更新 {e.details.get('nModified', 0)}")
+            raise
+        counts['matched_count'] += result.matched_count
+        counts['upserted_count'] += result.upserted_count
+        counts['modified_count'] += result.modified_count
+        record_stats(batch, result.upserted_ids)
+    return counts
+
+def stats_field_key(value):
+    """
+    公司/地点名称转换为统计文档中的字段名（'.' 和开头的 '$' 在字段路径中有特殊含义，替换为全角字符）
+    """
+    key = value.replace('.', '\uff0e')
+    return '\uff04' + key[1:] if key.startswith('$') else key
+
+def stats_display_key(key):
+    """
+    stats_field_key 的逆转换
+    """
+    key = key.replace('\uff0e', '.')
+    return '$' + key[1:] if key.startswith('\uff04') else key
+
+def record_stats(batch, upserted_ids):
+    """
+    按本批新增的记录用 $inc 更新统计文档，最新抓取时间用 $max
+    upserted_ids 为 bulk_write 结果中 {操作序号: _id}
+    """
+    # generation 为响应缓存的代数，每次写入都加一使GET接口的缓存失效
+    inc = {'total_jobs': len(upserted_ids), 'generation': 1}
+    for index in upserted_ids:
+        for source, prefix in STATS_COUNTER_FIELDS.items():
+            value = batch[index].get(source)
+            if value:
+                path = f"{prefix}.{stats_field_key(value)}"
+                inc[path] = inc.get(path, 0) + 1
+    update = {'$inc': inc, '$set': {'updated_at': datetime.now().isoformat()}}
+    scraped = [job['scraped_at'] for job in batch if isinstance(job.get('scraped_at'), str)]
+    if scraped:
+        update['$max'] = {'latest_scrape': max(scraped)}
+    try:
+        job_stats.update_one({'_id': STATS_DOC_ID}, update, upsert=True)
+    except Exception as e:
+        # 统计更新失败不影响职位写入，可通过 rebuild-stats 修复
+        logger.error(f"更新统计文档失败: {str(e)}")
+    invalidate_generation()
+
+def rebuild_stats():
+    """
+    全量重新计算统计文档（用于修复或首次启用）
+    """
+    stats = {'_id': STATS_DOC_ID, 'total_jobs': collection.count_documents({})}
+    for source, prefix in STATS_COUNTER_FIELDS.items():
+        stats[prefix] = {
+            stats_field_key(row['_id']): row['count']
+            for row in collection.aggregate([{'$group': {'_id': f'${source}', 'count': {'$sum': 1}}}])
+            if row['_id']
+        }
+    latest_job = collection.find_one({}, sort=[('scraped_at', -1)])
+    if latest_job and latest_job.get('scraped_at'):
+        stats['latest_scrape'] = latest_job['scraped_at']
+    stats['updated_at'] = datetime.now().isoformat()
+    # built 标记文档由全量计算得到；只由 $inc 插入的文档缺少该字段，不能直接使用
+    stats['built'] = True
+    previous = job_stats.find_one({'_id': STATS_DOC_ID}, {'generation': 1}) or {}
+    stats['generation'] = previous.get('generation', 0) + 1
+    job_stats.replace_one({'_id': STATS_DOC_ID}, stats, upsert=True)
+    invalidate_generation()
+    return stats
+
+def top_counts(counters, limit=10):
+    return [{'_id': stats_display_key(name), 'count': count}
+            for name, count in sorted(counters.items(), key=lambda item: item[1], reverse=True)[:limit]]
+
+class ResponseCache:
+    """
+    GET响应缓存：进程内LRU（按条目大小限制总内存）+ TTL，可选MongoDB作为多个worker共享的二级缓存
+    条目记录写入时的代数，代数变化后视为失效
+    """
+    
+    def __init__(self, max_bytes, ttl, shared_store=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared_store = shared_store
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'not_modified': 0, 'evictions': 0, 'stale': 0}
+    
+    def get(self, key, generation):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry['generation'] == generation and entry['expires_at'] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return entry
+                self._remove(key)
+                self.stats['stale'] += 1
+        
+        if self.shared_store is not None:
+            doc = self.shared_store.find_one({'_id': key, 'generation': generation, 'expires_at': {'$gt': datetime.now()}})
+            if doc is not None:
+                remaining = (doc['expires_at'] - datetime.now()).total_seconds()
+                entry = self._put(key, generation, bytes(doc['body']), doc['mimetype'], doc['etag'], remaining)
+                with self.lock:
+                    self.stats['shared_hits'] += 1
+                return entry
+        
+        with self.lock:
+            self.stats['misses'] += 1
+        return None
+    
+    def set(self, key, generation, body, mimetype):
+        etag = hashlib.sha1(body).hexdigest()
+        entry = self._put(key, generation, body, mimetype, etag, self.ttl)
+        if self.shared_store is not None:
+            try:
+                self.shared_store.replace_one({'_id': key}, {
+                    '_id': key, 'generation': generation, 'body': Binary(body), 'mimetype': mimetype,
+                    'etag': etag, 'expires_at': datetime.now() + timedelta(seconds=self.ttl)
+                }, upsert=True)
+            except Exception as e:
+                logger.warning(f"写入共享响应缓存失败: {str(e)}")
+        return entry
+    
+    def _put(self, key, generation, body, mimetype, etag, ttl):
+        entry = {'generation': generation, 'body': body, 'mimetype': mimetype, 'etag': etag,
+                 'expires_at': time.monotonic() + ttl}
+        if len(body) > self.max_bytes:
+            return entry
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = entry
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.stats['evictions'] += 1
+        return entry
+    
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry['body'])
+    
+    def record_not_modified(self):
+        with self.lock:
+            self.stats['not_modified'] += 1
+    
+    def get_metrics(self):
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['shared_hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': round((self.stats['hits'] + self.stats['shared_hits']) / lookups, 4) if lookups else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'backend': 'mongo' if self.shared_store is not None else 'local'
+            }
+
+response_cache = ResponseCache(
+    RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+    RESPONSE_CACHE_TTL,
+    response_cache_store if RESPONSE_CACHE_BACKEND == 'mongo' else None
+) if RESPONSE_CACHE_ENABLED else None
+
+_generation = {'value': None, 'checked_at': 0.0}
+
+def current_generation():
+    """
+    当前数据代数，最多每 CACHE_GENERATION_CHECK_S 秒从统计文档读取一次
+    """
+    if time.monotonic() - _generation['checked_at'] > CACHE_GENERATION_CHECK_S:
+        doc = job_stats.find_one({'_id': STATS_DOC_ID}, {'generation': 1}) or {}
+        _generation['value'] = doc.get('generation', 0)
+        _generation['checked_at'] = time.monotonic()
+    return _generation['value']
+
+def invalidate_generation():
+    """
+    本进程写入后立即重新读取代数
+    """
+    _generation['checked_at'] = 0.0
+
+def response_cache_key():
+    """
+    缓存键：路径 + 规范化的查询参数（忽略空值，参数名排序）
+    """
+    params = sorted((name, value.strip()) for name, value in request.args.items(multi=True) if value.strip())
+    return request.path + '?' + '&'.join(f'{name}={value}' for name, value in params)
+
+def cached_response(view):
+    """
+    GET接口响应缓存装饰器：命中时不访问数据库；带ETag，客户端携带 If-None-Match 时返回304
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if response_cache is None or job_stats is None:
+            return view(*args, **kwargs)
+        
+        key = response_cache_key()
+        generation = current_generation()
+        entry = response_cache.get(key, generation)
+        cache_status = 'HIT'
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = response_cache.set(key, generation, response.get_data(), response.mimetype)
+            cache_status = 'MISS'
+        
+        if request.if_none_match.contains(entry['etag']):
+            response_cache.record_not_modified()
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(entry['body'], status=200, mimetype=entry['mimetype'])
+        response.set_etag(entry['etag'])
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Cache'] = cache_status
+        return response
+    return wrapper
+
+def normalize_key(value):
+    """
+    规范化搜索键：小写并合并空白
+    """
+    return ' '.join(str(value or '').lower().split())
+
+def tokenize(value):
+    """
+    拆分为小写词（字母和数字），去重并保持顺序
+    """
+    return list(dict.fromkeys(re.findall(r'[^\W_]+', str(value or '').lower())))
+
+def add_search_keys(job):
+    """
+    为公司和地点添加规范化键和词数组，筛选时可以使用索引
+    """
+    for field in SEARCH_KEY_FIELDS.values():
+        job[field['key']] = normalize_key(job.get(field['source']))
+        job[field['tokens']] = tokenize(job.get(field['source']))
+    return job
+
+def build_filter_query(filters, match=DEFAULT_MATCH_MODE):
+    """
+    构建公司/地点筛选条件
+    substring: 规范化后包含查询串（默认，不区分大小写的子串，扫描规范化键索引）；exact: 规范化后完全相等；
+    prefix: 规范化后的前缀（锚定的区分大小写正则，可以使用索引范围扫描）；token: 包含所有查询词（多键索引）
+    """
+    query = {}
+    for name, value in filters.items():
+        if not value:
+            continue
+        field = SEARCH_KEY_FIELDS[name]
+        if match == 'exact':
+            query[field['key']] = normalize_key(value)
+        elif match == 'prefix':
+            query[field['key']] = {'$regex': '^' + re.escape(normalize_key(value))}
+        elif match == 'substring':
+            query[field['key']] = {'$regex': re.escape(normalize_key(value))}
+        else:
+            tokens = tokenize(value)
+            if tokens:
+                query[field['tokens']] = {'$all': tokens}
+    return query
 
 def transform_job_data(job_data):
     """
@@ -39,8 +468,8 @@ def transform_job_data(job_data):
     transformed_jobs = []
     
     for job in job_data:
-        # 生成唯一ID
-        job_id = f"{job.get('company_name', 'unknown')}_{job.get('job_title', 'unknown')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # 生成唯一ID（同一职位保持不变）
+        job_id = stable_job_id(job)
         
         # 转换数据格式
         transformed_job = {
@@ -56,7 +485,7 @@ def transform_job_data(job_data):
             'benefits': job.get('benefits', ''),
             'job_url': job.get('job_url', ''),
             'source': 'lever',
-            'scraped_at': job.get('scraped_at', datetime.now().isoformat()),
+            'scraped_at': normalize_scraped_at(job.get('scraped_at')),
             'processed_at': datetime.now().isoformat(),
             'country': 'Australia',
             'status': 'active'
@@ -69,10 +498,176 @@ def transform_job_data(job_data):
                 transformed_job['city'] = next(city for city in ['sydney', 'melbourne', 'brisbane', 'perth', 'adelaide'] 
                                             if city in location_lower)
         
+        add_search_keys(transformed_job)
         transformed_jobs.append(transformed_job)
     
     return transformed_jobs
 
+class IngestWriterPool:
+    """
+    异步接收的后台写入线程池
+    每个写入线程取出一个批次后，在 GROUP_COMMIT_WAIT_MS 内继续合并队列中的其他批次（最多 GROUP_COMMIT_MAX_JOBS 条职位），
+    合并后只做一次bulk写入，再批量更新各批次的状态
+    """
+    
+    def __init__(self, writers=INGEST_WRITERS, queue_size=INGEST_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writers = writers
+        self.pid = os.getpid()
+        self.threads = []
+        for i in range(writers):
+            thread = threading.Thread(target=self._run, name=f'ingest-writer-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def submit(self, batch_id, jobs):
+        """入队已转换的职位，队列已满时抛出 queue.Full"""
+        self.queue.put_nowait((batch_id, jobs))
+    
+    def _collect_group(self):
+        group = [self.queue.get()]
+        size = len(group[0][1])
+        deadline = time.monotonic() + GROUP_COMMIT_WAIT_MS / 1000
+        while size < GROUP_COMMIT_MAX_JOBS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            group.append(item)
+            size += len(item[1])
+        return group
+    
+    def _run(self):
+        while True:
+            group = self._collect_group()
+            try:
+                results = self._write(group)
+            finally:
+                for _ in group:
+                    self.queue.task_done()
+            for batch_ids, update in results:
+                try:
+                    ingest_batches.update_many({'_id': {'$in': batch_ids}}, {'$set': update})
+                except Exception as e:
+                    logger.error(f"更新批次状态失败: {str(e)}")
+    
+    def _write(self, group):
+        """
+        合并写入一组批次，返回 [(批次ID列表, 状态更新)]
+        合并写入失败时逐批重写（按job_id upsert，重复写入无副作用），只有出错的批次被标记为失败
+        """
+        started = time.monotonic()
+        batch_ids = [batch_id for batch_id, _ in group]
+        jobs = [job for _, batch_jobs in group for job in batch_jobs]
+        try:
+            counts = upsert_jobs(jobs)
+        except Exception as e:
+            if len(group) > 1:
+                logger.warning(f"合并写入 {len(group)} 个批次失败，改为逐批写入: {str(e)}")
+                return [result for item in group for result in self._write([item])]
+            logger.error(f"异步写入批次 {batch_ids[0]} 失败: {str(e)}")
+            return [(batch_ids, {'status': 'failed', 'error': str(e), 'finished_at': datetime.now()})]
+        
+        logger.info(f"合并写入 {len(group)} 个批次、{len(jobs)} 条记录，新增 {counts['upserted_count']}")
+        return [(batch_ids, {
+            'status': 'done',
+            'group': {'batches': len(group), 'jobs': len(jobs), **counts},
+            'write_ms': round((time.monotonic() - started) * 1000, 1),
+            'finished_at': datetime.now()
+        })]
+    
+    def drain(self, timeout=30):
+        """等待队列中的批次写完（进程退出时调用）"""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+_writer_pool = None
+_writer_pool_lock = threading.Lock()
+
+def get_writer_pool():
+    """
+    按需创建写入线程池；gunicorn在fork后每个worker进程各自创建
+    """
+    global _writer_pool
+    with _writer_pool_lock:
+        if _writer_pool is None or _writer_pool.pid != os.getpid():
+            _writer_pool = IngestWriterPool()
+            atexit.register(_writer_pool.drain)
+        return _writer_pool
+
+def enqueue_jobs(transformed_jobs, idempotency_key=None):
+    """
+    异步接收：登记批次并入队已转换的职位，返回 (响应, 状态码)
+    幂等键记录批次ID，重复投递时按批次的当前状态应答（见 replay_response）
+    """
+    batch_id = uuid.uuid4().hex
+    ingest_batches.insert_one({
+        '_id': batch_id,
+        'status': 'queued',
+        'received_count': len(transformed_jobs),
+        'created_at': datetime.now()
+    })
+    try:
+        get_writer_pool().submit(batch_id, transformed_jobs)
+    except queue.Full:
+        ingest_batches.update_one({'_id': batch_id}, {'$set': {'status': 'rejected', 'finished_at': datetime.now()}})
+        response = jsonify({'error': '写入队列已满，请稍后重试'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    response = {
+        'success': True,
+        'message': f'已接收 {len(transformed_jobs)} 条记录，等待写入',
+        'batch_id': batch_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/batches/{batch_id}'
+    }
+    if idempotency_key:
+        ingest_requests.update_one(
+            {'_id': idempotency_key},
+            {'$setOnInsert': {'response': response, 'batch_id': batch_id, 'created_at': datetime.now()}},
+            upsert=True
+        )
+    return jsonify(response), 202
+
+def replay_response(idempotency_key):
+    """
+    重复投递（客户端重试）时返回第一次处理的结果，返回 None 表示需要重新处理
+    异步接收的请求按批次当前状态应答：已写入返回200，仍在队列中返回202；
+    批次写入失败或已过期时删除幂等记录，让这次重试重新入队，数据不会因重试被吞掉。
+    queued 超过 INGEST_QUEUED_TIMEOUT_S 的批次（如进程崩溃时还在内存队列中）标记为 expired 后重新处理；
+    按job_id upsert，原写入线程若仍在运行，重复写入也没有副作用
+    """
+    previous = ingest_requests.find_one({'_id': idempotency_key})
+    if not previous:
+        return None
+    
+    batch_id = previous.get('batch_id')
+    if batch_id is None:
+        logger.info(f"重复的请求 {idempotency_key}，跳过写入")
+        return jsonify({**previous['response'], 'duplicate': True}), 200
+    
+    batch = ingest_batches.find_one({'_id': batch_id}, {'status': 1, 'created_at': 1})
+    status = batch['status'] if batch else None
+    if status == 'queued' and batch['created_at'] < datetime.now() - timedelta(seconds=INGEST_QUEUED_TIMEOUT_S):
+        expired = ingest_batches.update_one(
+            {'_id': batch_id, 'status': 'queued'},
+            {'$set': {'status': 'expired', 'finished_at': datetime.now()}}
+        )
+        # 写入线程恰好在此期间完成时按其结果应答
+        status = 'expired' if expired.modified_count else ingest_batches.find_one({'_id': batch_id}, {'status': 1})['status']
+    if status in ('queued', 'done'):
+        logger.info(f"重复的请求 {idempotency_key}，批次 {batch_id} 状态 {status}，跳过写入")
+        return jsonify({**previous['response'], 'status': status, 'duplicate': True}), (200 if status == 'done' else 202)
+    
+    logger.warning(f"重复的请求 {idempotency_key} 对应的批次 {batch_id} 状态为 {status}，重新处理")
+    ingest_requests.delete_one({'_id': idempotency_key, 'batch_id': batch_id})
+    return None
+
 @app.route('/api/jobs', methods=['POST'])
 def receive_jobs():
     """
@@ -83,7 +678,11 @@ def receive_jobs():
         if not request.is_json:
             return jsonify({'error': '请求必须是JSON格式'}), 400
         
-        data = request.get_json()
+        # Lambda以gzip压缩请求体（Content-Encoding: gzip）
+        body = request.get_data()
+        if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        data = json.loads(body)
         
         # 验证数据格式
         if 'table' not in data or 'data' not in data:
@@ -96,98 +695,486 @@ def receive_jobs():
         if not isinstance(job_data, list):
             return jsonify({'error': 'data字段必须是数组'}), 400
         
+        invalid_items = [index for index, job in enumerate(job_data) if not isinstance(job, dict)]
+        if invalid_items:
+            return jsonify({'error': 'data中的每一项都必须是对象', 'invalid_items': invalid_items[:20],
+                            'invalid_count': len(invalid_items)}), 400
+        
         logger.info(f"接收到 {len(job_data)} 条职位数据")
         
         # 检查MongoDB连接
-        if not collection:
+        if collection is None:
             return jsonify({'error': 'MongoDB连接失败'}), 500
         
-        # 转换数据
+        # 重复投递（客户端重试）时返回第一次处理的结果，不再重复写入
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            replay = replay_response(idempotency_key)
+            if replay:
+                return replay
+        
+        # 转换数据（异步模式也在入队前完成，格式错误的批次不会进入写入队列）
         transformed_jobs = transform_job_data(job_data)
         
-        # 存储到MongoDB
-        result = collection.insert_many(transformed_jobs)
+        # 异步模式：入队后立即返回202和批次ID
+        if INGEST_MODE == 'async':
+            return enqueue_jobs(transformed_jobs, idempotency_key)
         
-        logger.info(f"成功存储 {len(result.inserted_ids)} 条记录到MongoDB")
+        # 按job_id upsert到MongoDB，重复接收的职位只更新不新增
+        counts = upsert_jobs(transformed_jobs)
         
-        return jsonify({
+        logger.info(f"成功存储 {len(transformed_jobs)} 条记录到MongoDB: 新增 {counts['upserted_count']}，"
+                    f"已存在 {counts['matched_count']}，更新 {counts['modified_count']}")
+        
+        response = {
             'success': True,
-            'message': f'成功存储 {len(result.inserted_ids)} 条记录',
-            'inserted_count': len(result.inserted_ids),
+            'message': f"成功存储 {len(transformed_jobs)} 条记录（新增 {counts['upserted_count']}）",
+            'inserted_count': counts['upserted_count'],
+            **counts,
             'collection': COLLECTION_NAME
-        }), 200
+        }
+        if idempotency_key:
+            ingest_requests.update_one(
+                {'_id': idempotency_key},
+                {'$setOnInsert': {'response': response, 'created_at': datetime.now()}},
+                upsert=True
+            )
+        
+        return jsonify(response), 200
+        
+    except Exception as e:
+        logger.error(f"处理请求时出错: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+def iter_ndjson_lines(stream, gzipped=False):
+    """
+    从请求流中逐行读取NDJSON（可选gzip解压），内存占用只与单行长度有关
+    """
+    decompressor = zlib.decompressobj(31) if gzipped else None  # 31 = gzip格式
+    pending = b''
+    
+    def split_lines(data):
+        nonlocal pending
+        pending += data
+        if len(pending) > MAX_NDJSON_LINE_BYTES and b'\n' not in pending:
+            raise ValueError(f'单行超过 {MAX_NDJSON_LINE_BYTES} 字节')
+        *lines, pending = pending.split(b'\n')
+        return lines
+    
+    while True:
+        chunk = stream.read(STREAM_READ_SIZE)
+        if not chunk:
+            break
+        if decompressor is None:
+            yield from split_lines(chunk)
+            continue
+        # 限制每次解压的输出大小，高压缩比的数据也不会一次性展开
+        data = decompressor.decompress(chunk, STREAM_READ_SIZE * 4)
+        yield from split_lines(data)
+        while decompressor.unconsumed_tail:
+            data = decompressor.decompress(decompressor.unconsumed_tail, STREAM_READ_SIZE * 4)
+            yield from split_lines(data)
+    
+    if decompressor is not None:
+        yield from split_lines(decompressor.flush())
+    if pending.strip():
+        yield pending
+
+@app.route('/api/jobs/ndjson', methods=['POST'])
+def receive_jobs_ndjson():
+    """
+    流式接收NDJSON格式的职位数据（每行一个职位，支持gzip和分块传输）
+    边解析边转换，每累积 UPSERT_BATCH_SIZE 条写入一次MongoDB
+    """
+    try:
+        if request.args.get('table', 'jobsprofiles') != 'jobsprofiles':
+            return jsonify({'error': '不支持的表名'}), 400
+        
+        if collection is None:
+            return jsonify({'error': 'MongoDB连接失败'}), 500
         
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            replay = replay_response(idempotency_key)
+            if replay:
+                return replay
+        
+        gzipped = request.headers.get('Content-Encoding', '').lower() == 'gzip'
+        started = datetime.now()
+        counts = {'matched_count': 0, 'upserted_count': 0, 'modified_count': 0}
+        received = 0
+        invalid_lines = []
+        batches = 0
+        first_write_ms = None
+        batch = []
+        
+        def flush():
+            nonlocal batches, first_write_ms
+            for name, value in upsert_jobs(batch).items():
+                counts[name] += value
+            batches += 1
+            if first_write_ms is None:
+                first_write_ms = round((datetime.now() - started).total_seconds() * 1000, 1)
+            batch.clear()
+        
+        for line_number, line in enumerate(iter_ndjson_lines(request.stream, gzipped), 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError:
+                invalid_lines.append(line_number)
+                continue
+            if not isinstance(job, dict):
+                invalid_lines.append(line_number)
+                continue
+            
+            batch.extend(transform_job_data([job]))
+            received += 1
+            if len(batch) >= UPSERT_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+        
+        logger.info(f"流式接收 {received} 条职位数据（{batches} 批），新增 {counts['upserted_count']}，"
+                    f"无效行 {len(invalid_lines)}")
+        
+        response = {
+            'success': True,
+            'message': f"成功存储 {received} 条记录（新增 {counts['upserted_count']}）",
+            'received_count': received,
+            **counts,
+            'batches': batches,
+            'invalid_lines': invalid_lines[:20],
+            'invalid_count': len(invalid_lines),
+            'time_to_first_write_ms': first_write_ms,
+            'collection': COLLECTION_NAME
+        }
+        if idempotency_key:
+            ingest_requests.update_one(
+                {'_id': idempotency_key},
+                {'$setOnInsert': {'response': response, 'created_at': datetime.now()}},
+                upsert=True
+            )
+        
+        return jsonify(response), 200
+        
+    except (ValueError, zlib.error) as e:
+        logger.error(f"解析NDJSON请求体失败: {str(e)}")
+        return jsonify({'error': f'请求体格式错误: {str(e)}'}), 400
     except Exception as e:
         logger.error(f"处理请求时出错: {str(e)}")
         return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
 
+@app.route('/api/jobs/batches/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    """
+    查询异步接收批次的状态（queued / done / failed / rejected / expired）
+    """
+    try:
+        if collection is None:
+            return jsonify({'error': 'MongoDB连接失败'}), 500
+        
+        batch = ingest_batches.find_one({'_id': batch_id})
+        if batch is None:
+            return jsonify({'error': '批次不存在或已过期'}), 404
+        
+        batch['batch_id'] = batch.pop('_id')
+        for field in ('created_at', 'finished_at'):
+            if isinstance(batch.get(field), datetime):
+                batch[field] = batch[field].isoformat()
+        return jsonify({'success': True, 'batch': batch}), 200
+        
+    except Exception as e:
+        logger.error(f"查询批次状态时出错: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+def encode_cursor(job):
+    """
+    将一页最后一条记录的 (scraped_at, _id) 编码为不透明的分页令牌
+    """
+    raw = json.dumps([job.get('scraped_at'), str(job['_id'])]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """
+    解析分页令牌，返回 (scraped_at, _id)；令牌无效时抛出 ValueError
+    scraped_at 必须是字符串：其他类型的值与字符串分属不同的排序分组，按它翻页会跳过或重复记录
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        scraped_at, job_id = json.loads(raw)
+    except Exception:
+        raise ValueError('无效的分页令牌')
+    if not isinstance(scraped_at, str):
+        raise ValueError('分页令牌中的scraped_at不是ISO字符串，请从第一页重新查询')
+    return scraped_at, ObjectId(job_id) if ObjectId.is_valid(job_id) else job_id
+
+_count_cache = {}
+
+def count_jobs(query):
+    """
+    精确总数，按查询条件缓存 COUNT_CACHE_TTL 秒
+    """
+    cache_key = json.dumps(query, sort_keys=True, default=str)
+    cached = _count_cache.get(cache_key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    total = collection.count_documents(query)
+    if len(_count_cache) > 1000:
+        _count_cache.clear()
+    _count_cache[cache_key] = (time.monotonic() + COUNT_CACHE_TTL, total)
+    return total
+
 @app.route('/api/jobs', methods=['GET'])
+@cached_response
 def get_jobs():
     """
     获取存储的职位数据
     """
     try:
-        if not collection:
+        if collection is None:
             return jsonify({'error': 'MongoDB连接失败'}), 500
         
         # 获取查询参数
-        limit = request.args.get('limit', 50, type=int)
+        limit = max(1, min(request.args.get('limit', 50, type=int), 1000))
         skip = request.args.get('skip', 0, type=int)
+        after = request.args.get('after', '')
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
         company = request.args.get('company', '')
         location = request.args.get('location', '')
+        match = request.args.get('match', DEFAULT_MATCH_MODE)
+        if match not in MATCH_MODES:
+            return jsonify({'error': f"match 必须是 {', '.join(MATCH_MODES)} 之一"}), 400
+        
+        # 构建查询条件（使用规范化键和词数组上的索引）
+        query = build_filter_query({'company': company, 'location': location}, match)
         
-        # 构建查询条件
-        query = {}
-        if company:
-            query['company_name'] = {'$regex': company, '$options': 'i'}
-        if location:
-            query['location'] = {'$regex': location, '$options': 'i'}
+        # 游标分页：从上一页最后一条记录 (scraped_at, _id) 之后继续，走 (scraped_at, _id) 索引，
+        # 任意一页的开销都与第一页相同；skip 仅为兼容保留
+        page_query = query
+        if after:
+            try:
+                last_scraped_at, last_id = decode_cursor(after)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            page_query = {'$and': [query, {'$or': [
+                {'scraped_at': {'$lt': last_scraped_at}},
+                {'scraped_at': last_scraped_at, '_id': {'$lt': last_id}}
+            ]}]}
         
-        # 查询数据
-        jobs = list(collection.find(query, {'_id': 0}).skip(skip).limit(limit).sort('scraped_at', -1))
+        # 查询数据（多取一条用于判断是否还有下一页）
+        cursor = collection.find(page_query).sort([('scraped_at', -1), ('_id', -1)])
+        if skip and not after:
+            cursor = cursor.skip(skip)
+        jobs = list(cursor.limit(limit + 1))
+        has_more = len(jobs) > limit
+        jobs = jobs[:limit]
+        next_after = encode_cursor(jobs[-1]) if has_more else None
+        for job in jobs:
+            job.pop('_id', None)
+        
+        # 总数：include_total=true 时返回（缓存的）精确值；无筛选条件时返回集合元数据中的估计值
+        if include_total:
+            total, total_is_estimate = count_jobs(query), False
+        elif not query:
+            total, total_is_estimate = collection.estimated_document_count(), True
+        else:
+            total, total_is_estimate = None, None
         
         return jsonify({
             'success': True,
             'data': jobs,
             'count': len(jobs),
-            'total': collection.count_documents(query)
+            'has_more': has_more,
+            'next_after': next_after,
+            'total': total,
+            'total_is_estimate': total_is_estimate
         }), 200
         
     except Exception as e:
         logger.error(f"获取数据时出错: {str(e)}")
         return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
 
+@app.route('/api/jobs/search', methods=['GET'])
+@cached_response
+def search_jobs():
+    """
+    全文搜索职位（标题、公司、团队、部门、要求和描述），按相关度排序
+    """
+    try:
+        if collection is None:
+            return jsonify({'error': 'MongoDB连接失败'}), 500
+        
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': '缺少搜索词: q'}), 400
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        page = max(1, request.args.get('page', 1, type=int))
+        offset = (page - 1) * limit
+        if offset >= SEARCH_MAX_RESULTS:
+            return jsonify({'error': f'最多只能查看前 {SEARCH_MAX_RESULTS} 条结果，请缩小搜索范围'}), 400
+        
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(SEARCH_DEFAULT_FIELDS)
+        unknown = [f for f in fields if f not in SEARCH_FIELDS]
+        if unknown:
+            return jsonify({'error': f"不支持的字段: {', '.join(unknown)}"}), 400
+        
+        # 可与公司/地点筛选组合
+        match = request.args.get('match', DEFAULT_MATCH_MODE)
+        if match not in MATCH_MODES:
+            return jsonify({'error': f"match 必须是 {', '.join(MATCH_MODES)} 之一"}), 400
+        query = build_filter_query({
+            'company': request.args.get('company', ''),
+            'location': request.args.get('location', '')
+        }, match)
+        query['$text'] = {'$search': q}
+        
+        projection = {field: 1 for field in fields}
+        projection['_id'] = 0
+        projection['score'] = {'$meta': 'textScore'}
+        
+        cursor = (collection.find(query, projection)
+                  .sort([('score', {'$meta': 'textScore'})])
+                  .skip(offset)
+                  .limit(limit + 1))
+        jobs = list(cursor)
+        has_more = len(jobs) > limit and offset + limit < SEARCH_MAX_RESULTS
+        jobs = jobs[:limit]
+        for job in jobs:
+            job['score'] = round(job['score'], 4)
+        
+        return jsonify({
+            'success': True,
+            'query': q,
+            'data': jobs,
+            'count': len(jobs),
+            'page': page,
+            'limit': limit,
+            'has_more': has_more
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"搜索职位时出错: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+def iter_export_lines(cursor, fields, export_format):
+    """
+    将游标中的记录逐条转换为NDJSON行或CSV行（第一行为表头）
+    """
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for job in cursor:
+            writer.writerow(['' if job.get(field) is None else job.get(field) for field in fields])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # 表头在没有数据时也要输出
+        if buffer.tell():
+            yield buffer.getvalue()
+    else:
+        for job in cursor:
+            yield json.dumps(job, ensure_ascii=False, default=str) + '\n'
+
+def iter_export_chunks(lines, gzipped=False):
+    """
+    将行合并为约 EXPORT_CHUNK_BYTES 的数据块输出，可选gzip流式压缩
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzipped else None  # 31 = gzip格式
+    parts = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        parts.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_BYTES:
+            chunk = b''.join(parts)
+            parts, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b''.join(parts)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+@app.route('/api/jobs/export', methods=['GET'])
+def export_jobs():
+    """
+    流式导出职位数据（NDJSON或CSV，可选gzip），直接从服务端游标逐批读取，内存占用与数据量无关
+    """
+    try:
+        if collection is None:
+            return jsonify({'error': 'MongoDB连接失败'}), 500
+        
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({'error': 'format 必须是 ndjson 或 csv'}), 400
+        gzipped = request.args.get('gzip', 'false').lower() == 'true'
+        
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(SEARCH_FIELDS)
+        unknown = [f for f in fields if f not in SEARCH_FIELDS]
+        if unknown:
+            return jsonify({'error': f"不支持的字段: {', '.join(unknown)}"}), 400
+        
+        match = request.args.get('match', DEFAULT_MATCH_MODE)
+        if match not in MATCH_MODES:
+            return jsonify({'error': f"match 必须是 {', '.join(MATCH_MODES)} 之一"}), 400
+        query = build_filter_query({
+            'company': request.args.get('company', ''),
+            'location': request.args.get('location', '')
+        }, match)
+        since = request.args.get('since', '')
+        if since:
+            query['scraped_at'] = {'$gte': since}
+        
+        projection = {field: 1 for field in fields}
+        projection['_id'] = 0
+        cursor = collection.find(query, projection, batch_size=EXPORT_BATCH_SIZE)
+        
+        def generate():
+            try:
+                yield from iter_export_chunks(iter_export_lines(cursor, fields, export_format), gzipped)
+            finally:
+                cursor.close()
+        
+        filename = f"jobsprofiles_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}" + ('.gz' if gzipped else '')
+        mimetype = 'application/gzip' if gzipped else ('text/csv' if export_format == 'csv' else 'application/x-ndjson')
+        response = Response(stream_with_context(generate()), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+        
+    except Exception as e:
+        logger.error(f"导出数据时出错: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
 @app.route('/api/stats', methods=['GET'])
+@cached_response
 def get_stats():
     """
     获取数据统计信息
     """
     try:
-        if not collection:
+        if collection is None:
             return jsonify({'error': 'MongoDB连接失败'}), 500
         
-        # 获取基本统计信息
-        total_jobs = collection.count_documents({})
-        total_companies = len(collection.distinct('company_name'))
-        total_locations = len(collection.distinct('location'))
-        
-        # 获取最近的数据
-        latest_job = collection.find_one({}, sort=[('scraped_at', -1)])
-        latest_scrape = latest_job.get('scraped_at') if latest_job else None
-        
-        # 按公司统计
-        company_stats = list(collection.aggregate([
-            {'$group': {'_id': '$company_name', 'count': {'$sum': 1}}},
-            {'$sort': {'count': -1}},
-            {'$limit': 10}
-        ]))
-        
-        # 按位置统计
-        location_stats = list(collection.aggregate([
-            {'$group': {'_id': '$location', 'count': {'$sum': 1}}},
-            {'$sort': {'count': -1}},
-            {'$limit': 10}
-        ]))
+        # 读取物化的统计文档（接收职位时增量更新）
+        # 文档不存在，或是在首次全量计算之前由 $inc upsert 插入的（只含部分计数），全量计算一次
+        stats = job_stats.find_one({'_id': STATS_DOC_ID})
+        if not stats or not stats.get('built'):
+            stats = rebuild_stats()
+        companies = {name: count for name, count in stats.get('companies', {}).items() if count > 0}
+        locations = {name: count for name, count in stats.get('locations', {}).items() if count > 0}
+        
+        total_jobs = stats.get('total_jobs', 0)
+        total_companies = len(companies)
+        total_locations = len(locations)
+        latest_scrape = stats.get('latest_scrape')
+        company_stats = top_counts(companies)
+        location_stats = top_counts(locations)
         
         return jsonify({
             'success': True,
@@ -197,7 +1184,8 @@ def get_stats():
                 'total_locations': total_locations,
                 'latest_scrape': latest_scrape,
                 'top_companies': company_stats,
-                'top_locations': location_stats
+                'top_locations': location_stats,
+                'updated_at': stats.get('updated_at')
             }
         }), 200
         
@@ -205,13 +1193,27 @@ def get_stats():
         logger.error(f"获取统计信息时出错: {str(e)}")
         return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
 
+@app.route('/api/metrics/cache', methods=['GET'])
+def get_cache_metrics():
+    """
+    响应缓存指标：命中率、条目数和占用内存
+    """
+    if response_cache is None:
+        return jsonify({'success': True, 'enabled': False}), 200
+    return jsonify({
+        'success': True,
+        'enabled': True,
+        'generation': _generation['value'],
+        'metrics': response_cache.get_metrics()
+    }), 200
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """
     健康检查端点
     """
     try:
-        if collection:
+        if collection is not None:
             # 测试数据库连接
             collection.find_one()
             db_status = 'connected'
@@ -231,6 +1233,143 @@ def health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+def backfill_search_keys(batch_size=1000):
+    """
+    为缺少搜索键的已有记录补充规范化键和词数组
+    """
+    updated = 0
+    operations = []
+    missing = {'$or': [{field['key']: {'$exists': False}} for field in SEARCH_KEY_FIELDS.values()]}
+    projection = {field['source']: 1 for field in SEARCH_KEY_FIELDS.values()}
+    for job in collection.find(missing, projection):
+        keys = add_search_keys({name: job.get(name) for name in projection})
+        for name in projection:
+            keys.pop(name)
+        operations.append(UpdateOne({'_id': job['_id']}, {'$set': keys}))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    print(f"已补充 {updated} 条记录的搜索键")
+
+def migrate_job_ids():
+    """
+    将旧格式的job_id（公司_职位_时间，同一秒内会重复）改写为 stable_job_id
+    同一职位的多条记录只保留最近抓取的一条（first_seen_at 取最早的一次），完成后创建索引并重建统计
+    """
+    projection = {'job_id': 1, 'job_url': 1, 'company_path': 1, 'company_name': 1, 'job_title': 1,
+                  'location': 1, 'scraped_at': 1, 'processed_at': 1, 'first_seen_at': 1}
+    groups = {}
+    for job in collection.find({}, projection):
+        groups.setdefault(stable_job_id(job), []).append(job)
+    
+    rewritten = removed = 0
+    operations = []
+    for job_id, jobs in groups.items():
+        if len(jobs) == 1 and jobs[0].get('job_id') == job_id:
+            continue
+        jobs.sort(key=lambda job: (str(job.get('scraped_at') or ''), str(job.get('processed_at') or '')))
+        keep, duplicates = jobs[-1], jobs[:-1]
+        if duplicates:
+            # 先删除重复记录再改写保留的记录，job_id 不会与已有记录冲突
+            operations.append(DeleteMany({'_id': {'$in': [job['_id'] for job in duplicates]}}))
+            removed += len(duplicates)
+        update = {'job_id': job_id}
+        first_seen = [str(job.get('first_seen_at') or job.get('processed_at') or '') for job in jobs]
+        if any(first_seen):
+            update['first_seen_at'] = min(value for value in first_seen if value)
+        operations.append(UpdateOne({'_id': keep['_id']}, {'$set': update}))
+        rewritten += 1
+        if len(operations) >= UPSERT_BATCH_SIZE:
+            collection.bulk_write(operations, ordered=True)
+            operations = []
+    if operations:
+        collection.bulk_write(operations, ordered=True)
+    
+    print(f"已改写 {rewritten} 个职位的job_id，删除 {removed} 条重复记录")
+    ensure_indexes()
+    rebuild_stats()
+
+def migrate_scraped_at():
+    """
+    将旧记录中非字符串的 scraped_at（时间戳、datetime、缺失）统一为ISO字符串，游标分页按同一类型排序
+    """
+    operations = []
+    migrated = 0
+    query = {'$or': [{'scraped_at': {'$exists': False}}, {'scraped_at': {'$not': {'$type': 'string'}}}]}
+    for job in collection.find(query, {'scraped_at': 1, 'processed_at': 1}):
+        value = normalize_scraped_at(job.get('scraped_at'), default=job.get('processed_at'))
+        operations.append(UpdateOne({'_id': job['_id']}, {'$set': {'scraped_at': value}}))
+        migrated += 1
+        if len(operations) >= UPSERT_BATCH_SIZE:
+            collection.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    
+    print(f"已将 {migrated} 条记录的scraped_at统一为ISO字符串")
+
+def _plan_stages(plan):
+    """
+    递归收集执行计划中的所有stage节点
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan)
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+def explain_filter(name, match, value='Sydney Software'):
+    """
+    对一种筛选方式执行explain，返回 (是否通过筛选字段上的索引查找, 获胜计划的stage列表)
+    不通过的情况：COLLSCAN，或按排序索引扫描全部记录
+    """
+    query = build_filter_query({name: value}, match)
+    explain = collection.find(query).sort([('scraped_at', -1), ('_id', -1)]).limit(50).explain()
+    stages = _plan_stages(explain.get('queryPlanner', {}).get('winningPlan', {}))
+    names = [stage['stage'] for stage in stages]
+    filtered_field = next(iter(query))
+    passed = 'COLLSCAN' not in names and any(
+        stage['stage'] == 'IXSCAN' and filtered_field in stage.get('keyPattern', {}) for stage in stages
+    )
+    return passed, names
+
+def check_filter_indexes():
+    """
+    对每种筛选方式执行explain，确认获胜计划通过筛选字段上的索引（IXSCAN）查找
+    """
+    ok = True
+    for name in SEARCH_KEY_FIELDS:
+        for match in MATCH_MODES:
+            passed, names = explain_filter(name, match)
+            ok = ok and passed
+            print(f"{'✅' if passed else '❌'} {name:<8} {match:<9} {' -> '.join(names)}")
+    return ok
+
 if __name__ == '__main__':
-    # 在生产环境中，应该使用WSGI服务器如gunicorn
-    app.run(host='0.0.0.0', port=5000, debug=False) 
\ No newline at end of file
+    command = sys.argv[1] if len(sys.argv) > 1 else 'serve'
+    if command == 'check-indexes':
+        # 检查公司/地点筛选是否走索引：python backend_api_example.py check-indexes
+        sys.exit(0 if check_filter_indexes() else 1)
+    elif command == 'rebuild-stats':
+        # 全量重建统计文档：python backend_api_example.py rebuild-stats
+        stats = rebuild_stats()
+        print(f"统计文档已重建: {stats['total_jobs']} 条职位，{len(stats['companies'])} 家公司，{len(stats['locations'])} 个地点")
+    elif command == 'migrate-job-ids':
+        # 旧记录改用稳定的job_id并去重，之后才能创建job_id唯一索引：python backend_api_example.py migrate-job-ids
+        migrate_job_ids()
+    elif command == 'migrate-scraped-at':
+        # 旧记录的scraped_at统一为ISO字符串，游标分页才不会跳过记录：python backend_api_example.py migrate-scraped-at
+        migrate_scraped_at()
+    elif command == 'backfill-keys':
+        # 为已有记录补充搜索键：python backend_api_example.py backfill-keys
+        backfill_search_keys()
+    else:
+        # 在生产环境中，应该使用WSGI服务器如gunicorn
+        app.run(host='0.0.0.0', port=5000, debug=False) 
\ No newline at end of file
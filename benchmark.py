@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+性能基准脚本 - 对比优化前后的关键路径耗时
+
+用法:
+    python benchmark.py extraction [保存的职位页面.html ...]
+    python benchmark.py ingest [API地址] [请求数] [每个请求的职位数] [并发数]
+    python benchmark.py dynamodb [表名] [分段数,分段数,...] [预先写入的职位数]
+        （DYNAMODB_ENDPOINT_URL 指向 DynamoDB Local 等本地替身）
+    python benchmark.py analysis [行数]
+"""
+
+import sys
+import os
+import glob
+import time
+import uuid
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import boto3
+import requests
+from bs4 import BeautifulSoup
+
+from utils.job_extractor import JobPageExtractor
+import numpy as np
+import pandas as pd
+
+from data_analysis import JobDataAnalyzer, AUSTRALIAN_CITIES
+
+
+def _text(element):
+    return element.get_text(strip=True) if element else ""
+
+
+def legacy_lambda_parse(html):
+    """优化前 LeverJobScraper.get_job_details 的解析方式（html.parser + 逐字段查找）"""
+    soup = BeautifulSoup(html, 'html.parser')
+    description_elem = soup.find('div', class_='description') or soup.find('div', class_='content') or soup.find('div', class_='job-description')
+    return {
+        'job_title': _text(soup.find('h1')) or _text(soup.find('h2')),
+        'company_name': _text(soup.find('div', class_='company-name')),
+        'location': _text(soup.find('div', class_='location')) or _text(soup.find('span', class_='location')),
+        'department': _text(soup.find('div', class_='department')) or _text(soup.find('span', class_='department')),
+        'team': _text(soup.find('div', class_='team')) or _text(soup.find('span', class_='team')),
+        'description': _text(description_elem),
+        'requirements': _text(soup.find('div', class_='requirements')),
+        'benefits': _text(soup.find('div', class_='benefits')),
+    }
+
+
+def legacy_utils_parse(html):
+    """优化前 LeverScraperUtils.extract_job_data 的解析方式"""
+    soup = BeautifulSoup(html, 'html.parser')
+    return {
+        'job_title': _text(soup.find('h2', class_='posting-headline')) or _text(soup.find('h1', class_='posting-headline')) or _text(soup.find('h1')),
+        'company_name': _text(soup.find('a', class_='company-link')) or _text(soup.find('div', class_='company-name')),
+        'location': _text(soup.find('div', class_='posting-categories')) or _text(soup.find('div', class_='location')),
+        'description': "\n".join(_text(el) for el in soup.find_all('div', class_='section page-centered')),
+        'department': _text(soup.find('div', class_='department')),
+        'team': _text(soup.find('div', class_='team')),
+    }
+
+
+def sample_job_page():
+    """生成与Lever职位页结构相近的示例页面（没有提供保存的页面时使用）"""
+    sections = "".join(
+        f'<div class="section page-centered"><h3>Section {i}</h3><ul>'
+        + "".join(f'<li>Responsibility {i}.{j} with <b>details</b> and <a href="#">links</a></li>' for j in range(12))
+        + '</ul></div>'
+        for i in range(6)
+    )
+    nav = "".join(f'<li><a href="/other/{i}">Other job {i}</a></li>' for i in range(150))
+    return f"""<!DOCTYPE html><html><head><title>Job</title>
+<script>{'var x = 1;' * 400}</script><style>{'.a{{color:red}}' * 300}</style></head>
+<body><div class="main-header"><a class="company-link" href="/acme">Acme</a><ul>{nav}</ul></div>
+<div class="content-wrapper posting-page"><div class="posting-headline"><h2>Senior Software Engineer</h2>
+<div class="posting-categories"><div class="location">Sydney, Australia</div>
+<div class="department">Engineering</div><div class="team">Platform</div></div></div>
+<div class="content">{sections}</div></div>
+<footer>{'<p>Footer text</p>' * 100}</footer></body></html>""".encode('utf-8')
+
+
+def _time_per_page(parse, pages, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for page in pages:
+            parse(page)
+        samples.append((time.perf_counter() - started) / len(pages) * 1000)
+    return statistics.median(samples)
+
+
+def bench_extraction(paths, rounds=20):
+    """对比职位详情页的单页解析耗时"""
+    files = [f for pattern in paths for f in glob.glob(pattern)]
+    if files:
+        pages = []
+        for path in files:
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+        print(f"📄 使用 {len(pages)} 个保存的页面")
+    else:
+        pages = [sample_job_page()]
+        print("📄 未提供保存的页面，使用生成的示例页面")
+
+    extractor = JobPageExtractor()
+    results = {
+        'legacy LeverJobScraper (html.parser)': _time_per_page(legacy_lambda_parse, pages, rounds),
+        'legacy LeverScraperUtils (html.parser)': _time_per_page(legacy_utils_parse, pages, rounds),
+        'JobPageExtractor (lxml + SoupStrainer)': _time_per_page(extractor.extract, pages, rounds),
+    }
+
+    baseline = results['legacy LeverJobScraper (html.parser)']
+    for name, ms in results.items():
+        print(f"  {name:<42} {ms:8.3f} ms/页  ({baseline / ms:.1f}x)")
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_ingest(base_url='http://localhost:5000', requests_count=200, jobs_per_request=50, concurrency=16):
+    """后端接收的负载测试：并发POST /api/jobs，统计吞吐量和请求延迟（异步模式下等待所有批次写完）"""
+    run_id = uuid.uuid4().hex[:8]
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    def payload(n):
+        return {
+            'table': 'jobsprofiles',
+            'data': [{
+                'job_title': f'Software Engineer {i}',
+                'company_name': f'Company {i % 50}',
+                'company_path': f'company-{i % 50}',
+                'location': 'Sydney, Australia',
+                'description': 'Build things. ' * 40,
+                'job_url': f'https://jobs.lever.co/company-{i % 50}/{run_id}-{n}-{i}'
+            } for i in range(jobs_per_request)]
+        }
+
+    def post(n):
+        body = payload(n)
+        started = time.perf_counter()
+        response = session.post(f'{base_url}/api/jobs', json=body, timeout=60)
+        return response.status_code, (time.perf_counter() - started) * 1000, response.json().get('batch_id')
+
+    print(f"🚀 {requests_count} 个请求 × {jobs_per_request} 条职位，并发 {concurrency} -> {base_url}")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(post, range(requests_count)))
+    acked = time.perf_counter() - started
+
+    latencies = [latency for _, latency, _ in results]
+    statuses = {}
+    for status, _, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    total_jobs = requests_count * jobs_per_request
+
+    # 异步模式：轮询批次状态直到全部写完
+    batch_ids = [batch_id for status, _, batch_id in results if status == 202 and batch_id]
+    pending = set(batch_ids)
+    failed = 0
+    while pending:
+        for batch_id in list(pending):
+            batch = session.get(f'{base_url}/api/jobs/batches/{batch_id}', timeout=30).json().get('batch', {})
+            if batch.get('status') in ('done', 'failed', 'rejected'):
+                pending.discard(batch_id)
+                failed += batch['status'] != 'done'
+        if pending:
+            time.sleep(0.1)
+    completed = time.perf_counter() - started
+
+    print(f"  状态码: {statuses}")
+    print(f"  请求延迟: p50 {_percentile(latencies, 50):.1f} ms，p99 {_percentile(latencies, 99):.1f} ms，"
+          f"最大 {max(latencies):.1f} ms")
+    print(f"  确认吞吐量: {total_jobs / acked:,.0f} 条/秒（{acked:.2f}s）")
+    if batch_ids:
+        print(f"  写入完成吞吐量: {total_jobs / completed:,.0f} 条/秒（{completed:.2f}s，失败批次 {failed}）")
+
+
+def seed_dynamodb_table(client, table_name, count):
+    """创建测试表并写入 count 条示例职位"""
+    if table_name not in client.list_tables()['TableNames']:
+        client.create_table(
+            TableName=table_name,
+            KeySchema=[{'AttributeName': 'job_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'job_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        client.get_waiter('table_exists').wait(TableName=table_name)
+
+    for start in range(0, count, 25):
+        client.batch_write_item(RequestItems={table_name: [{'PutRequest': {'Item': {
+            'job_id': {'S': f'job-{i}'},
+            'job_title': {'S': f'Software Engineer {i % 200}'},
+            'company_name': {'S': f'Company {i % 300}'},
+            'location': {'S': ['Sydney, Australia', 'Melbourne, Australia', 'Remote'][i % 3]},
+            'department': {'S': 'Engineering'},
+            'description': {'S': 'Build things. ' * 40},
+            'scraped_at': {'N': str(1700000000 + i)}
+        }}} for i in range(start, min(start + 25, count))]})
+    print(f"🗄️ 已写入 {count} 条职位到 {table_name}")
+
+
+def bench_dynamodb(table_name='lever-jobs', segment_counts=(1, 2, 4, 8), seed=0, client=None):
+    """DynamoDB并行分段扫描：不同分段数下的加载耗时和吞吐量"""
+    client = client or boto3.client('dynamodb', endpoint_url=os.environ.get('DYNAMODB_ENDPOINT_URL'))
+    if seed:
+        seed_dynamodb_table(client, table_name, seed)
+
+    analyzer = JobDataAnalyzer(dynamodb_client=client)
+    baseline = None
+    for segments in segment_counts:
+        started = time.perf_counter()
+        df = analyzer.load_data_from_dynamodb(table_name, total_segments=segments,
+                                              projection=['job_title', 'company_name', 'location', 'scraped_at'])
+        elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        print(f"  {segments:>3} 个分段: {len(df):>8} 行  {elapsed:7.2f}s  {len(df) / elapsed:10,.0f} 行/秒  ({baseline / elapsed:.1f}x)")
+
+
+def legacy_analyze_jobs(df):
+    """优化前 analyze_jobs 的计数方式（逐行匹配城市 + 六次 value_counts）"""
+    locations = []
+    for location in df['location'].dropna():
+        location_lower = location.lower()
+        for city in AUSTRALIAN_CITIES:
+            if city in location_lower:
+                locations.append(city.title())
+                break
+        else:
+            if location.strip():
+                locations.append(location.strip())
+    return {
+        'total_jobs': len(df),
+        'unique_companies': df['company_name'].nunique(),
+        'job_titles': df['job_title'].value_counts().head(10).to_dict(),
+        'companies': df['company_name'].value_counts().head(10).to_dict(),
+        'locations': Counter(locations).most_common(10),
+        'departments': df['department'].value_counts().head(10).to_dict(),
+        'teams': df['team'].value_counts().head(10).to_dict(),
+        'scraped_dates': df['scraped_at'].str.slice(0, 10).value_counts().head(5).to_dict()
+    }
+
+
+def sample_jobs_frame(rows, seed=0):
+    """生成 rows 行示例职位"""
+    rng = np.random.default_rng(seed)
+    places = ['Sydney, NSW', 'Melbourne VIC, Australia', 'Remote', 'Brisbane', 'London, UK',
+              'Perth / Remote', 'Singapore', 'Auckland, New Zealand', 'Canberra ACT', '']
+    return pd.DataFrame({
+        'job_title': np.array([f'Software Engineer {i}' for i in range(500)], dtype=object)[rng.integers(0, 500, rows)],
+        'company_name': np.array([f'Company {i}' for i in range(2000)], dtype=object)[rng.integers(0, 2000, rows)],
+        'location': np.array([f'{place} {i % 3 or ""}'.strip() for i, place in enumerate(places * 30)],
+                             dtype=object)[rng.integers(0, len(places) * 30, rows)],
+        'department': np.array(['Engineering', 'Sales', 'Marketing', 'Operations', None], dtype=object)[rng.integers(0, 5, rows)],
+        'team': np.array([f'Team {i}' for i in range(40)] + [None], dtype=object)[rng.integers(0, 41, rows)],
+        'scraped_at': np.array([f'2024-01-{d:02d}T08:00:00' for d in range(1, 29)], dtype=object)[rng.integers(0, 28, rows)],
+    })
+
+
+def bench_analysis(rows=1000000, rounds=3):
+    """analyze_jobs 计数：优化前的逐行实现与向量化计数（去重后归一化 + 一次 bincount）对比"""
+    df = sample_jobs_frame(rows)
+    analyzer = JobDataAnalyzer()
+    print(f"📊 {rows:,} 行示例职位")
+
+    def best_of(analyze):
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            result = analyze(df)
+            samples.append(time.perf_counter() - started)
+        return min(samples), result
+
+    baseline, expected = best_of(legacy_analyze_jobs)
+    results = {
+        'legacy (Python循环 + value_counts)': (baseline, expected),
+        '向量化 (去重后归一化 + bincount)': best_of(analyzer.analyze_jobs),
+    }
+    for name, (elapsed, result) in results.items():
+        # 计数相同时排名可能不同，只比较计数
+        same = all(sorted(Counter(dict(result[k])).values()) == sorted(Counter(dict(expected[k])).values()) for k in expected
+                   if isinstance(expected[k], (dict, list)))
+        print(f"  {name:<36} {elapsed * 1000:9.1f} ms  ({baseline / elapsed:.1f}x){'' if same else '  ⚠️ 结果不一致'}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'extraction'
+    if command == 'extraction':
+        bench_extraction(sys.argv[2:])
+    elif command == 'ingest':
+        args = sys.argv[2:]
+        bench_ingest(
+            args[0] if len(args) > 0 else 'http://localhost:5000',
+            int(args[1]) if len(args) > 1 else 200,
+            int(args[2]) if len(args) > 2 else 50,
+            int(args[3]) if len(args) > 3 else 16
+        )
+    elif command == 'dynamodb':
+        args = sys.argv[2:]
+        bench_dynamodb(
+            args[0] if len(args) > 0 else 'lever-jobs',
+            [int(n) for n in args[1].split(',')] if len(args) > 1 else (1, 2, 4, 8),
+            int(args[2]) if len(args) > 2 else 0
+        )
+    elif command == 'analysis':
+        bench_analysis(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    else:
+        print(f"未知的基准: {command}")
+        sys.exit(1)
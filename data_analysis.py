@@ -4,24 +4,240 @@
 """
 
 import json
+import sys
+import glob
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 import boto3
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import re
+from pandas.api.types import union_categoricals
+
+from utils.json_stream import iter_snapshot_jobs
 
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS']
 plt.rcParams['axes.unicode_minus'] = False
 
+# 快照中的职位字段；低基数字段使用categorical类型
+SNAPSHOT_COLUMNS = ['job_title', 'company_name', 'company_path', 'location', 'department', 'team',
+                    'description', 'requirements', 'benefits', 'job_url', 'scraped_at']
+CATEGORICAL_COLUMNS = ['company_name', 'company_path', 'location', 'department', 'team', 'snapshot_date']
+# 快照文件名：jobs_YYYYMMDD_HHMMSS.json / .ndjson.gz
+SNAPSHOT_KEY_PATTERN = re.compile(r'jobs_(\d{8})_\d{6}\.(?:json|ndjson)(?:\.gz)?$')
+
+# analyze_jobs 中按值计数的字段
+COUNT_COLUMNS = ['company_name', 'job_title', 'department', 'team']
+AUSTRALIAN_CITIES = ['sydney', 'melbourne', 'brisbane', 'perth', 'adelaide', 'canberra', 'darwin', 'hobart']
+CITY_PATTERN = re.compile(r'(%s)' % '|'.join(AUSTRALIAN_CITIES), re.IGNORECASE)
+# 每日聚合状态中保存的计数字段，以及状态在S3中的默认位置
+AGGREGATE_FIELDS = ['company_name', 'job_title', 'locations', 'department', 'team']
+AGGREGATES_KEY = 'analysis/daily_aggregates.json'
+# 聚合状态格式变化时递增，旧版本的状态会被丢弃并重新统计
+AGGREGATES_VERSION = 3
+
+def scraped_day(value) -> str:
+    """抓取时间归一化为日期（YYYY-MM-DD），兼容时间戳和ISO格式字符串"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value).strftime('%Y-%m-%d') if value == value else None
+    return str(value)[:10] if value else None
+
+def scraped_days(values: pd.Series) -> pd.Series:
+    """scraped_day 的向量化版本：字符串直接截取日期，其他值（time.time() 时间戳、DynamoDB 的数值）逐个转换"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.map(scraped_day)
+    strings = values.map(lambda value: isinstance(value, str)).astype(bool)
+    days = pd.Series(np.nan, index=values.index, dtype=object)
+    if strings.any():
+        days[strings] = values[strings].astype(str).str.slice(0, 10)
+    others = ~strings & values.notna()
+    if others.any():
+        days[others] = values[others].map(scraped_day)
+    return days.replace('', np.nan)
+
+def normalize_locations(locations: pd.Series) -> pd.Series:
+    """地点归一化：包含澳洲城市的地点归并为城市名（取第一个出现的城市），其他保留去除首尾空白的原始地点，空地点为NaN"""
+    # 转为categorical后字符串操作只在去重后的类别上执行
+    locations = locations.astype('category')
+    cities = locations.str.extract(CITY_PATTERN, expand=False).str.title()
+    return cities.fillna(locations.str.strip()).replace('', np.nan)
+
+def location_counts(locations: pd.Series) -> Counter:
+    """地点计数：包含澳洲城市的地点归并为城市名，其他保留原始地点"""
+    return Counter(normalize_locations(locations).value_counts().to_dict())
+
+def _factorize(values: pd.Series, transform=None):
+    # transform 只作用于去重后的值，结果再映射回每一行的编码（-1 为空值）
+    codes, uniques = pd.factorize(values)
+    if transform is not None and len(uniques):
+        mapped, uniques = pd.factorize(transform(pd.Series(uniques, dtype=object)))
+        codes = np.where(codes >= 0, mapped[codes], -1)
+    return codes, uniques
+
+def _count_columns(columns: dict, transforms: dict = None) -> dict:
+    # 各字段编码加上偏移后拼接，一次 bincount 得到所有字段的计数
+    transforms = transforms or {}
+    fields = []
+    parts = []
+    offset = 0
+    for field, values in columns.items():
+        codes, uniques = _factorize(values, transforms.get(field))
+        parts.append(codes[codes >= 0] + offset)
+        fields.append((field, list(uniques), offset))
+        offset += len(uniques)
+    totals = np.bincount(np.concatenate(parts), minlength=offset) if parts else np.zeros(0, dtype=np.int64)
+    return {
+        field: Counter({value: int(n) for value, n in zip(uniques, totals[start:start + len(uniques)]) if n})
+        for field, uniques, start in fields
+    }
+
+# 需要归一化的计数字段 -> 原始列，以及归一化函数
+NORMALIZED_COLUMNS = {'locations': 'location', 'scraped_dates': 'scraped_at'}
+NORMALIZERS = {'locations': normalize_locations, 'scraped_dates': scraped_days}
+
+def _count_inputs(df: pd.DataFrame) -> dict:
+    columns = {column: df[column] for column in COUNT_COLUMNS if column in df}
+    columns.update({field: df[column] for field, column in NORMALIZED_COLUMNS.items() if column in df})
+    return columns
+
+def count_jobs(df: pd.DataFrame) -> dict:
+    """计算一批职位的完整计数（可与其他批次的结果合并）
+
+    所有字段编码后一次 bincount 完成计数；地点和日期的归一化只处理 factorize 去重后的值，
+    再用编码数组映射回每一行。
+    """
+    counts = _count_columns(_count_inputs(df), NORMALIZERS)
+
+    result = {'total_jobs': len(df)}
+    for field in COUNT_COLUMNS + list(NORMALIZED_COLUMNS):
+        result[field] = counts.get(field, Counter())
+    return result
+
+def count_jobs_by_company(df: pd.DataFrame) -> dict:
+    """按公司（company_path，缺失时用 company_name）分组计数，返回 {公司: count_jobs 结果}
+
+    公司编码与各字段的值编码组合成一个整数，用 np.unique 一次得到每家公司每个值的计数。
+    """
+    companies = pd.Series('', index=df.index, dtype=object)
+    for column in ('company_name', 'company_path'):
+        if column in df:
+            values = df[column].fillna('').astype(str)
+            companies = values.where(values != '', companies)
+    company_codes, company_names = pd.factorize(companies)
+    totals = np.bincount(company_codes, minlength=len(company_names))
+
+    fields = COUNT_COLUMNS + list(NORMALIZED_COLUMNS)
+    result = {name: {'total_jobs': int(total), **{field: Counter() for field in fields}}
+              for name, total in zip(company_names, totals)}
+    for field, values in _count_inputs(df).items():
+        codes, uniques = _factorize(values, NORMALIZERS.get(field))
+        if not len(uniques):
+            continue
+        valid = codes >= 0
+        pairs, counts = np.unique(company_codes[valid].astype(np.int64) * len(uniques) + codes[valid],
+                                  return_counts=True)
+        for company, value, n in zip(pairs // len(uniques), pairs % len(uniques), counts):
+            result[company_names[company]][field][uniques[value]] = int(n)
+    return result
+
+def merge_counts(total: dict, counts: dict) -> dict:
+    """将 counts 合并到 total 中"""
+    if not total:
+        total.update({key: value.copy() if isinstance(value, Counter) else value for key, value in counts.items()})
+        return total
+    for key, value in counts.items():
+        if isinstance(value, Counter):
+            total[key].update(value)
+        else:
+            total[key] += value
+    return total
+
+def analysis_from_counts(counts: dict) -> dict:
+    """由计数生成分析结果（与 analyze_jobs 的格式相同）"""
+    if not counts or not counts['total_jobs']:
+        return {}
+    top = lambda counter, n=10: dict(counter.most_common(n))
+    return {
+        'total_jobs': counts['total_jobs'],
+        'unique_companies': len([c for c, n in counts['company_name'].items() if n]),
+        'job_titles': top(counts['job_title']),
+        'companies': top(counts['company_name']),
+        'locations': counts['locations'].most_common(10),
+        'departments': top(counts['department']),
+        'teams': top(counts['team']),
+        'scraped_dates': top(counts['scraped_dates'], 5)
+    }
+
+def iter_local_jobs(path: str):
+    """流式读取本地结果文件中的职位（JSON数组、快照对象或NDJSON，可gzip压缩）"""
+    with open(path, 'rb') as f:
+        yield from iter_snapshot_jobs(iter(lambda: f.read(1024 * 1024), b''), path)
+
+def count_local_file(path: str, chunk_size: int = 5000) -> dict:
+    """按块读取一个文件并累计计数，内存占用约为一个块"""
+    return count_job_stream(iter_local_jobs(path), chunk_size)
+
+def count_job_stream(jobs, chunk_size: int = 5000) -> dict:
+    """按块累计职位流的计数"""
+    counts = {}
+    chunk = []
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) >= chunk_size:
+            merge_counts(counts, count_jobs(pd.DataFrame(chunk)))
+            chunk = []
+    if chunk or not counts:
+        merge_counts(counts, count_jobs(pd.DataFrame(chunk)))
+    return counts
+
+def count_company_stream(jobs, chunk_size: int = 5000) -> dict:
+    """按块累计职位流中每家公司的计数"""
+    counts = {}
+    chunk = []
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) >= chunk_size:
+            for company, company_counts in count_jobs_by_company(pd.DataFrame(chunk)).items():
+                merge_counts(counts.setdefault(company, {}), company_counts)
+            chunk = []
+    if chunk:
+        for company, company_counts in count_jobs_by_company(pd.DataFrame(chunk)).items():
+            merge_counts(counts.setdefault(company, {}), company_counts)
+    return counts
+
+def _dynamodb_value(value: dict):
+    """将DynamoDB属性值（{'S': ...}、{'N': ...} 等）转换为Python值"""
+    if 'S' in value:
+        return value['S']
+    if 'N' in value:
+        return float(value['N'])
+    if 'BOOL' in value:
+        return value['BOOL']
+    return None
+
 class JobDataAnalyzer:
     """职位数据分析器"""
     
-    def __init__(self):
-        self.s3_client = boto3.client('s3')
-        self.dynamodb_client = boto3.client('dynamodb')
+    def __init__(self, s3_client=None, dynamodb_client=None):
+        # 未传入的客户端在第一次使用时才创建，只做本地分析时不需要AWS配置
+        self._s3_client = s3_client
+        self._dynamodb_client = dynamodb_client
+    
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            self._s3_client = boto3.client('s3')
+        return self._s3_client
+    
+    @property
+    def dynamodb_client(self):
+        if self._dynamodb_client is None:
+            self._dynamodb_client = boto3.client('dynamodb')
+        return self._dynamodb_client
         
     def load_data_from_s3(self, bucket_name: str, key: str) -> list:
         """从S3加载数据"""
@@ -33,66 +249,318 @@ class JobDataAnalyzer:
             print(f"从S3加载数据失败: {str(e)}")
             return []
     
-    def load_data_from_dynamodb(self, table_name: str) -> list:
-        """从DynamoDB加载数据"""
+    def list_snapshot_keys(self, bucket_name: str, prefix: str = 'raw_data/', start_date: str = None,
+                           end_date: str = None) -> list:
+        """列出日期范围内（YYYY-MM-DD，含两端）的快照文件，按文件名排序"""
+        start = start_date.replace('-', '') if start_date else None
+        end = end_date.replace('-', '') if end_date else None
+        params = {'Bucket': bucket_name, 'Prefix': prefix}
+        if start:
+            # 文件名按日期排序，直接从开始日期处列出
+            params['StartAfter'] = f"{prefix}jobs_{start}"
+
+        keys = []
+        for page in self.s3_client.get_paginator('list_objects_v2').paginate(**params):
+            for obj in page.get('Contents', []):
+                match = SNAPSHOT_KEY_PATTERN.search(obj['Key'])
+                if not match:
+                    continue
+                day = match.group(1)
+                if (start and day < start) or (end and day > end):
+                    continue
+                keys.append(obj['Key'])
+        return keys
+
+    def load_snapshots_from_s3(self, bucket_name: str, prefix: str = 'raw_data/', start_date: str = None,
+                               end_date: str = None, include_description: bool = False,
+                               max_workers: int = 8) -> pd.DataFrame:
+        """并发加载日期范围内的多个快照，返回紧凑的DataFrame
+
+        每个文件流式解析（JSON或NDJSON，可gzip压缩），公司、地点、部门、团队使用categorical类型，
+        description 默认不加载；snapshot_date 列标记记录来自哪一天的快照。
+        """
         try:
-            response = self.dynamodb_client.scan(TableName=table_name)
-            items = response.get('Items', [])
-            
-            # 转换DynamoDB格式为普通字典
-            data = []
-            for item in items:
-                job_data = {}
-                for key, value_dict in item.items():
-                    if 'S' in value_dict:
-                        job_data[key] = value_dict['S']
-                    elif 'N' in value_dict:
-                        job_data[key] = float(value_dict['N'])
-                data.append(job_data)
-            
-            return data
+            keys = self.list_snapshot_keys(bucket_name, prefix, start_date, end_date)
+            columns = [c for c in SNAPSHOT_COLUMNS if include_description or c != 'description']
+            print(f"加载 {len(keys)} 个快照文件...")
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                frames = [frame for frame in executor.map(
+                    lambda key: self._load_snapshot_frame(bucket_name, key, columns), keys
+                ) if frame is not None]
+
+            if not frames:
+                return pd.DataFrame(columns=columns + ['snapshot_date'])
+            # 合并时统一categorical的类别，避免退化为object列
+            return pd.DataFrame({
+                column: union_categoricals([frame[column] for frame in frames], ignore_order=True)
+                if column in CATEGORICAL_COLUMNS else pd.concat([frame[column] for frame in frames], ignore_index=True)
+                for column in frames[0].columns
+            })
+        except Exception as e:
+            print(f"从S3加载快照失败: {str(e)}")
+            return pd.DataFrame()
+
+    def _load_snapshot_frame(self, bucket_name: str, key: str, columns: list):
+        """流式解析一个快照文件，只保留需要的列"""
+        try:
+            body = self.s3_client.get_object(Bucket=bucket_name, Key=key)['Body']
+            data = {column: [] for column in columns}
+            for job in iter_snapshot_jobs(body.iter_chunks(1024 * 1024), key):
+                for column in columns:
+                    data[column].append(job.get(column))
+
+            frame = pd.DataFrame(data, columns=columns)
+            day = SNAPSHOT_KEY_PATTERN.search(key).group(1)
+            frame['snapshot_date'] = f"{day[:4]}-{day[4:6]}-{day[6:]}"
+            for column in CATEGORICAL_COLUMNS:
+                frame[column] = frame[column].astype('category')
+            return frame
+        except Exception as e:
+            print(f"加载快照 {key} 失败: {str(e)}")
+            return None
+
+    def load_data_from_parquet(self, bucket_name: str = None, prefix: str = 'parquet/jobs', base_dir: str = None,
+                               columns: list = None, start_date: str = None, end_date: str = None,
+                               companies: list = None) -> pd.DataFrame:
+        """从Parquet数据湖加载数据（S3的 bucket_name/prefix 或本地 base_dir/prefix）
+
+        只读取 columns 指定的列；start_date/end_date（YYYY-MM-DD）和 companies 按 dt=/company= 分区裁剪，
+        不匹配的分区文件不会被读取。需要安装 pyarrow。
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+            from pyarrow import fs
+
+            if base_dir:
+                filesystem = fs.LocalFileSystem()
+                root = f"{base_dir.rstrip('/')}/{prefix.strip('/')}"
+            else:
+                filesystem = fs.S3FileSystem()
+                root = f"{bucket_name}/{prefix.strip('/')}"
+
+            partitioning = ds.partitioning(pa.schema([('dt', pa.string()), ('company', pa.string())]), flavor='hive')
+            dataset = ds.dataset(root, filesystem=filesystem, format='parquet', partitioning=partitioning)
+
+            conditions = []
+            if start_date:
+                conditions.append(ds.field('dt') >= start_date)
+            if end_date:
+                conditions.append(ds.field('dt') <= end_date)
+            if companies:
+                conditions.append(ds.field('company').isin(companies))  # 分区目录名中的转义由pyarrow自动解码
+            row_filter = None
+            for condition in conditions:
+                row_filter = condition if row_filter is None else row_filter & condition
+
+            table = dataset.to_table(columns=columns, filter=row_filter)
+            return table.to_pandas()
+        except Exception as e:
+            print(f"从Parquet加载数据失败: {str(e)}")
+            return pd.DataFrame()
+
+    def load_data_from_dynamodb(self, table_name: str, total_segments: int = 4, projection: list = None,
+                                max_workers: int = None) -> pd.DataFrame:
+        """从DynamoDB加载数据
+
+        按 Segment/TotalSegments 并行扫描，每个分段跟随 LastEvaluatedKey 读完所有分页，
+        分页结果直接追加到列缓冲区后构建DataFrame；projection 指定只读取的属性。
+        """
+        try:
+            total_segments = max(1, total_segments)
+            with ThreadPoolExecutor(max_workers=max_workers or total_segments) as executor:
+                segments = list(executor.map(
+                    lambda segment: self._scan_segment(table_name, segment, total_segments, projection),
+                    range(total_segments)
+                ))
+
+            # 合并各分段的列缓冲区，分段中没有出现的列用None补齐
+            names = list(dict.fromkeys(name for columns, _ in segments for name in columns))
+            data = {name: [] for name in names}
+            for columns, count in segments:
+                for name in names:
+                    data[name].extend(columns.get(name) or [None] * count)
+            return pd.DataFrame(data, columns=names)
         except Exception as e:
             print(f"从DynamoDB加载数据失败: {str(e)}")
-            return []
-    
+            return pd.DataFrame()
+
+    def _scan_segment(self, table_name: str, segment: int, total_segments: int, projection: list = None):
+        """扫描一个分段的所有分页，返回 (列缓冲区, 行数)"""
+        params = {'TableName': table_name, 'Segment': segment, 'TotalSegments': total_segments}
+        if projection:
+            # 使用属性名占位符，避免与DynamoDB保留字冲突
+            names = {f'#p{i}': name for i, name in enumerate(projection)}
+            params['ProjectionExpression'] = ', '.join(names)
+            params['ExpressionAttributeNames'] = names
+
+        columns = {}
+        count = 0
+        while True:
+            response = self.dynamodb_client.scan(**params)
+            for item in response.get('Items', []):
+                for name, value in item.items():
+                    column = columns.get(name)
+                    if column is None:
+                        column = columns[name] = [None] * count
+                    column.append(_dynamodb_value(value))
+                count += 1
+                for column in columns.values():
+                    if len(column) < count:
+                        column.append(None)
+
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return columns, count
+            params['ExclusiveStartKey'] = last_key
+
     def analyze_jobs(self, jobs_data: list) -> dict:
         """分析职位数据"""
-        if not jobs_data:
+        if jobs_data is None or len(jobs_data) == 0:
             return {}
         
-        df = pd.DataFrame(jobs_data)
+        df = jobs_data if isinstance(jobs_data, pd.DataFrame) else pd.DataFrame(jobs_data)
         
-        analysis = {
-            'total_jobs': len(df),
-            'unique_companies': df['company_name'].nunique(),
-            'job_titles': df['job_title'].value_counts().head(10).to_dict(),
-            'companies': df['company_name'].value_counts().head(10).to_dict(),
-            'locations': self.extract_locations(df),
-            'departments': df['department'].value_counts().head(10).to_dict(),
-            'teams': df['team'].value_counts().head(10).to_dict(),
-            'scraped_dates': df['scraped_at'].value_counts().head(5).to_dict()
-        }
+        return analysis_from_counts(count_jobs(df))
+    
+    def analyze_local_files(self, patterns: list, chunk_size: int = 5000, processes: int = None) -> dict:
+        """分析本地结果文件（支持通配符）
+
+        每个文件按块流式解析并计数，多个文件在进程池中并行处理，最后合并各文件的计数。
+        """
+        files = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+        if not files:
+            return {}
+        print(f"读取 {len(files)} 个文件: {', '.join(files[:5])}{' ...' if len(files) > 5 else ''}")
         
-        return analysis
+        counts = {}
+        if len(files) == 1 or processes == 1:
+            for path in files:
+                merge_counts(counts, count_local_file(path, chunk_size))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                for file_counts in executor.map(count_local_file, files, [chunk_size] * len(files)):
+                    merge_counts(counts, file_counts)
+        return analysis_from_counts(counts)
     
+    def load_aggregates(self, bucket_name: str = None, key: str = AGGREGATES_KEY, path: str = None) -> dict:
+        """读取每日聚合状态（本地文件 path 或S3），不存在或版本不同时返回空状态
+
+        状态格式: {'version': 3, 'days': {'YYYY-MM-DD': {
+            'snapshots': [已合并的快照文件名],
+            'companies': {公司: {'snapshot': 快照文件名, 'total_jobs': n, 'company_name': {...}, ...}}}}}
+        """
+        empty = {'version': AGGREGATES_VERSION, 'days': {}}
+        try:
+            if path:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            else:
+                response = self.s3_client.get_object(Bucket=bucket_name, Key=key)
+                state = json.loads(response['Body'].read().decode('utf-8'))
+        except (FileNotFoundError, self.s3_client.exceptions.NoSuchKey):
+            return empty
+        if state.get('version') != AGGREGATES_VERSION:
+            print("聚合状态的版本不同，重新统计所有快照")
+            return empty
+        for day in state['days'].values():
+            for counts in day['companies'].values():
+                for field in AGGREGATE_FIELDS:
+                    counts[field] = Counter(counts.get(field, {}))
+        return state
+
+    def save_aggregates(self, state: dict, bucket_name: str = None, key: str = AGGREGATES_KEY, path: str = None):
+        """保存每日聚合状态"""
+        data = json.dumps(state, ensure_ascii=False)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(data)
+        else:
+            self.s3_client.put_object(Bucket=bucket_name, Key=key, Body=data.encode('utf-8'),
+                                      ContentType='application/json')
+
+    def merge_snapshot(self, state: dict, day: str, snapshot: str, counts_by_company: dict) -> bool:
+        """将一个快照按公司的计数并入聚合状态，返回是否为新快照
+
+        每天每家公司只保留最新快照（文件名按时间排序）的计数：断点续跑的各部分和分片覆盖不同的公司，
+        当天的计数为所有公司之和；同一天重跑（重试或手动运行）的快照只替换重复的公司，不会重复累加。
+        重复合并同一快照是安全的。
+        """
+        entry = state['days'].setdefault(day, {'snapshots': [], 'companies': {}})
+        for company, counts in counts_by_company.items():
+            current = entry['companies'].get(company)
+            if current and current['snapshot'] > snapshot:
+                continue
+            entry['companies'][company] = {
+                'snapshot': snapshot,
+                'total_jobs': counts['total_jobs'],
+                **{field: Counter(counts.get(field, {})) for field in AGGREGATE_FIELDS}
+            }
+        if snapshot in entry['snapshots']:
+            return False
+        entry['snapshots'].append(snapshot)
+        return True
+
+    def update_aggregates(self, state: dict, bucket_name: str, prefix: str = 'raw_data/', start_date: str = None,
+                          end_date: str = None, max_workers: int = 8) -> list:
+        """把S3中尚未合并的快照并入聚合状态，返回新合并的快照
+
+        默认只列出聚合状态中最后一天及之后的快照，每个快照流式解析并按块计数，不加载历史数据。
+        """
+        start_date = start_date or max(state['days'], default=None)
+        pending = {}
+        for key in self.list_snapshot_keys(bucket_name, prefix, start_date, end_date):
+            day = SNAPSHOT_KEY_PATTERN.search(key).group(1)
+            day = f"{day[:4]}-{day[4:6]}-{day[6:]}"
+            if key not in state['days'].get(day, {}).get('snapshots', []):
+                pending[key] = day
+
+        def count_snapshot(key):
+            try:
+                body = self.s3_client.get_object(Bucket=bucket_name, Key=key)['Body']
+                return count_company_stream(iter_snapshot_jobs(body.iter_chunks(1024 * 1024), key))
+            except Exception as e:
+                print(f"统计快照 {key} 失败: {str(e)}")
+                return None
+
+        merged = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for (key, day), counts in zip(pending.items(), executor.map(count_snapshot, pending)):
+                if counts is not None and self.merge_snapshot(state, day, key, counts):
+                    merged.append(key)
+        print(f"合并 {len(merged)} 个新快照，聚合状态共 {len(state['days'])} 天")
+        return merged
+
+    def analyze_window(self, state: dict, start_date: str = None, end_date: str = None) -> dict:
+        """由聚合状态生成日期范围内（YYYY-MM-DD，含两端）的分析结果，不读取原始职位
+
+        各字段为窗口内每天各公司最新快照计数之和；scraped_dates / daily_jobs 为每天的职位数。
+        """
+        days = sorted(day for day in state['days']
+                      if (not start_date or day >= start_date) and (not end_date or day <= end_date))
+        if not days:
+            return {}
+
+        counts = {field: Counter() for field in AGGREGATE_FIELDS}
+        counts['total_jobs'] = 0
+        counts['scraped_dates'] = Counter()
+        for day in days:
+            for company_counts in state['days'][day]['companies'].values():
+                for field in AGGREGATE_FIELDS:
+                    counts[field].update(company_counts[field])
+                counts['total_jobs'] += company_counts['total_jobs']
+                counts['scraped_dates'][day] += company_counts['total_jobs']
+
+        analysis = analysis_from_counts(counts)
+        if analysis:
+            analysis['daily_jobs'] = {day: counts['scraped_dates'][day] for day in days}
+            analysis['window'] = {'start': days[0], 'end': days[-1], 'days': len(days)}
+        return analysis
+
     def extract_locations(self, df: pd.DataFrame) -> dict:
         """提取和统计地点信息"""
-        locations = []
-        for location in df['location'].dropna():
-            # 提取澳洲城市
-            australian_cities = ['sydney', 'melbourne', 'brisbane', 'perth', 'adelaide', 'canberra', 'darwin', 'hobart']
-            location_lower = location.lower()
-            
-            for city in australian_cities:
-                if city in location_lower:
-                    locations.append(city.title())
-                    break
-            else:
-                # 如果没有找到澳洲城市，保留原始地点
-                if location.strip():
-                    locations.append(location.strip())
-        
-        return Counter(locations).most_common(10)
+        return location_counts(df['location']).most_common(10)
     
     def create_visualizations(self, analysis: dict, output_dir: str = 'analysis_output'):
         """创建可视化图表"""
@@ -152,16 +620,34 @@ class JobDataAnalyzer:
             plt.tight_layout()
             plt.savefig(f'{output_dir}/departments_distribution.png', dpi=300, bbox_inches='tight')
             plt.close()
+        
+        # 5. 每日职位数趋势（按日期范围分析时）
+        if len(analysis.get('daily_jobs') or {}) > 1:
+            plt.figure(figsize=(12, 6))
+            days = list(analysis['daily_jobs'].keys())
+            counts = list(analysis['daily_jobs'].values())
+            
+            plt.plot(pd.to_datetime(days), counts, marker='o', markersize=3)
+            plt.title('每日职位数趋势')
+            plt.xlabel('日期')
+            plt.ylabel('职位数量')
+            plt.gcf().autofmt_xdate()
+            plt.tight_layout()
+            plt.savefig(f'{output_dir}/daily_jobs_trend.png', dpi=300, bbox_inches='tight')
+            plt.close()
     
     def generate_report(self, analysis: dict, output_file: str = 'analysis_report.md'):
         """生成分析报告"""
+        window = analysis.get('window')
+        window_line = (f"- **统计区间**: {window['start']} ~ {window['end']}（{window['days']} 天，计数为每天各公司最新快照之和）\n"
+                       if window else '')
         report = f"""# Lever澳洲职位数据分析报告
 
 ## 📊 数据概览
 
 - **总职位数量**: {analysis.get('total_jobs', 0)}
 - **涉及公司数量**: {analysis.get('unique_companies', 0)}
-
+{window_line}
 ## 🏢 公司分布 (Top 10)
 
 """
@@ -194,6 +680,11 @@ class JobDataAnalyzer:
             for date, count in list(analysis['scraped_dates'].items())[:5]:
                 report += f"- {date}: {count} 个职位\n"
         
+        if len(analysis.get('daily_jobs') or {}) > 1:
+            report += "\n## 📈 每日职位数\n\n"
+            for day, count in analysis['daily_jobs'].items():
+                report += f"- {day}: {count} 个职位\n"
+        
         report += f"\n---\n\n*报告生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*"
         
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -205,17 +696,28 @@ def main():
     """主函数"""
     analyzer = JobDataAnalyzer()
     
-    # 从本地文件加载数据（如果有的话）
-    try:
-        with open('test_results_*.json', 'r', encoding='utf-8') as f:
-            jobs_data = json.load(f)
-    except FileNotFoundError:
-        print("未找到本地数据文件，请先运行测试脚本")
-        return
-    
-    # 分析数据
-    print("🔍 开始分析职位数据...")
-    analysis = analyzer.analyze_jobs(jobs_data)
+    if sys.argv[1:2] == ['aggregates']:
+        # 增量分析：python data_analysis.py aggregates <bucket> [天数]
+        # 只统计新快照并入S3中的每日聚合状态，报告由最近N天的聚合生成
+        bucket_name = sys.argv[2]
+        window_days = int(sys.argv[3]) if len(sys.argv) > 3 else 90
+        state = analyzer.load_aggregates(bucket_name)
+        if analyzer.update_aggregates(state, bucket_name):
+            analyzer.save_aggregates(state, bucket_name)
+        latest = max(state['days'], default=None)
+        start_date = (pd.Timestamp(latest) - pd.Timedelta(days=window_days - 1)).strftime('%Y-%m-%d') if latest else None
+        print("🔍 开始分析职位数据...")
+        analysis = analyzer.analyze_window(state, start_date)
+    else:
+        # 从本地文件加载数据，可通过命令行传入文件或通配符：python data_analysis.py 'results/*.json'
+        patterns = sys.argv[1:] or ['test_results_*.json']
+        if not any(glob.glob(pattern) for pattern in patterns):
+            print("未找到本地数据文件，请先运行测试脚本")
+            return
+        
+        # 分析数据
+        print("🔍 开始分析职位数据...")
+        analysis = analyzer.analyze_local_files(patterns)
     
     if analysis:
         # 生成可视化
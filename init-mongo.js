@@ -7,6 +7,15 @@ db = db.getSiblingDB('jobscraper');
 // 创建jobsprofiles集合
 db.createCollection('jobsprofiles');
 
+// job_id 由职位URL生成，唯一索引保证重复接收同一职位时只更新不新增
+// 已有旧格式数据（公司_职位_时间，会重复）时先运行 python backend_api_example.py migrate-job-ids，
+// 这里创建失败不影响后面的索引
+try {
+  db.jobsprofiles.createIndex({ "job_id": 1 }, { unique: true });
+} catch (e) {
+  print('创建job_id唯一索引失败，请运行 migrate-job-ids 后重试: ' + e);
+}
+
 // 创建索引以提高查询性能
 db.jobsprofiles.createIndex({ "company_name": 1 });
 db.jobsprofiles.createIndex({ "location": 1 });
@@ -18,6 +27,37 @@ db.jobsprofiles.createIndex({ "source": 1 });
 db.jobsprofiles.createIndex({ "company_name": 1, "scraped_at": -1 });
 db.jobsprofiles.createIndex({ "location": 1, "scraped_at": -1 });
 
+// 游标分页按 (scraped_at, _id) 倒序
+db.jobsprofiles.createIndex({ "scraped_at": -1, "_id": -1 });
+
+// 全文搜索（/api/jobs/search）：带权重的文本索引
+db.jobsprofiles.createIndex(
+  { "job_title": "text", "company_name": "text", "team": "text", "department": "text", "requirements": "text", "description": "text" },
+  {
+    name: "job_text_search",
+    weights: { "job_title": 10, "company_name": 5, "team": 3, "department": 3, "requirements": 2, "description": 1 },
+    default_language: "english",
+    language_override: "text_language"
+  }
+);
+
+// 公司/地点筛选：规范化小写键（精确/前缀匹配）和词数组（多键索引，按词匹配）
+db.jobsprofiles.createIndex({ "company_key": 1, "scraped_at": -1, "_id": -1 });
+db.jobsprofiles.createIndex({ "company_tokens": 1, "scraped_at": -1, "_id": -1 });
+db.jobsprofiles.createIndex({ "location_key": 1, "scraped_at": -1, "_id": -1 });
+db.jobsprofiles.createIndex({ "location_tokens": 1, "scraped_at": -1, "_id": -1 });
+
+// 已处理请求的幂等键（重复投递时返回第一次的结果），一天后自动过期
+db.createCollection('ingest_requests');
+db.ingest_requests.createIndex({ "created_at": 1 }, { expireAfterSeconds: 86400 });
+
+// 物化的统计文档（/api/stats），接收职位时增量更新
+db.createCollection('job_stats');
+
+// 异步接收的批次状态，一天后自动过期
+db.createCollection('ingest_batches');
+db.ingest_batches.createIndex({ "created_at": 1 }, { expireAfterSeconds: 86400 });
+
 print('MongoDB初始化完成');
 print('数据库: jobscraper');
 print('集合: jobsprofiles');
@@ -1,16 +1,39 @@
 import json
+import gzip
+import asyncio
 import boto3
 import requests
 from bs4 import BeautifulSoup
 import time
 import re
+import itertools
 from datetime import datetime
 import os
+from contextlib import contextmanager, nullcontext
 from utils.scraper_utils import LeverScraperUtils
+from utils.async_fetcher import AsyncFetcher
+from utils.lever_api import LeverPostingsClient, posting_to_job
+from utils.job_extractor import JobPageExtractor, PARSED_VERSION
+from utils.keyword_matcher import AustralianClassifier, AUSTRALIAN_KEYWORDS, KNOWN_AUSTRALIAN_COMPANIES
+from utils.http_cache import build_cache_from_env
+from utils.state_store import PostingStateStore, IncrementalRun, extract_posting_id
+from utils.checkpoint import DeadlineBudget, ContinuationCursor
+from utils.s3_stream import NDJSONSnapshotSink
+from utils.parquet_sink import ParquetPartitionSink
+from utils.delivery import BackendDeliveryClient
+from utils.sharding import (
+    partition_companies, shard_partial_key, merge_claim_key, LocalOutputStore, S3OutputStore,
+    LocalShardExecutor, LambdaShardExecutor
+)
 
 class LeverJobScraper:
-    def __init__(self):
+    def __init__(self, extractor_backend='html', cache=None):
         self.base_url = "https://jobs.lever.co"
+        # 提取后端: html（列表页+详情页解析）或 json（postings API，每家公司约一次请求）
+        self.extractor_backend = extractor_backend
+        # 可选的条件请求缓存（ConditionalRequestCache），未变化的页面不重新下载和解析
+        self.cache = cache
+        self.parser_version = PARSED_VERSION
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -20,71 +43,47 @@ class LeverJobScraper:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         })
+        self.postings_client = LeverPostingsClient(session=self.session)
+        self.extractor = JobPageExtractor()
         
         # 澳大利亚关键词用于识别澳大利亚公司
-        self.australian_keywords = [
-            'australia', 'australian', 'sydney', 'melbourne', 'brisbane', 
-            'perth', 'adelaide', 'canberra', 'darwin', 'hobart',
-            'nsw', 'vic', 'qld', 'wa', 'sa', 'tas', 'nt', 'act'
-        ]
+        self.australian_keywords = list(AUSTRALIAN_KEYWORDS)
         
         # 已知的澳大利亚公司列表
-        self.known_australian_companies = [
-            'atlassian', 'canva', 'afterpay', 'xero', 'wisetech', 
-            'seek', 'carsales', 'realestate', 'domain', 'rea-group',
-            'commonwealth-bank', 'anz', 'westpac', 'nab', 'macquarie',
-            'telstra', 'optus', 'tpg', 'woolworths', 'coles',
-            'bhp', 'rio-tinto', 'fortescue', 'woodside', 'origin',
-            'qantas', 'virgin-australia', 'jetstar', 'flight-centre',
-            'medibank', 'bupa', 'nib', 'ahm', 'hcf',
-            'australian-super', 'rest', 'hostplus', 'united-super',
-            'airtasker', 'hipages', 'service-seeking', 'oneflare',
-            'prospa', 'societyone', 'ratesetter', 'money-me',
-            'zip', 'humm', 'laybuy', 'klarna', 'affirm',
-            'culture-amp', 'safetyculture', 'enboard', 'deputy',
-            'myob', 'reckon', 'sage', 'intuit', 'wave',
-            'square', 'stripe', 'paypal', 'adyen', 'braintree'
-        ]
+        self.known_australian_companies = list(KNOWN_AUSTRALIAN_COMPANIES)
+        
+        # 关键词和公司列表编译为单个匹配器，一次扫描完成判断
+        self.classifier = AustralianClassifier(self.australian_keywords, self.known_australian_companies)
 
     def is_australian_company(self, company_name, company_path):
         """判断是否为澳大利亚公司"""
         if not company_name:
             return False
-            
-        company_lower = company_name.lower()
-        company_path_lower = company_path.lower() if company_path else ""
-        
-        # 首先检查已知的澳大利亚公司列表
-        for known_company in self.known_australian_companies:
-            if known_company in company_lower or known_company in company_path_lower:
-                return True
-        
-        # 然后检查关键词
-        for keyword in self.australian_keywords:
-            if keyword in company_lower or keyword in company_path_lower:
-                return True
-                
-        return False
+        
+        return self.classifier.match_company(company_name, company_path) is not None
+
+    def get_company_jobs(self, company_path, incremental=None):
+        """获取指定公司的所有职位
 
-    def get_company_jobs(self, company_path):
-        """获取指定公司的所有职位"""
+        传入 incremental（IncrementalRun）时只抓取新增或列表项发生变化的职位详情，
+        未变化的职位直接复用上一次快照中的数据。
+        """
+        if self.extractor_backend == 'json':
+            return self.get_company_jobs_from_api(company_path, incremental)
+        
         jobs = []
         try:
             url = f"{self.base_url}/{company_path}"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            job_links = soup.find_all('a', href=re.compile(r'/job/'))
+            listing = self._get_parsed(url, self.parse_job_listing, 'job_listing')
+            if incremental is not None:
+                jobs, listing = incremental.plan(company_path, listing)
             
-            for link in job_links:
-                job_url = link.get('href')
-                if job_url.startswith('/'):
-                    job_url = f"{self.base_url}{job_url}"
-                
+            for job_url, entry_text in listing:
                 job_data = self.get_job_details(job_url, company_path)
                 if job_data:
                     jobs.append(job_data)
+                    if incremental is not None:
+                        incremental.record(company_path, job_url, entry_text, job_data)
                     time.sleep(1)  # 礼貌延迟
                     
         except Exception as e:
@@ -92,49 +91,203 @@ class LeverJobScraper:
             
         return jobs
 
+    def get_company_jobs_from_api(self, company_path, incremental=None):
+        """通过postings JSON API获取指定公司的所有职位"""
+        try:
+            jobs = self.postings_client.get_company_jobs(company_path)
+        except Exception as e:
+            print(f"通过API获取公司 {company_path} 职位时出错: {str(e)}")
+            return []
+        
+        if incremental is not None:
+            incremental.record_listed_jobs(company_path, jobs)
+        return jobs
+
+    def get_companies_jobs_concurrent(self, company_paths, max_concurrency=20, per_host_limit=4,
+                                      requests_per_second=1.0, burst=None, incremental=None):
+        """并发获取多家公司的职位，返回 {company_path: jobs}
+
+        用全局/单主机并发上限和令牌桶礼貌预算代替逐个请求之间的固定延迟，
+        返回的职位字典与 get_job_details 相同。
+        """
+        with self.concurrent_session(max_concurrency, per_host_limit, requests_per_second, burst) as crawl:
+            return crawl(company_paths, incremental)
+
+    @contextmanager
+    def concurrent_session(self, max_concurrency=20, per_host_limit=4, requests_per_second=1.0, burst=None):
+        """打开并发抓取会话，返回 crawl(company_paths, incremental=None) -> {company_path: jobs}
+
+        会话内的多个批次共享同一个事件循环、连接池和每个主机的令牌桶，批次之间不会重置限速。
+        """
+        loop = asyncio.new_event_loop()
+        fetcher = loop.run_until_complete(self._open_fetcher(max_concurrency, per_host_limit, requests_per_second, burst))
+        try:
+            yield lambda company_paths, incremental=None, should_stop=None: loop.run_until_complete(
+                self._crawl_companies(fetcher, company_paths, incremental, should_stop)
+            )
+        finally:
+            loop.run_until_complete(fetcher.__aexit__(None, None, None))
+            loop.close()
+
+    async def _open_fetcher(self, max_concurrency, per_host_limit, requests_per_second, burst):
+        # 在会话的事件循环内创建，信号量和令牌桶绑定到该循环
+        fetcher = AsyncFetcher(
+            headers=dict(self.session.headers),
+            max_concurrency=max_concurrency,
+            per_host_limit=per_host_limit,
+            requests_per_second=requests_per_second,
+            burst=burst,
+        )
+        return await fetcher.__aenter__()
+
+    async def _crawl_companies(self, fetcher, company_paths, incremental, should_stop=None, check_interval=0.5):
+        """并发抓取一批公司，返回 {company_path: jobs}
+
+        传入 should_stop 时每隔 check_interval 秒检查一次，返回True后取消尚未完成的公司，
+        返回的字典只包含已完成的公司。
+        """
+        tasks = {asyncio.ensure_future(self._crawl_company(fetcher, c, incremental)): c for c in company_paths}
+        results = {}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=check_interval if should_stop else None)
+                for task in done:
+                    results[tasks[task]] = task.result()
+                if pending and should_stop is not None and should_stop():
+                    print(f"剩余执行时间不足，取消 {len(pending)} 家未完成的公司")
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return {c: results[c] for c in company_paths if c in results}
+
+    async def _crawl_company(self, fetcher, company_path, incremental=None):
+        """并发抓取单个公司的列表页和所有职位详情页"""
+        if self.extractor_backend == 'json':
+            return await self._crawl_company_api(fetcher, company_path, incremental)
+        
+        listing = await self._fetch_parsed(fetcher, f"{self.base_url}/{company_path}", self.parse_job_listing, 'job_listing')
+        if listing is None:
+            return []
+
+        jobs = []
+        if incremental is not None:
+            jobs, listing = incremental.plan(company_path, listing)
+        details = await asyncio.gather(*(
+            self._fetch_parsed(
+                fetcher, job_url,
+                lambda html, job_url=job_url: self.parse_job_details(html, job_url, company_path),
+                'job_details'
+            ) for job_url, _ in listing
+        ))
+
+        for (job_url, entry_text), job_data in zip(listing, details):
+            if job_data:
+                # 缓存命中时解析结果来自之前的抓取，需要刷新抓取时间
+                job_data['scraped_at'] = datetime.now().isoformat()
+                jobs.append(job_data)
+                if incremental is not None:
+                    incremental.record(company_path, job_url, entry_text, job_data)
+        return jobs
+
+    async def _fetch_parsed(self, fetcher, url, parse, namespace):
+        """并发模式下获取页面并解析，配置了缓存时使用条件请求；失败时返回None"""
+        if self.cache is not None:
+            return await self.cache.fetch_async(fetcher, url, parse, namespace=namespace, version=self.parser_version)
+        body = await fetcher.fetch(url)
+        return None if body is None else parse(body)
+
+    async def _crawl_company_api(self, fetcher, company_path, incremental=None):
+        """通过postings JSON API分页抓取单个公司的职位"""
+        client = self.postings_client
+        jobs = []
+        skip = 0
+        while True:
+            body = await fetcher.fetch(client.page_url(company_path, skip))
+            if body is None:
+                return []
+            # 与同步模式一致：单个公司返回错误页或格式异常的职位时只跳过该公司，不影响同一批的其他公司
+            try:
+                page = json.loads(body)
+                if not isinstance(page, list):
+                    raise ValueError(f"返回的不是职位数组: {type(page).__name__}")
+                jobs.extend(posting_to_job(posting, company_path) for posting in page)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                print(f"通过API获取公司 {company_path} 职位时出错: {str(e)}")
+                return []
+            if client.is_last_page(page):
+                break
+            skip += len(page)
+        
+        if incremental is not None:
+            incremental.record_listed_jobs(company_path, jobs)
+        return jobs
+
+    def parse_job_listing(self, html):
+        """从公司列表页解析职位链接及列表项文本，返回 [(job_url, entry_text)]
+
+        列表项文本（标题、地点、团队等）用于增量模式下的变更检测。
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        listing = []
+        for link in soup.find_all('a', href=re.compile(r'/job/')):
+            job_url = link.get('href')
+            if job_url.startswith('/'):
+                job_url = f"{self.base_url}{job_url}"
+            listing.append((job_url, link.get_text(' ', strip=True)))
+        return listing
+
     def get_job_details(self, job_url, company_path):
         """获取职位详细信息"""
         try:
-            response = self.session.get(job_url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # 提取职位信息
-            job_title = self.extract_text(soup.find('h1')) or self.extract_text(soup.find('h2'))
-            company_name = self.extract_text(soup.find('div', class_='company-name')) or company_path
-            location = self.extract_text(soup.find('div', class_='location')) or self.extract_text(soup.find('span', class_='location'))
+            job_data = self._get_parsed(
+                job_url,
+                lambda html: self.parse_job_details(html, job_url, company_path),
+                'job_details'
+            )
+            if job_data:
+                # 缓存命中时解析结果来自之前的抓取，需要刷新抓取时间
+                job_data['scraped_at'] = datetime.now().isoformat()
+            return job_data
             
-            # 提取部门信息
-            department = self.extract_text(soup.find('div', class_='department')) or self.extract_text(soup.find('span', class_='department'))
-            team = self.extract_text(soup.find('div', class_='team')) or self.extract_text(soup.find('span', class_='team'))
-            
-            # 提取职位描述
-            description_elem = soup.find('div', class_='description') or soup.find('div', class_='content') or soup.find('div', class_='job-description')
-            description = self.extract_text(description_elem) if description_elem else ""
-            
-            # 提取其他信息
-            requirements = self.extract_text(soup.find('div', class_='requirements'))
-            benefits = self.extract_text(soup.find('div', class_='benefits'))
+        except Exception as e:
+            print(f"获取职位详情时出错 {job_url}: {str(e)}")
+            return None
+
+    def parse_job_details(self, html, job_url, company_path):
+        """从职位详情页解析职位信息"""
+        try:
+            fields = self.extractor.extract(html)
             
             return {
-                'job_title': job_title,
-                'company_name': company_name,
+                'job_title': fields['job_title'],
+                'company_name': fields['company_name'] or company_path,
                 'company_path': company_path,
-                'location': location,
-                'department': department,
-                'team': team,
-                'description': description,
-                'requirements': requirements,
-                'benefits': benefits,
+                'location': fields['location'],
+                'department': fields['department'],
+                'team': fields['team'],
+                'description': fields['description'],
+                'requirements': fields['requirements'],
+                'benefits': fields['benefits'],
                 'job_url': job_url,
                 'scraped_at': datetime.now().isoformat()
             }
             
         except Exception as e:
-            print(f"获取职位详情时出错 {job_url}: {str(e)}")
+            print(f"解析职位详情时出错 {job_url}: {str(e)}")
             return None
 
+    def _get_parsed(self, url, parse, namespace):
+        """获取页面并解析，配置了缓存时使用条件请求"""
+        if self.cache is not None:
+            return self.cache.fetch(self.session, url, parse, namespace=namespace, timeout=10,
+                                    version=self.parser_version)
+        response = self.session.get(url, timeout=10)
+        response.raise_for_status()
+        return parse(response.content)
+
     def extract_text(self, element):
         """安全提取文本内容"""
         if element:
@@ -189,77 +342,380 @@ def save_to_s3(data, bucket_name, key):
         print(f"保存到S3时出错: {str(e)}")
         return False
 
-def call_backend_api(job_data, api_endpoint):
-    """调用后端API将数据发送到MongoDB"""
+def load_snapshot_jobs(bucket_name, key):
+    """从S3加载之前保存的完整快照（JSON或gzip NDJSON），返回 {posting_id: job}"""
     try:
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {os.environ.get("API_TOKEN", "")}'
-        }
-        
-        # 准备发送到API的数据
-        api_payload = {
-            'table': 'jobsprofiles',
-            'data': job_data
-        }
+        s3_client = boto3.client('s3')
+        response = s3_client.get_object(Bucket=bucket_name, Key=key)
+        if key.endswith('.ndjson.gz'):
+            with gzip.GzipFile(fileobj=response['Body']) as f:
+                jobs = (json.loads(line) for line in f if line.strip())
+                return {extract_posting_id(job.get('job_url', '')): job for job in jobs}
+        data = json.loads(response['Body'].read().decode('utf-8'))
+        return {extract_posting_id(job.get('job_url', '')): job for job in data.get('jobs', [])}
         
-        response = requests.post(
+    except Exception as e:
+        print(f"加载上一次快照时出错: {str(e)}")
+        return {}
+
+def call_backend_api(job_data, api_endpoint):
+    """调用后端API将数据发送到MongoDB（分块、gzip压缩、并发发送，失败的分块带幂等键重试）"""
+    try:
+        client = BackendDeliveryClient(
             api_endpoint,
-            json=api_payload,
-            headers=headers,
-            timeout=30
+            api_token=os.environ.get("API_TOKEN", ""),
+            max_chunk_bytes=int(os.environ.get('DELIVERY_CHUNK_KB', '512')) * 1024,
+            max_workers=int(os.environ.get('DELIVERY_CONCURRENCY', '4')),
+            max_retries=int(os.environ.get('DELIVERY_MAX_RETRIES', '3'))
         )
+        report = client.deliver(job_data, table='jobsprofiles')
+        
+        for chunk in report['chunks']:
+            print(f"分块 {chunk['index']}: {chunk['jobs']} 条，{chunk['raw_bytes']} -> {chunk['bytes_sent']} 字节，"
+                  f"{chunk['latency_ms']} ms，尝试 {chunk['attempts']} 次，状态 {chunk['status']}"
+                  + (f"，批次 {chunk['batch_id']}" if chunk.get('batch_id') else ''))
         
-        if response.status_code == 200:
-            print(f"数据已成功发送到后端API: {len(job_data)} 条记录")
+        if report['success']:
+            print(f"数据已成功发送到后端API: {len(job_data)} 条记录（{len(report['chunks'])} 个分块）")
             return True
         else:
-            print(f"API调用失败: {response.status_code} - {response.text}")
+            failed = [c for c in report['chunks'] if not c['ok']]
+            print(f"API调用失败: {len(failed)} 个分块未送达，已送达 {report['delivered_jobs']}/{len(job_data)} 条记录"
+                  f" - {failed[0]['status']} {failed[0]['error']}")
             return False
             
     except Exception as e:
         print(f"调用后端API时出错: {str(e)}")
         return False
 
+def build_scraper(s3_bucket):
+    """根据环境变量创建爬虫"""
+    return LeverJobScraper(
+        extractor_backend=os.environ.get('EXTRACTOR_BACKEND', 'html'),
+        cache=build_cache_from_env(s3_bucket)
+    )
+
+def scrape_companies(scraper, companies, incremental=None, budget=None, sinks=(), keep_jobs=True):
+    """爬取公司列表中的所有职位，返回 (all_jobs, australian_jobs, processed)
+
+    传入 budget（DeadlineBudget）时，剩余时间不足以完成下一批公司就提前停止，
+    processed 为已完成的公司数量（按列表顺序）。
+    sinks（NDJSONSnapshotSink、ParquetPartitionSink）中的每个输出在每家公司爬取后立即写入；
+    keep_jobs=False 时职位不在内存中累积，返回的 all_jobs 为空列表。
+    """
+    # 并发模式下按批次抓取，批次内由令牌桶控制请求速率
+    concurrent = os.environ.get('FETCH_MODE', 'sync') == 'async'
+    batch_size = int(os.environ.get('FETCH_BATCH_SIZE', '50')) if concurrent else 1
+    
+    all_jobs = []
+    australian_jobs = []
+    processed = 0
+    
+    # 整个调用共用一个并发抓取会话，每个主机的令牌桶不会在批次之间重置
+    session = scraper.concurrent_session(
+        max_concurrency=int(os.environ.get('FETCH_CONCURRENCY', '20')),
+        per_host_limit=int(os.environ.get('FETCH_PER_HOST_LIMIT', '4')),
+        requests_per_second=float(os.environ.get('FETCH_RATE', '1.0')),
+    ) if concurrent else nullcontext()
+    
+    with session as crawl:
+        for start in range(0, len(companies), batch_size):
+            if budget is not None and not budget.can_start_next():
+                print(f"剩余执行时间不足，停止处理新公司（已完成 {processed}/{len(companies)}）")
+                break
+            
+            batch = companies[start:start + batch_size]
+            started = time.monotonic()
+            
+            # 并发模式下批次内也检查预算：进入预留时间后取消未完成的公司
+            should_stop = budget.expired if budget is not None else None
+            jobs_by_company = crawl(batch, incremental, should_stop) if crawl is not None else None
+            
+            completed = batch
+            if jobs_by_company is not None and len(jobs_by_company) < len(batch):
+                # 断点游标按列表顺序记录进度，只保留从批次开头连续完成的公司，其余的下一次执行重新处理
+                completed = list(itertools.takewhile(lambda company: company in jobs_by_company, batch))
+            
+            # 爬取每个公司的职位
+            for i, company in enumerate(completed, start + 1):
+                print(f"处理公司 {i}/{len(companies)}: {company}")
+                
+                if jobs_by_company is None:
+                    jobs = scraper.get_company_jobs(company, incremental)
+                    time.sleep(2)  # 礼貌延迟
+                else:
+                    jobs = jobs_by_company.get(company, [])
+                
+                # 过滤澳大利亚职位
+                matches = scraper.classifier.classify_batch(jobs, fields=('company_name', 'company_path'))
+                company_australian_jobs = [job for job, match in zip(jobs, matches) if match and job.get('company_name')]
+                australian_jobs.extend(company_australian_jobs)
+                
+                for sink in sinks:
+                    sink.add(jobs, company_australian_jobs)
+                if keep_jobs:
+                    all_jobs.extend(jobs)
+            
+            processed += len(completed)
+            if len(completed) < len(batch):
+                print(f"本批次完成 {len(completed)}/{len(batch)} 家公司，停止处理新公司（已完成 {processed}/{len(companies)}）")
+                break
+            if budget is not None:
+                budget.record(time.monotonic() - started)
+    
+    return all_jobs, australian_jobs, processed
+
+def build_output_store(output_dir, s3_bucket):
+    """分片模式的输出存储：指定 output_dir 时写本地目录，否则写S3"""
+    if output_dir:
+        return LocalOutputStore(output_dir)
+    return S3OutputStore(s3_bucket)
+
+def run_shard_worker(event):
+    """分片worker：爬取分片内的公司并写出部分结果"""
+    s3_bucket = os.environ.get('S3_BUCKET_NAME', 'lever-jobs-data')
+    store = build_output_store(event.get('output_dir'), s3_bucket)
+    run_id = event['run_id']
+    shard_id = event['shard_id']
+    
+    scraper = build_scraper(s3_bucket)
+    all_jobs, australian_jobs, _ = scrape_companies(scraper, event['companies'])
+    
+    partial_key = shard_partial_key(run_id, shard_id)
+    store.write_json(partial_key, {
+        'run_id': run_id,
+        'shard_id': shard_id,
+        'scraped_at': datetime.now().isoformat(),
+        'companies_processed': event['companies'],
+        'jobs': all_jobs,
+        'australian_jobs': australian_jobs
+    })
+    print(f"分片 {shard_id} 完成: {len(all_jobs)} 个职位，已写入 {store.describe(partial_key)}")
+    
+    result = {
+        'shard_id': shard_id,
+        'total_jobs': len(all_jobs),
+        'australian_jobs': len(australian_jobs),
+        'partial_key': partial_key
+    }
+    
+    # Lambda扇出时由看到所有分片都已完成的worker负责合并；多个worker同时完成时，
+    # 只有成功写入合并声明（条件写入）的worker执行合并，避免重复调用后端API。
+    # 合并失败时可以用 mode=merge 手动重新合并。
+    if event.get('merge_when_complete'):
+        finished = len(store.list_keys(f"partials/{run_id}/"))
+        if finished >= event['shard_count'] and store.claim(merge_claim_key(run_id), {
+            'shard_id': shard_id,
+            'claimed_at': datetime.now().isoformat()
+        }):
+            result['merge'] = merge_shards(run_id, store)
+    
+    return result
+
+def merge_shards(run_id, store):
+    """合并所有分片的部分结果，生成原始数据和澳大利亚职位快照"""
+    all_jobs = []
+    australian_jobs = []
+    companies = []
+    for key in store.list_keys(f"partials/{run_id}/"):
+        partial = store.read_json(key)
+        all_jobs.extend(partial['jobs'])
+        australian_jobs.extend(partial['australian_jobs'])
+        companies.extend(partial['companies_processed'])
+    
+    raw_data_key = f"raw_data/jobs_{run_id}.json"
+    store.write_json(raw_data_key, {
+        'scraped_at': datetime.now().isoformat(),
+        'total_jobs': len(all_jobs),
+        'australian_jobs': len(australian_jobs),
+        'companies_processed': companies,
+        'jobs': all_jobs
+    })
+    
+    australian_data_key = None
+    if australian_jobs:
+        australian_data_key = f"australian_jobs/jobs_{run_id}.json"
+        store.write_json(australian_data_key, {
+            'scraped_at': datetime.now().isoformat(),
+            'total_jobs': len(australian_jobs),
+            'jobs': australian_jobs
+        })
+    
+    print(f"分片合并完成: {len(companies)} 家公司，{len(all_jobs)} 个职位，其中 {len(australian_jobs)} 个澳大利亚职位")
+    
+    api_endpoint = os.environ.get('BACKEND_API_ENDPOINT', '')
+    if australian_jobs and api_endpoint:
+        call_backend_api(australian_jobs, api_endpoint)
+    
+    return {
+        'run_id': run_id,
+        'total_jobs': len(all_jobs),
+        'australian_jobs': len(australian_jobs),
+        'companies_processed': len(companies),
+        'raw_data_key': raw_data_key,
+        'australian_data_key': australian_data_key
+    }
+
+def run_coordinator(event, context):
+    """协调者：发现公司并划分分片，分发给并行worker
+
+    executor 为 local 时使用本地进程池执行并直接合并；为 lambda 时异步调用本函数的worker模式。
+    """
+    s3_bucket = os.environ.get('S3_BUCKET_NAME', 'lever-jobs-data')
+    run_id = event.get('run_id') or datetime.now().strftime('%Y%m%d_%H%M%S')
+    shard_count = int(event.get('shard_count') or os.environ.get('SHARD_COUNT', '8'))
+    executor_type = event.get('executor') or os.environ.get('SHARD_EXECUTOR', 'lambda')
+    output_dir = event.get('output_dir') or os.environ.get('SHARD_OUTPUT_DIR')
+    
+    companies = event.get('companies') or build_scraper(s3_bucket).discover_companies()
+    shards = partition_companies(companies, shard_count)
+    print(f"发现 {len(companies)} 家公司，划分为 {len(shards)} 个分片")
+    
+    if executor_type == 'local':
+        executor = LocalShardExecutor(max_workers=int(os.environ.get('SHARD_LOCAL_WORKERS', '0')) or None)
+    else:
+        executor = LambdaShardExecutor(function_name=context.function_name)
+    
+    shard_events = [{
+        'mode': 'worker',
+        'run_id': run_id,
+        'shard_id': shard_id,
+        'shard_count': len(shards),
+        'companies': shard,
+        'output_dir': output_dir,
+        'merge_when_complete': not executor.waits_for_results
+    } for shard_id, shard in enumerate(shards)]
+    
+    results = executor.run(run_shard_worker, shard_events)
+    
+    body = {
+        'message': '分片已分发',
+        'run_id': run_id,
+        'shards': len(shards),
+        'companies': len(companies)
+    }
+    if executor.waits_for_results:
+        body['message'] = '数据爬取完成'
+        body['shard_results'] = results
+        body['merge'] = merge_shards(run_id, build_output_store(output_dir, s3_bucket))
+    
+    return {
+        'statusCode': 200 if executor.waits_for_results else 202,
+        'body': json.dumps(body)
+    }
+
 def lambda_handler(event, context):
-    """Lambda函数主处理器"""
+    """Lambda函数主处理器
+
+    event['mode'] 可选 coordinator（分片分发）/ worker（执行单个分片）/ merge（合并分片结果），
+    未指定时按顺序爬取（默认行为）。
+    """
     try:
+        mode = event.get('mode') if isinstance(event, dict) else None
+        if mode == 'coordinator':
+            return run_coordinator(event, context)
+        if mode == 'worker':
+            return {'statusCode': 200, 'body': json.dumps(run_shard_worker(event))}
+        if mode == 'merge':
+            store = build_output_store(event.get('output_dir'), os.environ.get('S3_BUCKET_NAME', 'lever-jobs-data'))
+            return {'statusCode': 200, 'body': json.dumps(merge_shards(event['run_id'], store))}
+        
         # 获取环境变量
         s3_bucket = os.environ.get('S3_BUCKET_NAME', 'lever-jobs-data')
         api_endpoint = os.environ.get('BACKEND_API_ENDPOINT', '')
         
         # 初始化爬虫
-        scraper = LeverJobScraper()
+        scraper = build_scraper(s3_bucket)
+        cache = scraper.cache
         
-        # 发现公司
-        companies = scraper.discover_companies()
-        print(f"发现 {len(companies)} 家公司")
+        # 上一次执行因时间不足提前停止时，从断点游标继续处理剩余的公司
+        cursor = ContinuationCursor(s3_bucket, key=os.environ.get('CURSOR_KEY', 'state/cursor.json'))
+        checkpoint = cursor.load()
+        if checkpoint:
+            run_id = checkpoint['run_id']
+            part = checkpoint['part'] + 1
+            run_companies = checkpoint['companies']
+            start_index = checkpoint['next_index']
+            print(f"从断点继续: 第 {part} 部分，剩余 {len(run_companies) - start_index}/{len(run_companies)} 家公司")
+        else:
+            # 发现公司
+            run_companies = scraper.discover_companies()
+            print(f"发现 {len(run_companies)} 家公司")
+            
+            # 限制处理的公司数量（0表示不限制，由执行时间预算决定处理多少）
+            max_companies = int(os.environ.get('MAX_COMPANIES', '15'))
+            if max_companies:
+                run_companies = run_companies[:max_companies]
+            run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+            part = 0
+            start_index = 0
         
-        # 限制处理的公司数量以避免超时
-        companies = companies[:15]
+        companies = run_companies[start_index:]
+        budget = DeadlineBudget(
+            context,
+            reserve_ms=int(os.environ.get('DEADLINE_RESERVE_MS', '60000')),
+            estimate_ms=int(os.environ.get('COMPANY_ESTIMATE_MS', '30000'))
+        )
         
-        all_jobs = []
-        australian_jobs = []
+        # 增量模式：加载职位状态和上一次快照，只抓取新增或变化的职位
+        incremental = None
+        if os.environ.get('INCREMENTAL', 'false').lower() == 'true':
+            state = PostingStateStore(bucket_name=s3_bucket, key=os.environ.get('STATE_KEY', 'state/postings.json.gz'))
+            state.load()
+            # 状态中不保存职位数据，未变化的职位从本次要处理的公司各自最近的快照中复用
+            previous_jobs = {}
+            remaining = set(companies)
+            for snapshot_key in state.snapshot_keys(companies):
+                for posting_id, job in load_snapshot_jobs(s3_bucket, snapshot_key).items():
+                    entry = state.postings.get(posting_id)
+                    if entry and entry[1] in remaining:
+                        previous_jobs[posting_id] = job
+            incremental = IncrementalRun(state, previous_jobs)
         
-        # 爬取每个公司的职位
-        for i, company in enumerate(companies):
-            print(f"处理公司 {i+1}/{len(companies)}: {company}")
-            
-            jobs = scraper.get_company_jobs(company)
-            all_jobs.extend(jobs)
-            
-            # 过滤澳大利亚职位
-            for job in jobs:
-                if scraper.is_australian_company(job.get('company_name', ''), job.get('company_path', '')):
-                    australian_jobs.append(job)
-            
-            time.sleep(2)  # 礼貌延迟
+        # OUTPUT_FORMAT=ndjson 时职位边爬取边以gzip NDJSON流式上传，内存占用与职位数量无关
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        sink = None
+        if os.environ.get('OUTPUT_FORMAT', 'json') == 'ndjson':
+            sink = NDJSONSnapshotSink(s3_bucket, timestamp)
+        
+        # PARQUET_OUTPUT=true 时额外写出按 dt=/company= 分区的Parquet文件（需要安装pyarrow）
+        parquet_sink = None
+        if os.environ.get('PARQUET_OUTPUT', 'false').lower() == 'true':
+            parquet_sink = ParquetPartitionSink(
+                bucket_name=s3_bucket,
+                prefix=os.environ.get('PARQUET_PREFIX', 'parquet/jobs'),
+                run_id=f"{run_id}_{part:03d}"
+            )
+        sinks = [s for s in (sink, parquet_sink) if s is not None]
+        
+        try:
+            all_jobs, australian_jobs, processed = scrape_companies(
+                scraper, companies, incremental, budget, sinks, keep_jobs=sink is None
+            )
+        except Exception:
+            for s in sinks:
+                s.abort()
+            raise
+        companies = companies[:processed]
+        next_index = start_index + processed
+        total_jobs = sink.total_jobs if sink is not None else len(all_jobs)
         
-        print(f"总共爬取到 {len(all_jobs)} 个职位，其中 {len(australian_jobs)} 个澳大利亚职位")
+        print(f"总共爬取到 {total_jobs} 个职位，其中 {len(australian_jobs)} 个澳大利亚职位")
+        cache_stats = cache.get_stats() if cache else None
+        if cache_stats:
+            print(f"HTTP缓存统计: {json.dumps(cache_stats)}")
         
         # 保存原始数据到S3（数据湖）
-        if all_jobs:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        raw_saved = False
+        raw_data_key = None
+        australian_data_key = None
+        if sink is not None:
+            manifest = sink.close(companies, {'run_id': run_id, 'part': part})
+            print(f"数据已流式保存到S3: s3://{s3_bucket}/{sink.raw_key}（清单: {sink.manifest_key}）")
+            raw_data_key = sink.raw_key
+            australian_data_key = sink.australian_key if manifest['australian_jobs'] else None
+            raw_saved = True
+        elif all_jobs:
             raw_data_key = f"raw_data/jobs_{timestamp}.json"
             
             raw_data = {
@@ -267,13 +723,38 @@ def lambda_handler(event, context):
                 'total_jobs': len(all_jobs),
                 'australian_jobs': len(australian_jobs),
                 'companies_processed': companies,
+                'run_id': run_id,
+                'part': part,
                 'jobs': all_jobs
             }
             
-            save_to_s3(raw_data, s3_bucket, raw_data_key)
+            raw_saved = save_to_s3(raw_data, s3_bucket, raw_data_key)
+        
+        parquet_summary = parquet_sink.close(companies, {'run_id': run_id, 'part': part}) if parquet_sink else None
+        if parquet_summary:
+            print(f"Parquet数据已保存到S3: s3://{s3_bucket}/{parquet_summary['prefix']}/dt={parquet_summary['dt']}/"
+                  f"（{parquet_summary['files']} 个分区文件）")
+        
+        # 增量模式：保存本次的变更（新增/变化/删除）并更新状态
+        delta_key = None
+        if incremental is not None:
+            delta = incremental.finish(raw_data_key if raw_saved else None)
+            print(f"增量变更: 新增 {len(delta['added'])}，变化 {len(delta['changed'])}，"
+                  f"删除 {len(delta['removed'])}，未变化 {delta['unchanged_count']}，详情抓取失败 {delta['fetch_failed_count']}")
+            delta_key = f"delta/jobs_{timestamp}.json"
+            save_to_s3({
+                'scraped_at': datetime.now().isoformat(),
+                'snapshot_key': raw_data_key if raw_saved else None,
+                'companies_processed': companies,
+                **delta
+            }, s3_bucket, delta_key)
+            
+            # 只有快照保存成功后才推进状态，否则下一次运行重新计算这些变更
+            if raw_saved:
+                incremental.state.save()
         
         # 保存澳大利亚职位数据到S3
-        if australian_jobs:
+        if australian_jobs and sink is None:
             australian_data_key = f"australian_jobs/jobs_{timestamp}.json"
             australian_data = {
                 'scraped_at': datetime.now().isoformat(),
@@ -287,14 +768,46 @@ def lambda_handler(event, context):
         if australian_jobs and api_endpoint:
             call_backend_api(australian_jobs, api_endpoint)
         
+        # 还有未处理的公司时写入断点游标，下一次执行从这里继续
+        remaining = len(run_companies) - next_index
+        if remaining:
+            if processed or not checkpoint:
+                cursor.save(run_id, run_companies, next_index, part)
+                print(f"还有 {remaining} 家公司未处理，已写入断点游标")
+            
+            # 可选：立即异步调用自身继续处理，而不是等待下一次定时触发。
+            # 本次没有完成任何公司（剩余时间一开始就不足预留时间）时不再调用，避免无限循环；
+            # 续跑链的长度由事件中的 continuation 计数限制。
+            continuation = int(event.get('continuation', 0)) if isinstance(event, dict) else 0
+            max_continuations = int(os.environ.get('SELF_CONTINUE_MAX', '20'))
+            if os.environ.get('SELF_CONTINUE', 'false').lower() == 'true' and context is not None:
+                if not processed:
+                    print("错误: 本次执行没有完成任何公司（剩余时间不足 DEADLINE_RESERVE_MS），不再自动续跑")
+                elif continuation >= max_continuations:
+                    print(f"错误: 已连续续跑 {continuation} 次，达到上限 SELF_CONTINUE_MAX，等待下一次定时触发")
+                else:
+                    boto3.client('lambda').invoke(
+                        FunctionName=context.function_name,
+                        InvocationType='Event',
+                        Payload=json.dumps({'continuation': continuation + 1}).encode('utf-8')
+                    )
+        elif checkpoint:
+            cursor.clear()
+        
         return {
             'statusCode': 200,
             'body': json.dumps({
-                'message': '数据爬取完成',
-                'total_jobs': len(all_jobs),
+                'message': '数据爬取完成' if not remaining else '执行时间不足，已保存部分结果',
+                'run_id': run_id,
+                'part': part,
+                'remaining_companies': remaining,
+                'total_jobs': total_jobs,
                 'australian_jobs': len(australian_jobs),
-                's3_raw_data_key': raw_data_key if all_jobs else None,
-                's3_australian_data_key': australian_data_key if australian_jobs else None
+                's3_raw_data_key': raw_data_key,
+                's3_australian_data_key': australian_data_key,
+                's3_delta_key': delta_key,
+                'parquet': parquet_summary,
+                'http_cache': cache_stats
             })
         }
         
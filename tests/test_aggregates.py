@@ -0,0 +1,74 @@
+"""每日聚合状态的增量合并（moto模拟S3）"""
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from data_analysis import JobDataAnalyzer
+
+BUCKET = 'aggregates-bucket'
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client('s3')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def put_snapshot(s3, key, company, count, extra=None):
+    counts = {company: count, **(extra or {})}
+    jobs = [{'company_name': name, 'company_path': name.lower(), 'job_title': f'Engineer {i}',
+             'location': 'Sydney, NSW', 'scraped_at': '2024-01-01T08:00:00'}
+            for name, n in counts.items() for i in range(n)]
+    s3.put_object(Bucket=BUCKET, Key=f'raw_data/{key}', Body=json.dumps(jobs).encode('utf-8'))
+
+
+def test_snapshots_of_one_day_are_summed(s3):
+    analyzer = JobDataAnalyzer(s3_client=s3)
+    # 同一天断点续跑的两个部分，各自覆盖不同的公司
+    put_snapshot(s3, 'jobs_20240101_080000.json', 'Acme', 3)
+    put_snapshot(s3, 'jobs_20240101_081500.json', 'Globex', 2)
+
+    state = analyzer.load_aggregates(BUCKET)
+    assert len(analyzer.update_aggregates(state, BUCKET)) == 2
+    analyzer.save_aggregates(state, BUCKET)
+
+    analysis = analyzer.analyze_window(analyzer.load_aggregates(BUCKET))
+    assert analysis['total_jobs'] == 5
+    assert analysis['companies'] == {'Acme': 3, 'Globex': 2}
+    assert analysis['daily_jobs'] == {'2024-01-01': 5}
+
+
+def test_merging_is_idempotent(s3):
+    analyzer = JobDataAnalyzer(s3_client=s3)
+    put_snapshot(s3, 'jobs_20240101_080000.json', 'Acme', 3)
+    state = analyzer.load_aggregates(BUCKET)
+    analyzer.update_aggregates(state, BUCKET)
+
+    # 再次运行不会重复统计；同一天之后写出的部分仍会被合并
+    assert analyzer.update_aggregates(state, BUCKET) == []
+    put_snapshot(s3, 'jobs_20240101_090000.json', 'Globex', 2)
+    assert analyzer.update_aggregates(state, BUCKET) == ['raw_data/jobs_20240101_090000.json']
+
+    # 重复合并同一快照不会重复累加
+    counts = {'globex': {'total_jobs': 2, 'company_name': {'Globex': 2}}}
+    assert not analyzer.merge_snapshot(state, '2024-01-01', 'raw_data/jobs_20240101_090000.json', counts)
+    assert analyzer.analyze_window(state)['companies'] == {'Acme': 3, 'Globex': 2}
+
+
+def test_full_rerun_on_same_day_is_not_double_counted(s3):
+    analyzer = JobDataAnalyzer(s3_client=s3)
+    # 定时运行和同一天的手动重跑各写出一个完整快照；重跑时 Acme 的职位已有变化
+    put_snapshot(s3, 'jobs_20240101_080000.json', 'Acme', 3, extra={'Globex': 2})
+    put_snapshot(s3, 'jobs_20240101_120000.json', 'Acme', 4, extra={'Globex': 2})
+
+    state = analyzer.load_aggregates(BUCKET)
+    analyzer.update_aggregates(state, BUCKET)
+    analysis = analyzer.analyze_window(state)
+
+    assert analysis['total_jobs'] == 6
+    assert analysis['companies'] == {'Acme': 4, 'Globex': 2}
+    assert analysis['daily_jobs'] == {'2024-01-01': 6}
@@ -0,0 +1,45 @@
+"""职位计数（count_jobs / analyze_local_files）"""
+import json
+from datetime import datetime
+
+import pandas as pd
+
+from data_analysis import JobDataAnalyzer, count_jobs
+
+TIMESTAMP = 1704110400.25
+
+
+def local_day(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d')
+
+
+def test_float_scraped_at_is_counted_by_day():
+    # LeverScraperUtils 写入 time.time()，DynamoDB 的 N 属性也是数值
+    df = pd.DataFrame({'company_name': ['Acme', 'Acme'], 'scraped_at': [TIMESTAMP, TIMESTAMP + 1]})
+
+    assert count_jobs(df)['scraped_dates'] == {local_day(TIMESTAMP): 2}
+
+
+def test_mixed_scraped_at_values():
+    df = pd.DataFrame({
+        'company_name': ['Acme', 'Globex', 'Initech', 'Hooli'],
+        'scraped_at': [TIMESTAMP, '2024-02-03T08:00:00', None, '2024-02-03T09:30:00'],
+        'location': ['Sydney, NSW', 'Remote', None, 'Melbourne VIC'],
+    })
+
+    counts = count_jobs(df)
+
+    assert counts['scraped_dates'] == {local_day(TIMESTAMP): 1, '2024-02-03': 2}
+    assert counts['locations'] == {'Sydney': 1, 'Remote': 1, 'Melbourne': 1}
+
+
+def test_analyze_local_files_with_timestamps(tmp_path):
+    jobs = [{'company_name': 'Acme', 'job_title': 'Engineer', 'location': 'Perth', 'scraped_at': TIMESTAMP + i}
+            for i in range(3)]
+    path = tmp_path / 'test_results_1.json'
+    path.write_text(json.dumps(jobs), encoding='utf-8')
+
+    analysis = JobDataAnalyzer().analyze_local_files([str(path)], processes=1)
+
+    assert analysis['total_jobs'] == 3
+    assert analysis['scraped_dates'] == {local_day(TIMESTAMP): 3}
@@ -0,0 +1,125 @@
+"""断点续爬：没有进展时不自动续跑，续跑链有长度上限；并发批次内按预算停止"""
+import asyncio
+import json
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import lambda_function
+from utils.checkpoint import ContinuationCursor, DeadlineBudget
+
+
+class FakeContext:
+    function_name = 'lever-scraper'
+
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+class FakeLambdaClient:
+    def __init__(self):
+        self.payloads = []
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        self.payloads.append(json.loads(Payload))
+
+
+@pytest.fixture
+def handler_env(monkeypatch):
+    with mock_aws():
+        boto3.client('s3').create_bucket(Bucket='lever-jobs-data')
+        monkeypatch.setenv('SELF_CONTINUE', 'true')
+        monkeypatch.setenv('SELF_CONTINUE_MAX', '3')
+        monkeypatch.delenv('BACKEND_API_ENDPOINT', raising=False)
+        monkeypatch.setattr(lambda_function.LeverJobScraper, 'get_company_jobs', lambda self, company, incremental=None: [])
+        monkeypatch.setattr(lambda_function.time, 'sleep', lambda seconds: None)
+
+        lambda_client = FakeLambdaClient()
+        real_client = boto3.client
+        monkeypatch.setattr(lambda_function.boto3, 'client',
+                            lambda service, *a, **kw: lambda_client if service == 'lambda' else real_client(service, *a, **kw))
+        cursor = ContinuationCursor('lever-jobs-data')
+        cursor.save('run1', ['a', 'b', 'c', 'd'], 1, 0)
+        yield cursor, lambda_client
+
+
+def test_no_self_invoke_without_progress(handler_env):
+    cursor, lambda_client = handler_env
+
+    # 剩余时间低于预留时间，第一家公司都无法开始
+    response = lambda_function.lambda_handler({}, FakeContext(remaining_ms=30000))
+
+    assert json.loads(response['body'])['remaining_companies'] == 3
+    assert lambda_client.payloads == []
+    # 游标保持不变
+    assert cursor.load()['part'] == 0
+    assert cursor.load()['next_index'] == 1
+
+
+def test_self_invoke_counts_and_caps_continuations(handler_env, monkeypatch):
+    cursor, lambda_client = handler_env
+    monkeypatch.setattr(lambda_function.DeadlineBudget, 'can_start_next',
+                        lambda self: self.longest_ms == 0)  # 每次只处理一家公司
+
+    lambda_function.lambda_handler({'continuation': 1}, FakeContext(remaining_ms=900000))
+    assert lambda_client.payloads == [{'continuation': 2}]
+    assert cursor.load()['next_index'] == 2
+
+    # 达到 SELF_CONTINUE_MAX 后仍写入游标，但不再调用自身
+    lambda_function.lambda_handler({'continuation': 3}, FakeContext(remaining_ms=900000))
+    assert lambda_client.payloads == [{'continuation': 2}]
+    assert cursor.load()['next_index'] == 3
+
+
+class ClockContext:
+    """剩余时间随真实时间减少"""
+    function_name = 'lever-scraper'
+
+    def __init__(self, remaining_ms):
+        self.deadline = time.monotonic() + remaining_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return (self.deadline - time.monotonic()) * 1000
+
+
+def test_async_batch_stops_at_deadline(monkeypatch):
+    monkeypatch.setenv('FETCH_MODE', 'async')
+    monkeypatch.setenv('FETCH_BATCH_SIZE', '50')
+    delays = {'a': 0.0, 'b': 0.05, 'c': 5.0, 'd': 0.0}
+
+    class Fetcher:
+        async def __aexit__(self, *args):
+            pass
+
+    async def open_fetcher(self, *args):
+        return Fetcher()
+
+    async def crawl_company(self, fetcher, company, incremental=None):
+        await asyncio.sleep(delays[company])
+        return [{'company_name': company, 'company_path': company, 'job_title': 'Engineer'}]
+
+    monkeypatch.setattr(lambda_function.LeverJobScraper, '_open_fetcher', open_fetcher)
+    monkeypatch.setattr(lambda_function.LeverJobScraper, '_crawl_company', crawl_company)
+    # 预留时间之外只有0.3秒，c 无法完成；d 已完成但排在 c 之后，留给下一次执行
+    budget = DeadlineBudget(ClockContext(remaining_ms=1300), reserve_ms=1000)
+
+    started = time.monotonic()
+    all_jobs, _, processed = lambda_function.scrape_companies(
+        lambda_function.LeverJobScraper(), ['a', 'b', 'c', 'd'], budget=budget)
+
+    assert time.monotonic() - started < 2
+    assert processed == 2
+    assert [job['company_name'] for job in all_jobs] == ['a', 'b']
+
+
+def test_first_batch_uses_configured_estimate():
+    budget = DeadlineBudget(FakeContext(remaining_ms=80000), reserve_ms=60000, estimate_ms=30000)
+
+    assert not budget.can_start_next()
+    budget.record(5)
+    assert budget.can_start_next()
@@ -0,0 +1,88 @@
+"""DynamoDB 并行分段扫描（moto模拟DynamoDB）"""
+import boto3
+import pytest
+from moto import mock_aws
+
+from data_analysis import JobDataAnalyzer
+
+TABLE = 'jobsprofiles'
+
+
+class CountingClient:
+    """记录 scan 调用参数的客户端包装"""
+
+    def __init__(self, client):
+        self.client = client
+        self.scans = []
+
+    def scan(self, **params):
+        self.scans.append(params)
+        return self.client.scan(**params)
+
+
+@pytest.fixture
+def dynamodb():
+    with mock_aws():
+        client = boto3.client('dynamodb')
+        client.create_table(
+            TableName=TABLE,
+            KeySchema=[{'AttributeName': 'job_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'job_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield client
+
+
+def put_jobs(client, count, description_size=10):
+    for i in range(count):
+        item = {
+            'job_id': {'S': f'job-{i:03d}'},
+            'location': {'S': 'Sydney' if i % 2 else 'Melbourne'},
+            'status': {'S': 'active'},
+            'salary': {'N': str(1000 + i)},
+            'description': {'S': 'x' * description_size}
+        }
+        if i % 3:
+            item['remote'] = {'BOOL': i % 3 == 1}
+        client.put_item(TableName=TABLE, Item=item)
+
+
+def test_scan_follows_last_evaluated_key(dynamodb):
+    # 每条约150KB，单页上限1MB，每个分段都需要多页
+    put_jobs(dynamodb, 40, description_size=150000)
+    client = CountingClient(dynamodb)
+
+    df = JobDataAnalyzer(s3_client=object(), dynamodb_client=client).load_data_from_dynamodb(
+        TABLE, total_segments=2, projection=['job_id', 'location'])
+
+    assert sorted(df['job_id']) == [f'job-{i:03d}' for i in range(40)]
+    assert any('ExclusiveStartKey' in params for params in client.scans)
+    assert {params['Segment'] for params in client.scans} == {0, 1}
+
+
+def test_projection_uses_placeholders_for_reserved_words(dynamodb):
+    put_jobs(dynamodb, 6)
+    client = CountingClient(dynamodb)
+
+    df = JobDataAnalyzer(s3_client=object(), dynamodb_client=client).load_data_from_dynamodb(
+        TABLE, total_segments=1, projection=['job_id', 'location', 'status'])
+
+    assert set(df.columns) == {'job_id', 'location', 'status'}
+    assert set(df['status']) == {'active'}
+    params = client.scans[0]
+    assert set(params['ExpressionAttributeNames'].values()) == {'job_id', 'location', 'status'}
+    assert 'location' not in params['ProjectionExpression']
+
+
+def test_attribute_values_are_decoded(dynamodb):
+    put_jobs(dynamodb, 6)
+
+    df = JobDataAnalyzer(s3_client=object(), dynamodb_client=dynamodb).load_data_from_dynamodb(TABLE, total_segments=3)
+    rows = {row['job_id']: row for row in df.to_dict('records')}
+
+    assert len(rows) == 6
+    assert rows['job-001']['remote'] is True
+    assert rows['job-002']['remote'] is False
+    # 没有该属性的记录补齐为空值
+    assert rows['job-000']['remote'] is None
+    assert rows['job-005']['salary'] == 1005.0
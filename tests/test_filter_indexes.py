@@ -0,0 +1,52 @@
+"""公司/地点筛选的explain检查：每种过滤方式都通过筛选字段上的索引（IXSCAN）查找
+
+explain 需要真实的查询计划器，未设置 MONGO_URI 时跳过。
+"""
+import os
+import uuid
+
+import pytest
+
+MONGO_URI = os.environ.get('MONGO_URI')
+if not MONGO_URI:
+    pytest.skip('需要设置 MONGO_URI 指向真实的MongoDB', allow_module_level=True)
+
+from pymongo import MongoClient
+
+import backend_api_example as backend
+
+COMPANIES = ['Canva', 'Atlassian', 'Sydney Software Co', 'Culture Amp', 'SafetyCulture']
+LOCATIONS = ['Sydney, NSW', 'Melbourne VIC', 'Remote - Australia', 'Brisbane', 'Perth / Remote']
+
+
+@pytest.fixture(scope='module')
+def filter_collection():
+    client = MongoClient(MONGO_URI)
+    collection = client[backend.DB_NAME][f'test_filter_indexes_{uuid.uuid4().hex[:8]}']
+    collection.insert_many(backend.transform_job_data([{
+        'job_url': f'https://jobs.lever.co/{COMPANIES[i % 5].split()[0].lower()}/{i}',
+        'job_title': f'Engineer {i}',
+        'company_name': COMPANIES[i % 5],
+        'location': LOCATIONS[i % 5],
+        'scraped_at': f'2024-01-{i % 28 + 1:02d}T08:00:00',
+    } for i in range(2000)]))
+    original = backend.collection
+    backend.collection = collection
+    backend.ensure_indexes()
+    yield collection
+    backend.collection = original
+    collection.drop()
+    client.close()
+
+
+@pytest.mark.parametrize('match', backend.MATCH_MODES)
+@pytest.mark.parametrize('name', list(backend.SEARCH_KEY_FIELDS))
+def test_filter_uses_index(filter_collection, name, match):
+    passed, stages = backend.explain_filter(name, match)
+
+    assert passed, f"{name}/{match}: {' -> '.join(stages)}"
+
+
+def test_substring_is_default_and_case_insensitive(filter_collection):
+    assert filter_collection.count_documents(backend.build_filter_query({'company': 'SOFTWARE'})) == 400
+    assert filter_collection.count_documents(backend.build_filter_query({'location': 'sydney, n'})) == 400
@@ -0,0 +1,84 @@
+"""条件请求缓存（moto模拟S3存储）"""
+import boto3
+import pytest
+from moto import mock_aws
+
+from utils.http_cache import ConditionalRequestCache, DiskCacheStore, S3CacheStore
+from utils.job_extractor import PARSED_VERSION
+from utils.scraper_utils import LeverScraperUtils
+
+BUCKET = 'cache-bucket'
+
+
+class Response:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class ETagSession:
+    """按URL返回固定内容；请求带上匹配的 If-None-Match 时返回304"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append((url, headers))
+        body = self.pages[url]
+        etag = f'"{len(body)}"'
+        if headers.get('If-None-Match') == etag:
+            return Response(304)
+        return Response(200, body, {'ETag': etag})
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client('s3')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_s3_hit_reads_only_metadata(s3):
+    cache = ConditionalRequestCache(S3CacheStore(BUCKET, s3_client=s3))
+    session = ETagSession({'https://x/a': b'hello world'})
+    cache.fetch(session, 'https://x/a', bytes.decode)
+
+    fetched = []
+    s3.meta.events.register('before-parameter-build.s3.GetObject', lambda params, **kwargs: fetched.append(params['Key']))
+    assert cache.fetch(session, 'https://x/a', bytes.decode) == 'hello world'
+
+    assert fetched and all(key.endswith('.json') for key in fetched)
+    assert cache.get_stats()['bytes_saved'] == len(b'hello world')
+
+
+def test_eviction_is_least_recently_used(tmp_path):
+    cache = ConditionalRequestCache(DiskCacheStore(str(tmp_path)), max_bytes=25)
+    session = ETagSession({f'https://x/{name}': name.encode() * 10 for name in 'abc'})
+    cache.fetch(session, 'https://x/a', bytes.decode)
+    cache.fetch(session, 'https://x/b', bytes.decode)
+    # 命中 a 后 b 成为最久未使用的条目
+    cache.fetch(session, 'https://x/a', bytes.decode)
+    cache.fetch(session, 'https://x/c', bytes.decode)
+
+    assert cache.get_stats()['evictions'] == 1
+    assert cache.store.load(cache.cache_key('default', 'https://x/b')) is None
+    assert cache.store.load(cache.cache_key('default', 'https://x/a')) is not None
+
+
+def test_scraper_utils_entries_carry_parser_version(tmp_path):
+    cache = ConditionalRequestCache(DiskCacheStore(str(tmp_path)))
+    utils = LeverScraperUtils(cache=cache)
+    utils.session = ETagSession({'https://x/acme': b'<a href="/job/1">Engineer</a>'})
+
+    utils._get_parsed('https://x/acme', bytes.decode, 'utils_job_links')
+
+    entry = cache.store.load(cache.cache_key('utils_job_links', 'https://x/acme'))
+    assert entry['version'] == PARSED_VERSION
@@ -0,0 +1,94 @@
+"""异步接收：合并写入、逐批回退与过期批次的重新处理（mongomock模拟MongoDB）"""
+import os
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+# 没有MongoDB时导入立即失败并回退为未连接状态，测试中替换为mongomock的集合
+os.environ.setdefault('MONGO_URI', 'mongodb://localhost:1/?serverSelectionTimeoutMS=100')
+
+import backend_api_example as backend
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(backend, 'ingest_batches', database.ingest_batches)
+    monkeypatch.setattr(backend, 'ingest_requests', database.ingest_requests)
+    with backend.app.app_context():
+        yield database
+
+
+@pytest.fixture
+def pool():
+    # 不启动写入线程，直接调用 _collect_group / _write
+    return backend.IngestWriterPool(writers=0, queue_size=10)
+
+
+def jobs(batch, count):
+    return [{'job_id': f'{batch}-{i}'} for i in range(count)]
+
+
+def test_collect_group_merges_queued_batches(pool, monkeypatch):
+    monkeypatch.setattr(backend, 'GROUP_COMMIT_MAX_JOBS', 5)
+    for batch in 'abc':
+        pool.submit(batch, jobs(batch, 2))
+
+    # 达到 GROUP_COMMIT_MAX_JOBS 后停止合并，剩下的批次留给下一组
+    assert [batch_id for batch_id, _ in pool._collect_group()] == ['a', 'b', 'c']
+    pool.submit('d', jobs('d', 6))
+    pool.submit('e', jobs('e', 1))
+    assert [batch_id for batch_id, _ in pool._collect_group()] == ['d']
+
+
+def test_write_falls_back_to_single_batches(pool, monkeypatch):
+    written = []
+
+    def upsert_jobs(batch_jobs):
+        if any(job['job_id'].startswith('bad') for job in batch_jobs):
+            raise RuntimeError('write failed')
+        written.extend(job['job_id'] for job in batch_jobs)
+        return {'upserted_count': len(batch_jobs), 'modified_count': 0}
+
+    monkeypatch.setattr(backend, 'upsert_jobs', upsert_jobs)
+    results = pool._write([('a', jobs('a', 2)), ('bad', jobs('bad', 1)), ('b', jobs('b', 1))])
+
+    statuses = {batch_ids[0]: update['status'] for batch_ids, update in results}
+    assert statuses == {'a': 'done', 'bad': 'failed', 'b': 'done'}
+    assert written == ['a-0', 'a-1', 'b-0']
+
+
+def test_write_group_commit(pool, monkeypatch):
+    monkeypatch.setattr(backend, 'upsert_jobs', lambda batch_jobs: {'upserted_count': len(batch_jobs), 'modified_count': 0})
+
+    [(batch_ids, update)] = pool._write([('a', jobs('a', 2)), ('b', jobs('b', 3))])
+
+    assert batch_ids == ['a', 'b']
+    assert update['status'] == 'done'
+    assert update['group']['jobs'] == 5
+
+
+def put_batch(db, key, status, age_s):
+    db.ingest_batches.insert_one({'_id': 'batch-1', 'status': status,
+                                  'created_at': datetime.now() - timedelta(seconds=age_s)})
+    db.ingest_requests.insert_one({'_id': key, 'batch_id': 'batch-1', 'response': {'batch_id': 'batch-1'}})
+
+
+def test_recent_queued_batch_is_replayed(db):
+    put_batch(db, 'key-1', 'queued', age_s=5)
+
+    response, status = backend.replay_response('key-1')
+
+    assert status == 202
+    assert response.get_json()['duplicate'] is True
+
+
+def test_stale_queued_batch_is_reprocessed(db, monkeypatch):
+    # 进程崩溃后批次停留在 queued，重试时重新入队而不是一直返回202
+    monkeypatch.setattr(backend, 'INGEST_QUEUED_TIMEOUT_S', 60)
+    put_batch(db, 'key-1', 'queued', age_s=120)
+
+    assert backend.replay_response('key-1') is None
+    assert db.ingest_batches.find_one({'_id': 'batch-1'})['status'] == 'expired'
+    assert db.ingest_requests.find_one({'_id': 'key-1'}) is None
@@ -0,0 +1,110 @@
+"""LeverPostingsClient 对本地桩HTTP服务器的分页测试"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from lambda_function import LeverJobScraper
+from utils.lever_api import LeverPostingsClient, posting_to_job
+
+POSTINGS = [{
+    'id': f'p{i}',
+    'text': f' Engineer {i} ',
+    'hostedUrl': f'https://jobs.lever.co/acme/p{i}',
+    'categories': {'location': 'Sydney', 'department': 'Engineering', 'team': 'Platform'},
+    'descriptionPlain': 'Build things',
+    'lists': [{'text': 'Requirements', 'content': '<li>Python</li><li>AWS</li>'}],
+    'additional': '<p>Free &amp; lunch</p>',
+} for i in range(5)]
+
+
+@pytest.fixture
+def stub_api():
+    """返回 (API地址, 请求记录)；按 skip/limit 分页返回 POSTINGS"""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            requests_seen.append((url.path, query))
+            if url.path != '/v0/postings/acme' or query.get('mode') != 'json':
+                self.send_response(404)
+                self.end_headers()
+                return
+            skip, limit = int(query['skip']), int(query['limit'])
+            body = json.dumps(POSTINGS[skip:skip + limit]).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v0/postings", requests_seen
+    server.shutdown()
+
+
+def test_pages_with_skip_and_limit(stub_api):
+    api_base_url, requests_seen = stub_api
+    client = LeverPostingsClient(api_base_url=api_base_url, page_size=2)
+
+    jobs = client.get_company_jobs('acme')
+
+    assert [job['job_title'] for job in jobs] == [f'Engineer {i}' for i in range(5)]
+    assert [(q['skip'], q['limit']) for _, q in requests_seen] == [('0', '2'), ('2', '2'), ('4', '2')]
+
+
+def test_exact_multiple_of_page_size_requests_empty_last_page(stub_api):
+    api_base_url, requests_seen = stub_api
+    client = LeverPostingsClient(api_base_url=api_base_url, page_size=5)
+
+    assert len(client.get_company_jobs('acme')) == 5
+    assert [q['skip'] for _, q in requests_seen] == ['0', '5']
+
+
+def test_posting_to_job_matches_html_schema():
+    html_job = LeverJobScraper().parse_job_details(
+        '<h2 class="posting-headline">Engineer</h2><div class="location">Sydney</div>',
+        'https://jobs.lever.co/acme/p0', 'acme'
+    )
+    api_job = posting_to_job(POSTINGS[0], 'acme')
+
+    assert set(api_job) == set(html_job)
+    assert all(isinstance(value, str) for value in api_job.values())
+    assert api_job['requirements'] == 'Requirements: Python AWS'
+    assert api_job['benefits'] == 'Free & lunch'
+    assert api_job['job_url'] == 'https://jobs.lever.co/acme/p0'
+
+
+def test_bad_company_payload_does_not_fail_concurrent_batch():
+    scraper = LeverJobScraper(extractor_backend='json')
+    scraper.postings_client = LeverPostingsClient(api_base_url='http://stub/v0/postings', page_size=10)
+    bad_payloads = {
+        'html-error': b'<html><body>Service Unavailable</body></html>',
+        'not-a-list': b'{"ok": false}',
+        'bad-posting': b'[{"text": "Engineer", "categories": "Sydney"}]',
+    }
+
+    class Fetcher:
+        """按公司返回桩数据的 AsyncFetcher 替身"""
+
+        async def fetch(self, url):
+            company = urlsplit(url).path.rsplit('/', 1)[-1]
+            if company in bad_payloads:
+                return bad_payloads[company]
+            query = {k: v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+            skip, limit = int(query['skip']), int(query['limit'])
+            return json.dumps(POSTINGS[skip:skip + limit]).encode('utf-8')
+
+    results = asyncio.run(scraper._crawl_companies(Fetcher(), ['acme', *bad_payloads], None))
+
+    assert len(results['acme']) == 5
+    assert all(results[company] == [] for company in bad_payloads)
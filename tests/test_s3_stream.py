@@ -0,0 +1,77 @@
+"""gzip NDJSON 流式写入（moto模拟S3）"""
+import gzip
+import json
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from utils.s3_stream import MIN_PART_SIZE, NDJSONSnapshotSink, S3NDJSONStreamWriter
+
+BUCKET = 'stream-bucket'
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client('s3')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def read_ndjson(s3, key):
+    body = s3.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+    return [json.loads(line) for line in gzip.decompress(body).splitlines()]
+
+
+def test_small_output_uses_single_put(s3):
+    writer = S3NDJSONStreamWriter(BUCKET, 'small.ndjson.gz', s3_client=s3)
+    writer.write_many({'i': i} for i in range(100))
+    summary = writer.close()
+
+    assert summary['parts'] == 1
+    assert summary['records'] == 100
+    assert read_ndjson(s3, 'small.ndjson.gz') == [{'i': i} for i in range(100)]
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get('Uploads', []) == []
+
+
+def test_large_output_uses_multipart(s3):
+    # 十六进制随机内容压缩后约为一半，约12MB压缩数据会切分为多个5MB分段
+    records = [{'i': i, 'payload': os.urandom(3000).hex()} for i in range(4000)]
+    with S3NDJSONStreamWriter(BUCKET, 'large.ndjson.gz', s3_client=s3, part_size=MIN_PART_SIZE) as writer:
+        writer.write_many(records)
+    summary = writer.summary()
+
+    assert summary['parts'] >= 2
+    assert summary['records'] == len(records)
+    assert summary['compressed_bytes'] == s3.head_object(Bucket=BUCKET, Key='large.ndjson.gz')['ContentLength']
+    assert read_ndjson(s3, 'large.ndjson.gz') == records
+
+
+def test_error_aborts_multipart_upload(s3):
+    with pytest.raises(RuntimeError):
+        with S3NDJSONStreamWriter(BUCKET, 'aborted.ndjson.gz', s3_client=s3, part_size=MIN_PART_SIZE) as writer:
+            writer.write_many({'payload': os.urandom(3000).hex()} for _ in range(3000))
+            assert writer._upload_id is not None
+            raise RuntimeError('爬取失败')
+
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get('Uploads', []) == []
+    assert 'Contents' not in s3.list_objects_v2(Bucket=BUCKET, Prefix='aborted')
+
+
+def test_snapshot_sink_manifest_counts(s3):
+    sink = NDJSONSnapshotSink(BUCKET, '20240101_080000', s3_client=s3)
+    sink.add([{'job_title': 'A'}, {'job_title': 'B'}], [{'job_title': 'A'}])
+    sink.add([{'job_title': 'C'}], [])
+    manifest = sink.close(['acme', 'beta'], {'run_id': 'r1', 'part': 0})
+
+    stored = json.loads(s3.get_object(Bucket=BUCKET, Key=sink.manifest_key)['Body'].read())
+    assert stored == manifest
+    assert manifest['total_jobs'] == 3
+    assert manifest['australian_jobs'] == 1
+    assert manifest['companies_processed'] == ['acme', 'beta']
+    assert manifest['files']['raw']['records'] == 3
+    assert manifest['run_id'] == 'r1'
+    assert [job['job_title'] for job in read_ndjson(s3, sink.raw_key)] == ['A', 'B', 'C']
+    assert [job['job_title'] for job in read_ndjson(s3, sink.australian_key)] == ['A']
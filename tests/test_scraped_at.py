@@ -0,0 +1,58 @@
+"""scraped_at 统一为ISO字符串：接收时转换、旧记录迁移与分页令牌校验（mongomock模拟MongoDB）"""
+import base64
+import json
+import os
+from datetime import datetime
+
+import mongomock
+import pytest
+
+# 没有MongoDB时导入立即失败并回退为未连接状态，测试中替换为mongomock的集合
+os.environ.setdefault('MONGO_URI', 'mongodb://localhost:1/?serverSelectionTimeoutMS=100')
+
+import backend_api_example as backend
+
+TIMESTAMP = 1704110400.25
+
+
+def test_transform_normalizes_scraped_at():
+    jobs = backend.transform_job_data([
+        {'job_url': 'https://jobs.lever.co/acme/1', 'scraped_at': TIMESTAMP},
+        {'job_url': 'https://jobs.lever.co/acme/2', 'scraped_at': datetime(2024, 1, 2, 8, 0)},
+        {'job_url': 'https://jobs.lever.co/acme/3', 'scraped_at': '2024-01-03T08:00:00'},
+        {'job_url': 'https://jobs.lever.co/acme/4'},
+    ])
+
+    assert all(isinstance(job['scraped_at'], str) for job in jobs)
+    assert jobs[0]['scraped_at'] == datetime.fromtimestamp(TIMESTAMP).isoformat()
+    assert [job['scraped_at'] for job in jobs[1:3]] == ['2024-01-02T08:00:00', '2024-01-03T08:00:00']
+
+
+def test_migrate_scraped_at(monkeypatch):
+    collection = mongomock.MongoClient().db.jobsprofiles
+    collection.insert_many([
+        {'job_id': 'a', 'scraped_at': TIMESTAMP},
+        {'job_id': 'b', 'scraped_at': datetime(2024, 1, 2, 8, 0)},
+        {'job_id': 'c', 'scraped_at': '2024-01-03T08:00:00'},
+        {'job_id': 'd', 'processed_at': '2024-01-04T08:00:00'},
+    ])
+    monkeypatch.setattr(backend, 'collection', collection)
+
+    backend.migrate_scraped_at()
+
+    values = {job['job_id']: job['scraped_at'] for job in collection.find()}
+    assert values == {
+        'a': datetime.fromtimestamp(TIMESTAMP).isoformat(),
+        'b': '2024-01-02T08:00:00',
+        'c': '2024-01-03T08:00:00',
+        'd': '2024-01-04T08:00:00',
+    }
+
+
+def test_cursor_with_non_string_scraped_at_is_rejected():
+    token = base64.urlsafe_b64encode(json.dumps([TIMESTAMP, 'abc']).encode('utf-8')).decode('ascii')
+
+    with pytest.raises(ValueError):
+        backend.decode_cursor(token)
+    assert backend.decode_cursor(backend.encode_cursor({'scraped_at': '2024-01-03T08:00:00', '_id': 'abc'})) == \
+        ('2024-01-03T08:00:00', 'abc')
@@ -0,0 +1,101 @@
+"""分片执行：本地 协调者 -> worker -> 合并 流程，以及合并声明的原子性"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import lambda_function
+from utils import sharding
+from utils.sharding import LocalOutputStore, S3OutputStore, merge_claim_key
+
+COMPANIES = [f'company{i:02d}' for i in range(10)]
+
+
+def fake_scrape_companies(scraper, companies, *args, **kwargs):
+    """每家公司返回固定的职位，公司编号为偶数时视为澳大利亚公司"""
+    all_jobs, australian_jobs = [], []
+    for company in companies:
+        jobs = [{'job_title': f'{company} job {i}', 'company_name': company, 'company_path': company,
+                 'job_url': f'https://jobs.lever.co/{company}/{i}'} for i in range(3)]
+        all_jobs.extend(jobs)
+        if int(company[-2:]) % 2 == 0:
+            australian_jobs.extend(jobs)
+    return all_jobs, australian_jobs, len(companies)
+
+
+@pytest.fixture
+def stub_scraping(monkeypatch):
+    monkeypatch.delenv('BACKEND_API_ENDPOINT', raising=False)
+    monkeypatch.setattr(lambda_function, 'scrape_companies', fake_scrape_companies)
+    monkeypatch.setattr(lambda_function, 'build_scraper', lambda bucket: None)
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='需要fork启动方式')
+def test_local_coordinator_merges_union_of_shards(tmp_path, monkeypatch, stub_scraping):
+    # worker进程通过fork继承打桩后的 scrape_companies
+    monkeypatch.setattr(sharding, 'ProcessPoolExecutor',
+                        partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('fork')))
+
+    response = lambda_function.run_coordinator({
+        'mode': 'coordinator',
+        'run_id': 'run1',
+        'shard_count': 3,
+        'executor': 'local',
+        'output_dir': str(tmp_path),
+        'companies': COMPANIES
+    }, context=None)
+
+    assert response['statusCode'] == 200
+    store = LocalOutputStore(str(tmp_path))
+    partials = [store.read_json(key) for key in store.list_keys('partials/run1/')]
+    merged = store.read_json('raw_data/jobs_run1.json')
+    australian = store.read_json('australian_jobs/jobs_run1.json')
+
+    assert len(partials) == 3
+    expected_jobs, expected_australian, _ = fake_scrape_companies(None, COMPANIES)
+    key = lambda job: job['job_url']
+    assert sorted(merged['jobs'], key=key) == sorted((j for p in partials for j in p['jobs']), key=key)
+    assert sorted(merged['jobs'], key=key) == sorted(expected_jobs, key=key)
+    assert sorted(australian['jobs'], key=key) == sorted(expected_australian, key=key)
+    assert sorted(merged['companies_processed']) == COMPANIES
+
+
+def test_only_one_worker_merges(tmp_path, stub_scraping):
+    shards = sharding.partition_companies(COMPANIES, 3)
+    results = [lambda_function.run_shard_worker({
+        'run_id': 'run2',
+        'shard_id': shard_id,
+        'shard_count': len(shards),
+        'companies': shard,
+        'output_dir': str(tmp_path),
+        'merge_when_complete': True
+    }) for shard_id, shard in enumerate(shards)]
+
+    assert ['merge' in result for result in results] == [False, False, True]
+    # 重新执行最后一个分片（例如Lambda重试）不会再次合并
+    again = lambda_function.run_shard_worker({
+        'run_id': 'run2', 'shard_id': 2, 'shard_count': 3, 'companies': shards[2],
+        'output_dir': str(tmp_path), 'merge_when_complete': True
+    })
+    assert 'merge' not in again
+
+
+def test_local_claim_is_exclusive(tmp_path):
+    store = LocalOutputStore(str(tmp_path))
+    assert store.claim(merge_claim_key('r'), {'shard_id': 0})
+    assert not store.claim(merge_claim_key('r'), {'shard_id': 1})
+    assert store.read_json(merge_claim_key('r')) == {'shard_id': 0}
+
+
+@mock_aws
+def test_s3_claim_is_conditional():
+    client = boto3.client('s3')
+    client.create_bucket(Bucket='shard-bucket')
+    store = S3OutputStore('shard-bucket', s3_client=client)
+
+    assert store.claim(merge_claim_key('r'), {'shard_id': 0})
+    assert not store.claim(merge_claim_key('r'), {'shard_id': 1})
+    assert store.read_json(merge_claim_key('r')) == {'shard_id': 0}
@@ -0,0 +1,114 @@
+"""增量爬取状态：删除判定与跨部分运行的职位复用（职位数据从各公司的快照中复用）"""
+from utils.state_store import PostingStateStore, IncrementalRun
+
+
+def job(posting_id, title='Engineer'):
+    return {'job_title': title, 'job_url': f'https://jobs.lever.co/acme/{posting_id}'}
+
+
+def listing(*entries):
+    return [(f'https://jobs.lever.co/{company}/{posting_id}', text) for company, posting_id, text in entries]
+
+
+def snapshot_jobs(snapshots, state, companies):
+    """模拟 lambda_handler：从这些公司各自最近的快照中取出上一次的职位"""
+    previous = {}
+    for key in state.snapshot_keys(companies):
+        for job_data in snapshots[key]:
+            previous[job_data['job_url'].rsplit('/', 1)[-1]] = job_data
+    return previous
+
+
+def run_company(run, company, entries, fetched):
+    """模拟 get_company_jobs：fetched 中的职位详情抓取成功，其余失败"""
+    jobs, pending = run.plan(company, listing(*entries))
+    for job_url, entry_text in pending:
+        posting_id = job_url.rsplit('/', 1)[-1]
+        if posting_id in fetched:
+            data = job(posting_id, entry_text)
+            run.record(company, job_url, entry_text, data)
+            jobs.append(data)
+    return jobs
+
+
+def test_failed_detail_fetch_is_not_reported_as_removed(tmp_path):
+    state = PostingStateStore(path=str(tmp_path / 'state.json.gz'))
+    first = IncrementalRun(state)
+    snapshots = {'raw_data/first.json': run_company(
+        first, 'acme', [('acme', 'a', 'Engineer'), ('acme', 'b', 'Designer')], fetched={'a', 'b'})}
+    first.finish('raw_data/first.json')
+    first_hash = state.get_hash('b')
+
+    # b 的列表项变化但详情抓取失败
+    second = IncrementalRun(state, snapshot_jobs(snapshots, state, ['acme']))
+    run_company(second, 'acme', [('acme', 'a', 'Engineer'), ('acme', 'b', 'Senior Designer')], fetched=set())
+    delta = second.finish()
+
+    assert delta['removed'] == []
+    assert delta['changed'] == []
+    assert delta['fetch_failed_count'] == 1
+    assert state.get_hash('b') == first_hash
+
+    # 下一次抓取成功时报告为变化，而不是新增
+    third = IncrementalRun(state)
+    run_company(third, 'acme', [('acme', 'a', 'Engineer'), ('acme', 'b', 'Senior Designer')], fetched={'b'})
+    delta = third.finish()
+    assert [j['job_title'] for j in delta['changed']] == ['Senior Designer']
+    assert delta['added'] == []
+
+
+def test_postings_absent_from_listing_are_removed(tmp_path):
+    state = PostingStateStore(path=str(tmp_path / 'state.json.gz'))
+    first = IncrementalRun(state)
+    run_company(first, 'acme', [('acme', 'a', 'Engineer'), ('acme', 'b', 'Designer')], fetched={'a', 'b'})
+    first.finish()
+
+    second = IncrementalRun(state)
+    run_company(second, 'acme', [('acme', 'a', 'Engineer')], fetched=set())
+    delta = second.finish()
+
+    assert delta['removed'] == [{'posting_id': 'b', 'company_path': 'acme'}]
+    assert 'b' not in state.postings
+
+
+def test_unchanged_postings_reused_after_partial_runs(tmp_path):
+    path = str(tmp_path / 'state.json.gz')
+    state = PostingStateStore(path=path)
+
+    # 两次部分运行分别处理不同的公司，各自写出一个快照
+    snapshots = {}
+    part1 = IncrementalRun(state)
+    snapshots['raw_data/part1.json'] = run_company(part1, 'acme', [('acme', 'a', 'Engineer')], fetched={'a'})
+    part1.finish('raw_data/part1.json')
+    state.save()
+    part2 = IncrementalRun(state)
+    snapshots['raw_data/part2.json'] = run_company(part2, 'beta', [('beta', 'x', 'Analyst')], fetched={'x'})
+    part2.finish('raw_data/part2.json')
+    state.save()
+
+    reloaded = PostingStateStore(path=path)
+    reloaded.load()
+    # 状态中只有哈希和最后出现时间，职位数据从快照中复用
+    assert all(len(entry) == 3 for entry in reloaded.postings.values())
+    run = IncrementalRun(reloaded, snapshot_jobs(snapshots, reloaded, ['acme', 'beta']))
+    acme_jobs = run_company(run, 'acme', [('acme', 'a', 'Engineer')], fetched=set())
+    beta_jobs = run_company(run, 'beta', [('beta', 'x', 'Analyst')], fetched=set())
+    delta = run.finish()
+
+    assert [j['job_title'] for j in acme_jobs + beta_jobs] == ['Engineer', 'Analyst']
+    assert delta['unchanged_count'] == 2
+    assert delta['added'] == delta['changed'] == delta['removed'] == []
+
+
+def test_posting_missing_from_snapshot_is_fetched_again(tmp_path):
+    state = PostingStateStore(path=str(tmp_path / 'state.json.gz'))
+    first = IncrementalRun(state)
+    run_company(first, 'acme', [('acme', 'a', 'Engineer')], fetched={'a'})
+    first.finish('raw_data/lost.json')
+
+    # 快照无法读取时未变化的职位重新抓取详情，而不是被丢弃
+    run = IncrementalRun(state, previous_jobs={})
+    jobs, pending = run.plan('acme', listing(('acme', 'a', 'Engineer')))
+
+    assert jobs == []
+    assert [url for url, _ in pending] == ['https://jobs.lever.co/acme/a']
@@ -0,0 +1,102 @@
+"""
+基于asyncio的并发抓取引擎
+"""
+import asyncio
+import time
+import logging
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """令牌桶限速器 - 以固定速率补充令牌，允许少量突发请求"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """获取一个令牌，令牌不足时等待补充"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncFetcher:
+    """并发HTTP抓取器
+
+    - max_concurrency: 全局同时进行的请求数上限
+    - per_host_limit: 单个主机同时进行的请求数上限
+    - requests_per_second / burst: 每个主机的令牌桶礼貌预算，替代固定的sleep延迟
+
+    必须在事件循环内通过 ``async with`` 创建和使用。
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, max_concurrency: int = 20,
+                 per_host_limit: int = 4, requests_per_second: float = 1.0,
+                 burst: Optional[float] = None, timeout: float = 10):
+        self.headers = headers or {}
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.timeout = timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._global_limit = asyncio.Semaphore(max_concurrency)
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._host_buckets: Dict[str, TokenBucket] = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host_limit)
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+
+    def _host_state(self, host: str):
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+            self._host_buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+        return self._host_limits[host], self._host_buckets[host]
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        """获取URL内容，失败时返回None"""
+        result = await self.request(url)
+        if result is None:
+            return None
+        status, _, body = result
+        if status >= 400:
+            logger.error(f"抓取失败 {url}: HTTP {status}")
+            return None
+        return body
+
+    async def request(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """发送GET请求（可附带条件请求头），返回 (状态码, 响应头, 响应体)，网络错误时返回None"""
+        host_limit, bucket = self._host_state(urlsplit(url).netloc)
+        try:
+            async with self._global_limit, host_limit:
+                await bucket.acquire()
+                async with self.session.get(url, headers=headers) as response:
+                    return response.status, dict(response.headers), await response.read()
+        except Exception as e:
+            logger.error(f"抓取失败 {url}: {str(e)}")
+            return None
@@ -0,0 +1,80 @@
+"""
+Lambda执行时间预算与断点续爬
+"""
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineBudget:
+    """执行时间预算 - 根据 context.get_remaining_time_in_millis() 判断是否还能开始下一项工作
+
+    reserve_ms 预留给保存结果和写断点，已观察到的单项最长耗时作为下一项的预估耗时；
+    还没有观察值时使用配置的 estimate_ms。context 为 None（本地运行）时预算不受限制。
+    """
+
+    def __init__(self, context=None, reserve_ms: int = 60000, estimate_ms: int = 0):
+        self.context = context
+        self.reserve_ms = reserve_ms
+        self.estimate_ms = estimate_ms
+        self.longest_ms = 0.0
+
+    def remaining_ms(self) -> Optional[float]:
+        if self.context is None or not hasattr(self.context, 'get_remaining_time_in_millis'):
+            return None
+        return self.context.get_remaining_time_in_millis()
+
+    def record(self, elapsed_seconds: float):
+        """记录一项工作的耗时"""
+        self.longest_ms = max(self.longest_ms, elapsed_seconds * 1000)
+
+    def can_start_next(self) -> bool:
+        remaining = self.remaining_ms()
+        if remaining is None:
+            return True
+        return remaining - self.reserve_ms > (self.longest_ms or self.estimate_ms)
+
+    def expired(self) -> bool:
+        """剩余时间已进入预留区间，正在进行的工作应当停止"""
+        remaining = self.remaining_ms()
+        return remaining is not None and remaining <= self.reserve_ms
+
+
+class ContinuationCursor:
+    """断点游标 - 记录未完成的公司列表和下一次开始的位置，保存在S3"""
+
+    def __init__(self, bucket_name: str, key: str = 'state/cursor.json', s3_client=None):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.s3_client = s3_client or boto3.client('s3')
+
+    def load(self) -> Optional[Dict]:
+        """读取游标，不存在时返回None"""
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.key)
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read().decode('utf-8'))
+
+    def save(self, run_id: str, companies: List[str], next_index: int, part: int):
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            Body=json.dumps({
+                'run_id': run_id,
+                'companies': companies,
+                'next_index': next_index,
+                'part': part,
+                'updated_at': datetime.now().isoformat()
+            }, ensure_ascii=False),
+            ContentType='application/json'
+        )
+        logger.info(f"已写入断点游标: {next_index}/{len(companies)}")
+
+    def clear(self):
+        self.s3_client.delete_object(Bucket=self.bucket_name, Key=self.key)
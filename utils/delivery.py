@@ -0,0 +1,148 @@
+"""
+后端API投递客户端
+职位按序列化后的大小切分为多个分块，每个分块gzip压缩后通过长连接会话并发发送；
+失败的分块按指数退避重试，并携带根据内容生成的幂等键，后端可据此忽略重复投递
+"""
+import gzip
+import hashlib
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 这些状态码视为暂时性错误，可以重试；其他4xx直接判定失败
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class BackendDeliveryClient:
+    """分块、压缩、并发的职位投递客户端"""
+
+    def __init__(self, api_endpoint: str, api_token: str = '', max_chunk_bytes: int = 512 * 1024,
+                 max_workers: int = 4, max_retries: int = 3, backoff_base: float = 0.5,
+                 timeout: int = 30, compresslevel: int = 6, session: Optional[requests.Session] = None):
+        self.api_endpoint = api_endpoint
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.compresslevel = compresslevel
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.headers = {
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+            'Authorization': f'Bearer {api_token}'
+        }
+
+    def build_chunks(self, jobs: List[Dict], table: str = 'jobsprofiles') -> List[Dict]:
+        """按序列化后的大小切分职位，返回 [{'jobs': 数量, 'body': 未压缩的请求体}]
+
+        每条职位只序列化一次，请求体直接由序列化结果拼接；单条职位超过上限时单独成为一个分块。
+        """
+        prefix = ('{"table": ' + json.dumps(table) + ', "data": [').encode('utf-8')
+        suffix = b']}'
+        overhead = len(prefix) + len(suffix)
+
+        chunks = []
+        current: List[bytes] = []
+        current_size = overhead
+        for job in jobs:
+            encoded = json.dumps(job, ensure_ascii=False).encode('utf-8')
+            if current and current_size + len(encoded) + 1 > self.max_chunk_bytes:
+                chunks.append(current)
+                current, current_size = [], overhead
+            current.append(encoded)
+            current_size += len(encoded) + 1
+        if current:
+            chunks.append(current)
+
+        return [{'jobs': len(chunk), 'body': prefix + b','.join(chunk) + suffix} for chunk in chunks]
+
+    def deliver(self, jobs: List[Dict], table: str = 'jobsprofiles') -> Dict:
+        """投递所有职位，返回投递报告（包含每个分块的耗时和发送字节数）"""
+        started = time.monotonic()
+        chunks = self.build_chunks(jobs, table)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(chunks), 1))) as executor:
+            results = list(executor.map(lambda item: self._send_chunk(*item), enumerate(chunks)))
+
+        delivered = sum(r['jobs'] for r in results if r['ok'])
+        return {
+            'success': all(r['ok'] for r in results),
+            'total_jobs': len(jobs),
+            'delivered_jobs': delivered,
+            'chunks': results,
+            'raw_bytes': sum(r['raw_bytes'] for r in results),
+            'bytes_sent': sum(r['bytes_sent'] for r in results),
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1)
+        }
+
+    def _send_chunk(self, index: int, chunk: Dict) -> Dict:
+        body = chunk['body']
+        compressed = gzip.compress(body, compresslevel=self.compresslevel)
+        # 幂等键由内容生成，重试以及Lambda整体重跑时相同的分块都会得到相同的键
+        headers = dict(self.headers, **{'Idempotency-Key': hashlib.sha256(body).hexdigest()})
+
+        result = {
+            'index': index,
+            'jobs': chunk['jobs'],
+            'raw_bytes': len(body),
+            'bytes_sent': 0,
+            'attempts': 0,
+            'status': None,
+            'ok': False,
+            'error': None,
+            'batch_id': None
+        }
+        started = time.monotonic()
+
+        for attempt in range(self.max_retries + 1):
+            result['attempts'] = attempt + 1
+            result['bytes_sent'] += len(compressed)
+            retry_after = None
+            try:
+                response = self.session.post(self.api_endpoint, data=compressed, headers=headers, timeout=self.timeout)
+                result['status'] = response.status_code
+                # 异步接收的后端返回202和批次ID，同样视为送达
+                if 200 <= response.status_code < 300:
+                    result['ok'] = True
+                    result['error'] = None
+                    result['batch_id'] = self._batch_id(response)
+                    break
+                result['error'] = response.text[:200]
+                if response.status_code not in RETRYABLE_STATUS:
+                    break
+                retry_after = response.headers.get('Retry-After')
+            except requests.RequestException as e:
+                result['error'] = str(e)
+
+            if attempt < self.max_retries:
+                delay = self.backoff_base * (2 ** attempt) * (1 + random.random())
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+                logger.warning(f"分块 {index} 第 {attempt + 1} 次发送失败（{result['error']}），{delay:.1f}s 后重试")
+                time.sleep(delay)
+
+        result['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+    @staticmethod
+    def _batch_id(response) -> Optional[str]:
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        return body.get('batch_id') if isinstance(body, dict) else None
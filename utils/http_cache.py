@@ -0,0 +1,310 @@
+"""
+持久化HTTP条件请求缓存（ETag / Last-Modified）
+缓存响应体、校验信息和解析结果；服务端返回304时直接复用上次的解析结果
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import logging
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCacheStore:
+    """本地磁盘缓存存储 - 每个条目对应一个元数据文件和一个响应体文件"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def load(self, key: str) -> Optional[Dict]:
+        """读取元数据（含解析结果）；命中时不需要响应体，只取其大小"""
+        try:
+            with open(self._path(key, 'json'), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if 'size' not in entry:
+                entry['size'] = os.path.getsize(self._path(key, 'body'))
+        except (FileNotFoundError, ValueError):
+            return None
+        return entry
+
+    def touch(self, key: str):
+        """记录最近使用时间，用于LRU淘汰"""
+        try:
+            os.utime(self._path(key, 'json'))
+        except FileNotFoundError:
+            pass
+
+    def save(self, key: str, entry: Dict):
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        with open(self._path(key, 'body'), 'wb') as f:
+            f.write(entry['body'])
+        with open(self._path(key, 'json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    def delete(self, key: str):
+        for suffix in ('json', 'body'):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def index(self) -> Dict[str, Dict]:
+        """返回 {key: {'size': 响应体字节数, 'last_used': 时间戳}}"""
+        entries = {}
+        for item in os.scandir(self.directory):
+            key, _, suffix = item.name.rpartition('.')
+            if suffix not in ('json', 'body'):
+                continue
+            stat = item.stat()
+            info = entries.setdefault(key, {'size': 0, 'last_used': 0})
+            if suffix == 'body':
+                info['size'] = stat.st_size
+            else:
+                info['last_used'] = stat.st_mtime
+        return entries
+
+
+class S3CacheStore:
+    """S3前缀缓存存储 - 适用于Lambda等本地磁盘不持久的环境"""
+
+    def __init__(self, bucket_name: str, prefix: str = 'http_cache/', s3_client=None):
+        self.bucket_name = bucket_name
+        self.prefix = prefix if prefix.endswith('/') else prefix + '/'
+        self.s3_client = s3_client or boto3.client('s3')
+
+    def _key(self, key: str, suffix: str) -> str:
+        return f"{self.prefix}{key}.{suffix}"
+
+    def load(self, key: str) -> Optional[Dict]:
+        """只下载元数据对象（含解析结果和响应体大小），响应体对象留在S3中"""
+        try:
+            meta = self.s3_client.get_object(Bucket=self.bucket_name, Key=self._key(key, 'json'))
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        entry = json.loads(meta['Body'].read().decode('utf-8'))
+        if 'size' not in entry:
+            # 早期条目的元数据中没有大小
+            try:
+                head = self.s3_client.head_object(Bucket=self.bucket_name, Key=self._key(key, 'body'))
+            except self.s3_client.exceptions.ClientError:
+                return None
+            entry['size'] = head['ContentLength']
+        return entry
+
+    def touch(self, key: str):
+        """原地复制元数据对象以更新LastModified（最近使用时间），用于LRU淘汰"""
+        meta_key = self._key(key, 'json')
+        self.s3_client.copy_object(
+            Bucket=self.bucket_name,
+            Key=meta_key,
+            CopySource={'Bucket': self.bucket_name, 'Key': meta_key},
+            MetadataDirective='REPLACE',
+            ContentType='application/json'
+        )
+
+    def save(self, key: str, entry: Dict):
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=self._key(key, 'body'), Body=entry['body'])
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=self._key(key, 'json'),
+            Body=json.dumps(meta, ensure_ascii=False),
+            ContentType='application/json'
+        )
+
+    def delete(self, key: str):
+        self.s3_client.delete_objects(
+            Bucket=self.bucket_name,
+            Delete={'Objects': [{'Key': self._key(key, 'json')}, {'Key': self._key(key, 'body')}]}
+        )
+
+    def index(self) -> Dict[str, Dict]:
+        entries = {}
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=self.prefix):
+            for obj in page.get('Contents', []):
+                key, _, suffix = obj['Key'][len(self.prefix):].rpartition('.')
+                info = entries.setdefault(key, {'size': 0, 'last_used': 0})
+                if suffix == 'body':
+                    info['size'] = obj['Size']
+                info['last_used'] = max(info['last_used'], obj['LastModified'].timestamp())
+        return entries
+
+
+class ConditionalRequestCache:
+    """条件请求缓存
+
+    发送请求时附带 If-None-Match / If-Modified-Since，304时复用缓存的解析结果；
+    总大小超过 max_bytes 时按最近使用时间淘汰旧条目。
+    解析结果与 version（解析器版本）一起保存，版本不同的条目不发送条件请求，重新下载并解析。
+    """
+
+    def __init__(self, store, max_bytes: int = 256 * 1024 * 1024):
+        self.store = store
+        self.max_bytes = max_bytes
+        self._index: Optional[Dict[str, Dict]] = None
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'errors': 0,
+            'evictions': 0,
+            'bytes_downloaded': 0,
+            'bytes_saved': 0,
+        }
+
+    @staticmethod
+    def cache_key(namespace: str, url: str) -> str:
+        return hashlib.sha256(f"{namespace}\n{url}".encode('utf-8')).hexdigest()
+
+    def fetch(self, session, url: str, parse: Callable[[bytes], Any], namespace: str = 'default',
+              timeout: int = 10, version: str = '') -> Any:
+        """获取URL并返回解析结果，未变化的页面不重新下载和解析"""
+        key = self.cache_key(namespace, url)
+        entry = self._load(key, url, version)
+
+        response = session.get(url, headers=self._conditional_headers(entry), timeout=timeout)
+        if response.status_code == 304 and entry:
+            return self._hit(key, entry)
+
+        response.raise_for_status()
+        return self._miss(key, url, version, response.content, response.headers, parse)
+
+    async def fetch_async(self, fetcher, url: str, parse: Callable[[bytes], Any], namespace: str = 'default',
+                          version: str = '') -> Any:
+        """fetch 的异步版本，通过 AsyncFetcher 发送请求，请求失败时返回None
+
+        缓存存储的读写和解析在线程中执行，不阻塞事件循环。
+        """
+        key = self.cache_key(namespace, url)
+        entry = await asyncio.to_thread(self._load, key, url, version)
+
+        result = await fetcher.request(url, self._conditional_headers(entry))
+        if result is None:
+            return None
+        status, headers, body = result
+        if status == 304 and entry:
+            return await asyncio.to_thread(self._hit, key, entry)
+        if status >= 400:
+            logger.error(f"抓取失败 {url}: HTTP {status}")
+            return None
+        return await asyncio.to_thread(self._miss, key, url, version, body, headers, parse)
+
+    def _load(self, key: str, url: str, version: str) -> Optional[Dict]:
+        try:
+            entry = self.store.load(key)
+        except Exception as e:
+            logger.error(f"读取缓存失败 {url}: {str(e)}")
+            self.stats['errors'] += 1
+            return None
+        # 解析器版本变化后，旧的解析结果不能复用
+        if entry and entry.get('version', '') != version:
+            return None
+        return entry
+
+    @staticmethod
+    def _conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _hit(self, key: str, entry: Dict) -> Any:
+        with self._lock:
+            self.stats['hits'] += 1
+            self.stats['bytes_saved'] += entry['size']
+            if self._index is not None and key in self._index:
+                self._index[key]['last_used'] = time.time()
+        try:
+            self.store.touch(key)
+        except Exception as e:
+            logger.error(f"更新缓存使用时间失败 {entry['url']}: {str(e)}")
+        return entry['parsed']
+
+    def _miss(self, key: str, url: str, version: str, content: bytes, headers, parse: Callable[[bytes], Any]) -> Any:
+        with self._lock:
+            self.stats['misses'] += 1
+            self.stats['bytes_downloaded'] += len(content)
+        parsed = parse(content)
+
+        headers = {name.lower(): value for name, value in headers.items()}
+        etag = headers.get('etag')
+        last_modified = headers.get('last-modified')
+        if etag or last_modified:
+            self._store(key, {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'version': version,
+                'parsed': parsed,
+                'stored_at': time.time(),
+                'size': len(content),
+                'body': content,
+            })
+        return parsed
+
+    def _store(self, key: str, entry: Dict):
+        try:
+            self.store.save(key, entry)
+        except Exception as e:
+            logger.error(f"写入缓存失败 {entry['url']}: {str(e)}")
+            self.stats['errors'] += 1
+            return
+
+        with self._lock:
+            if self._index is None:
+                self._index = self.store.index()
+            self._index[key] = {'size': entry['size'], 'last_used': entry['stored_at']}
+            victims = self._select_evictions()
+        # 删除存储中的条目（S3请求）不持有锁，不阻塞其他线程的命中统计
+        for victim in victims:
+            try:
+                self.store.delete(victim)
+            except Exception as e:
+                logger.error(f"淘汰缓存条目失败 {victim}: {str(e)}")
+
+    def _select_evictions(self) -> list:
+        """按最近使用时间选出需要淘汰的条目并从索引中移除（调用方持有锁）"""
+        total = sum(info['size'] for info in self._index.values())
+        victims = []
+        for key, info in sorted(self._index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            victims.append(key)
+            total -= info['size']
+        for key in victims:
+            del self._index[key]
+        self.stats['evictions'] += len(victims)
+        return victims
+
+    def get_stats(self) -> Dict:
+        """返回命中/未命中计数以及节省的带宽"""
+        requests_made = self.stats['hits'] + self.stats['misses']
+        stats = dict(self.stats)
+        stats['hit_rate'] = round(self.stats['hits'] / requests_made, 4) if requests_made else 0.0
+        return stats
+
+
+def build_cache_from_env(bucket_name: Optional[str] = None) -> Optional[ConditionalRequestCache]:
+    """根据环境变量创建缓存：HTTP_CACHE_DIR 使用本地磁盘，HTTP_CACHE_S3_PREFIX 使用S3"""
+    max_bytes = int(float(os.environ.get('HTTP_CACHE_MAX_MB', '256')) * 1024 * 1024)
+    cache_dir = os.environ.get('HTTP_CACHE_DIR')
+    s3_prefix = os.environ.get('HTTP_CACHE_S3_PREFIX')
+    if cache_dir:
+        return ConditionalRequestCache(DiskCacheStore(cache_dir), max_bytes=max_bytes)
+    if s3_prefix and bucket_name:
+        return ConditionalRequestCache(S3CacheStore(bucket_name, s3_prefix), max_bytes=max_bytes)
+    return None
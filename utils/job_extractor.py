@@ -0,0 +1,112 @@
+"""
+职位详情页提取引擎
+使用lxml解析，SoupStrainer只保留选择器表中涉及的元素，一次遍历解析出所有字段
+"""
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# 声明式选择器表，LeverJobScraper 和 LeverScraperUtils 共用
+# 字段 -> [(标签, class), ...]，按优先级排列；class为None表示任意该标签，多个class需同时具备
+JOB_PAGE_SELECTORS: Dict[str, List[Tuple[str, Optional[str]]]] = {
+    'job_title': [('h2', 'posting-headline'), ('h1', 'posting-headline'), ('h1', None), ('h2', None)],
+    'company_name': [('a', 'company-link'), ('div', 'company-name')],
+    'location': [('div', 'location'), ('span', 'location'), ('div', 'posting-categories')],
+    'department': [('div', 'department'), ('span', 'department')],
+    'team': [('div', 'team'), ('span', 'team')],
+    'description': [('div', 'section page-centered'), ('div', 'description'), ('div', 'content'),
+                    ('div', 'job-description')],
+    'requirements': [('div', 'requirements')],
+    'benefits': [('div', 'benefits')],
+}
+
+# 选择器表或提取规则变化时递增，缓存中旧版本的解析结果随之失效
+EXTRACTOR_VERSION = 1
+# 列表页解析或职位字典字段变化时递增
+PARSER_VERSION = 1
+# 缓存中解析结果的版本，LeverJobScraper 和 LeverScraperUtils 共用
+PARSED_VERSION = f"{PARSER_VERSION}.{EXTRACTOR_VERSION}"
+
+# 这些字段拼接所有匹配最高优先级选择器的元素（例如多个描述段落）
+MULTI_MATCH_FIELDS = {'description'}
+
+
+class _SelectorStrainer(SoupStrainer):
+    """解析阶段过滤器，按 (标签, class) 判断是否保留元素
+
+    同时实现 beautifulsoup4 4.12 的 search_tag 和 4.13+ 的 allow_tag_creation 接口。
+    """
+
+    def __init__(self, wanted):
+        super().__init__()
+        self._wanted = wanted
+
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        return markup_name if self._wanted(markup_name, markup_attrs) else None
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self._wanted(name, attrs)
+
+    def allow_string_creation(self, string):
+        return False
+
+
+def _class_set(value) -> frozenset:
+    if not value:
+        return frozenset()
+    if isinstance(value, str):
+        return frozenset(value.split())
+    return frozenset(value)
+
+
+class JobPageExtractor:
+    """基于选择器表的单次遍历提取器"""
+
+    def __init__(self, selectors: Dict[str, List[Tuple[str, Optional[str]]]] = None, parser: str = 'lxml'):
+        self.selectors = selectors or JOB_PAGE_SELECTORS
+        self.parser = parser
+
+        # 按标签名建立索引: 标签 -> [(字段, 优先级, 需要的class集合)]
+        self._by_tag: Dict[str, List[Tuple[str, int, frozenset]]] = {}
+        for field, candidates in self.selectors.items():
+            for priority, (tag, classes) in enumerate(candidates):
+                self._by_tag.setdefault(tag, []).append((field, priority, _class_set(classes)))
+
+        self._strainer = _SelectorStrainer(self._wanted)
+
+    def _wanted(self, name, attrs) -> bool:
+        """解析阶段过滤：只保留可能匹配选择器的元素（及其子树）"""
+        rules = self._by_tag.get(name)
+        if not rules:
+            return False
+        classes = _class_set((attrs or {}).get('class'))
+        return any(required <= classes for _, _, required in rules)
+
+    def extract(self, html) -> Dict[str, str]:
+        """解析页面，返回 {字段: 文本}，未找到的字段为空字符串"""
+        soup = BeautifulSoup(html, self.parser, parse_only=self._strainer)
+
+        best: Dict[str, Tuple[int, list]] = {}
+        for element in soup.find_all(True):
+            rules = self._by_tag.get(element.name)
+            if not rules:
+                continue
+            classes = _class_set(element.get('class'))
+            for field, priority, required in rules:
+                if not required <= classes:
+                    continue
+                current = best.get(field)
+                if current is None or priority < current[0]:
+                    best[field] = (priority, [element])
+                elif priority == current[0] and field in MULTI_MATCH_FIELDS:
+                    current[1].append(element)
+
+        result = {}
+        for field in self.selectors:
+            if field not in best:
+                result[field] = ""
+            elif field in MULTI_MATCH_FIELDS:
+                result[field] = "\n".join(el.get_text(strip=True) for el in best[field][1])
+            else:
+                result[field] = best[field][1][0].get_text(strip=True)
+        return result
@@ -0,0 +1,109 @@
+"""
+流式JSON解码
+逐块读取快照文件，逐条解析JSON数组（或对象中指定键下的数组）中的元素和NDJSON行，内存占用只与单条记录大小有关
+"""
+import codecs
+import json
+import re
+import zlib
+from typing import Dict, Iterable, Iterator, Optional
+
+_WHITESPACE = re.compile(r'[\s,]*')
+
+
+def iter_decoded_chunks(chunks: Iterable[bytes], gzipped: bool = False) -> Iterator[str]:
+    """将字节块（可选gzip压缩）增量解码为UTF-8文本块"""
+    decompressor = zlib.decompressobj(31) if gzipped else None  # 31 = gzip格式
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in chunks:
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decompressor.flush() if decompressor is not None else b''
+    text = decoder.decode(tail, final=True)
+    if text:
+        yield text
+
+
+def iter_json_array(texts: Iterable[str], array_key: Optional[str] = None) -> Iterator[Dict]:
+    """逐条解析JSON数组中的元素
+
+    array_key 为None时解析顶层数组，否则解析顶层对象中该键对应的数组（例如快照中的 "jobs"）。
+    """
+    decoder = json.JSONDecoder()
+    start_pattern = re.compile(r'\s*\[') if array_key is None else re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+    texts = iter(texts)
+    buffer = ''
+
+    # 找到数组开始的位置
+    while True:
+        match = start_pattern.match(buffer) if array_key is None else start_pattern.search(buffer)
+        if match:
+            position = match.end()
+            break
+        chunk = next(texts, None)
+        if chunk is None:
+            return
+        # 未找到时只保留末尾部分，避免数组之前的大段内容占用内存
+        buffer = buffer[-(len(array_key or '') + 64):] + chunk if array_key else buffer + chunk
+
+    while True:
+        position = _WHITESPACE.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # 当前缓冲区中的元素不完整，读取更多数据
+            chunk = next(texts, None)
+            if chunk is None:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+        position = end
+        if position > 1024 * 1024:
+            buffer = buffer[position:]
+            position = 0
+
+
+def iter_ndjson(texts: Iterable[str]) -> Iterator[Dict]:
+    """逐行解析NDJSON"""
+    pending = ''
+    for chunk in texts:
+        pending += chunk
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def iter_snapshot_jobs(chunks: Iterable[bytes], key: str) -> Iterator[Dict]:
+    """按文件名解析快照中的职位：*.ndjson[.gz] 为NDJSON，其他为包含 "jobs" 数组的JSON（或顶层数组）"""
+    texts = iter_decoded_chunks(chunks, gzipped=key.endswith('.gz'))
+    if '.ndjson' in key:
+        return iter_ndjson(texts)
+    return _iter_json_jobs(texts)
+
+
+def _iter_json_jobs(texts: Iterator[str]) -> Iterator[Dict]:
+    # 根据第一个非空白字符判断是顶层数组还是快照对象
+    buffer = ''
+    for chunk in texts:
+        buffer += chunk
+        if buffer.strip():
+            break
+    rest = _chain(buffer, texts)
+    if buffer.lstrip().startswith('['):
+        return iter_json_array(rest)
+    return iter_json_array(rest, array_key='jobs')
+
+
+def _chain(first: str, rest: Iterator[str]) -> Iterator[str]:
+    yield first
+    yield from rest
@@ -0,0 +1,102 @@
+"""
+多关键词匹配器
+将关键词和公司列表一次性编译为按前缀树组织的单个正则（带词边界），一次扫描文本即可完成分类
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# 澳大利亚地名关键词
+AUSTRALIAN_KEYWORDS = [
+    'australia', 'australian', 'sydney', 'melbourne', 'brisbane',
+    'perth', 'adelaide', 'canberra', 'darwin', 'hobart',
+    'nsw', 'vic', 'qld', 'wa', 'sa', 'tas', 'nt', 'act'
+]
+
+# 已知的澳大利亚公司（Lever公司路径）
+KNOWN_AUSTRALIAN_COMPANIES = [
+    'atlassian', 'canva', 'afterpay', 'xero', 'wisetech',
+    'seek', 'carsales', 'realestate', 'domain', 'rea-group',
+    'commonwealth-bank', 'anz', 'westpac', 'nab', 'macquarie',
+    'telstra', 'optus', 'tpg', 'woolworths', 'coles',
+    'bhp', 'rio-tinto', 'fortescue', 'woodside', 'origin',
+    'qantas', 'virgin-australia', 'jetstar', 'flight-centre',
+    'medibank', 'bupa', 'nib', 'ahm', 'hcf',
+    'australian-super', 'rest', 'hostplus', 'united-super',
+    'airtasker', 'hipages', 'service-seeking', 'oneflare',
+    'prospa', 'societyone', 'ratesetter', 'money-me',
+    'zip', 'humm', 'laybuy', 'klarna', 'affirm',
+    'culture-amp', 'safetyculture', 'enboard', 'deputy',
+    'myob', 'reckon', 'sage', 'intuit', 'wave',
+    'square', 'stripe', 'paypal', 'adyen', 'braintree'
+]
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """将词表构建为前缀树并转换为正则，匹配开销取决于词长而不是词的数量"""
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: Dict) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # 前缀树中更长的词优先，使匹配结果与最长匹配一致
+        return f'(?:{body})?' if terminal else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """编译后的关键词匹配器（不区分大小写，按词边界匹配）"""
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = sorted({term.strip().lower() for term in terms if term and term.strip()})
+        if self.terms:
+            self.pattern = re.compile(r'(?<![a-z0-9])(' + _trie_pattern(self.terms) + r')(?![a-z0-9])')
+        else:
+            self.pattern = None
+
+    def search(self, text: str) -> Optional[re.Match]:
+        """返回文本中第一个匹配，没有匹配时返回None"""
+        if not text or self.pattern is None:
+            return None
+        return self.pattern.search(text.lower())
+
+
+class AustralianClassifier:
+    """澳大利亚公司/职位分类器"""
+
+    def __init__(self, keywords: Sequence[str] = AUSTRALIAN_KEYWORDS,
+                 companies: Sequence[str] = KNOWN_AUSTRALIAN_COMPANIES):
+        self.matcher = KeywordMatcher(list(companies) + list(keywords))
+
+    def classify(self, job: Dict, fields: Sequence[str] = ('company_name', 'location', 'description')) -> Optional[Dict]:
+        """一次扫描职位的多个字段，返回 {'field': 命中字段, 'term': 命中的词}，未命中返回None"""
+        values = [str(job.get(field) or '') for field in fields]
+        match = self.matcher.search('\n'.join(values))
+        if match is None:
+            return None
+
+        # 根据匹配位置换算出命中的字段
+        offset = match.start()
+        for field, value in zip(fields, values):
+            if offset <= len(value):
+                return {'field': field, 'term': match.group(1)}
+            offset -= len(value) + 1
+        return {'field': fields[-1], 'term': match.group(1)}
+
+    def classify_batch(self, jobs: Iterable[Dict],
+                       fields: Sequence[str] = ('company_name', 'location', 'description')) -> List[Optional[Dict]]:
+        """批量分类，返回与输入顺序一致的匹配结果列表"""
+        return [self.classify(job, fields) for job in jobs]
+
+    def match_company(self, company_name: str, company_path: str = '') -> Optional[Dict]:
+        """按公司名称和路径判断是否为澳大利亚公司"""
+        return self.classify({'company_name': company_name, 'company_path': company_path},
+                             fields=('company_name', 'company_path'))
@@ -0,0 +1,85 @@
+"""
+Lever postings JSON API 客户端
+每家公司只需一次（分页）结构化请求即可获取全部职位，无需逐个解析HTML详情页
+"""
+import html
+import re
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+LEVER_POSTINGS_API = "https://api.lever.co/v0/postings"
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def html_to_text(fragment: Optional[str]) -> str:
+    """将API返回的HTML片段转换为纯文本"""
+    if not fragment:
+        return ""
+    return _SPACE_RE.sub(' ', html.unescape(_TAG_RE.sub(' ', fragment))).strip()
+
+
+def posting_to_job(posting: Dict, company_path: str) -> Dict:
+    """将postings API返回的单个职位映射为爬虫的职位字典格式"""
+    categories = posting.get('categories') or {}
+
+    requirements = []
+    for item in posting.get('lists') or []:
+        content = html_to_text(item.get('content'))
+        heading = (item.get('text') or '').strip()
+        requirements.append(f"{heading}: {content}" if heading else content)
+
+    return {
+        'job_title': (posting.get('text') or '').strip(),
+        'company_name': company_path,
+        'company_path': company_path,
+        'location': categories.get('location') or '',
+        'department': categories.get('department') or '',
+        'team': categories.get('team') or '',
+        'description': posting.get('descriptionPlain') or html_to_text(posting.get('description')),
+        'requirements': "\n".join(requirements),
+        'benefits': posting.get('additionalPlain') or html_to_text(posting.get('additional')),
+        'job_url': posting.get('hostedUrl') or '',
+        'scraped_at': datetime.now().isoformat()
+    }
+
+
+class LeverPostingsClient:
+    """Lever postings API 客户端（``?mode=json``，支持分页）"""
+
+    def __init__(self, session: Optional[requests.Session] = None, api_base_url: str = LEVER_POSTINGS_API,
+                 page_size: int = 100, timeout: int = 30):
+        self.session = session or requests.Session()
+        self.api_base_url = api_base_url.rstrip('/')
+        self.page_size = page_size
+        self.timeout = timeout
+
+    def page_url(self, company_slug: str, skip: int = 0) -> str:
+        """构建指定分页的API地址"""
+        return f"{self.api_base_url}/{company_slug}?mode=json&skip={skip}&limit={self.page_size}"
+
+    def is_last_page(self, page: List[Dict]) -> bool:
+        """返回条数不足一页时说明已经到达末页"""
+        return len(page) < self.page_size
+
+    def iter_postings(self, company_slug: str) -> Iterator[Dict]:
+        """逐页遍历公司的全部职位"""
+        skip = 0
+        while True:
+            response = self.session.get(self.page_url(company_slug, skip), timeout=self.timeout)
+            response.raise_for_status()
+            page = response.json()
+            yield from page
+            if self.is_last_page(page):
+                break
+            skip += len(page)
+
+    def get_company_jobs(self, company_slug: str) -> List[Dict]:
+        """获取公司全部职位并映射为职位字典"""
+        return [posting_to_job(posting, company_slug) for posting in self.iter_postings(company_slug)]
@@ -0,0 +1,121 @@
+"""
+Parquet数据湖输出
+按 dt=YYYY-MM-DD/company=<公司路径> 的Hive风格分区写出列式文件，低基数字符串列使用字典编码并写入行组统计信息
+需要额外安装 pyarrow
+"""
+import io
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import quote
+import logging
+
+import boto3
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# 职位字段均按字符串存储；is_australian 标记是否为澳大利亚职位
+JOB_COLUMNS = [
+    'job_title', 'company_name', 'company_path', 'location', 'department', 'team',
+    'description', 'requirements', 'benefits', 'job_url', 'scraped_at'
+]
+
+# 低基数列使用字典编码
+DICTIONARY_COLUMNS = ['company_name', 'company_path', 'location', 'department', 'team', 'job_title']
+
+
+def jobs_to_table(jobs: List[Dict], australian_flags: List[bool]):
+    """将职位字典列表转换为 pyarrow Table"""
+    columns = {
+        name: pa.array([None if job.get(name) is None else str(job.get(name)) for job in jobs], type=pa.string())
+        for name in JOB_COLUMNS
+    }
+    columns['is_australian'] = pa.array(australian_flags, type=pa.bool_())
+    return pa.table(columns)
+
+
+class ParquetPartitionSink:
+    """Parquet分区输出，写入S3（bucket_name）或本地目录（base_dir）
+
+    每家公司的职位在 add() 时立即写成一个分区文件，不在内存中累积。
+    """
+
+    def __init__(self, bucket_name: Optional[str] = None, prefix: str = 'parquet/jobs',
+                 base_dir: Optional[str] = None, scrape_date: Optional[str] = None,
+                 run_id: Optional[str] = None, s3_client=None, row_group_size: int = 50000,
+                 compression: str = 'snappy'):
+        if pa is None:
+            raise ImportError("Parquet输出需要安装 pyarrow: pip install pyarrow")
+        self.bucket_name = bucket_name
+        self.prefix = prefix.strip('/')
+        self.base_dir = base_dir
+        self.scrape_date = scrape_date or datetime.now().strftime('%Y-%m-%d')
+        self.run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.s3_client = s3_client or (boto3.client('s3') if bucket_name and not base_dir else None)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.files: List[str] = []
+        self.rows = 0
+
+    def partition_key(self, company_path: str) -> str:
+        company = quote(company_path or 'unknown', safe='')
+        return f"{self.prefix}/dt={self.scrape_date}/company={company}/part-{self.run_id}.parquet"
+
+    def add(self, jobs: List[Dict], australian_jobs: List[Dict]):
+        """写入一批职位（通常为一家公司），按公司路径分组写出分区文件"""
+        if not jobs:
+            return
+        australian_ids = {id(job) for job in australian_jobs}
+        by_company: Dict[str, List[Dict]] = {}
+        for job in jobs:
+            by_company.setdefault(job.get('company_path') or 'unknown', []).append(job)
+
+        for company_path, company_jobs in by_company.items():
+            table = jobs_to_table(company_jobs, [id(job) in australian_ids for job in company_jobs])
+            self._write(self.partition_key(company_path), table)
+            self.rows += len(company_jobs)
+
+    def _write(self, key: str, table):
+        buffer = io.BytesIO()
+        pq.write_table(
+            table,
+            buffer,
+            row_group_size=self.row_group_size,
+            compression=self.compression,
+            use_dictionary=DICTIONARY_COLUMNS,
+            write_statistics=True
+        )
+        data = buffer.getvalue()
+        if self.base_dir:
+            path = os.path.join(self.base_dir, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        else:
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=data,
+                                      ContentType='application/vnd.apache.parquet')
+        self.files.append(key)
+
+    def close(self, companies_processed: List[str] = None, extra: Optional[Dict] = None) -> Dict:
+        """返回写出统计（分区文件在 add() 时已经写完）"""
+        summary = {
+            'format': 'parquet',
+            'dt': self.scrape_date,
+            'rows': self.rows,
+            'files': len(self.files),
+            'prefix': self.prefix,
+            **(extra or {})
+        }
+        logger.info(f"Parquet输出完成: {self.rows} 行，{len(self.files)} 个分区文件")
+        return summary
+
+    def abort(self):
+        """分区文件各自独立且可以被下一次运行覆盖，这里无需清理"""
+        pass
@@ -0,0 +1,175 @@
+"""
+S3流式写入工具
+职位以gzip压缩的NDJSON格式边爬取边写入，缓冲区写满即作为multipart分段上传，内存占用与数据总量无关
+"""
+import json
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import logging
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+# S3 multipart 除最后一段外每段至少5MB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3NDJSONStreamWriter:
+    """gzip NDJSON 流式写入器
+
+    数据量小于一个分段时在 close() 时直接 put_object，否则使用 multipart upload。
+    """
+
+    def __init__(self, bucket_name: str, key: str, s3_client=None,
+                 part_size: int = 8 * 1024 * 1024, compresslevel: int = 6):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.s3_client = s3_client or boto3.client('s3')
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self._compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)  # 31 = gzip格式
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: List[Dict] = []
+        self.records = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.closed = False
+
+    def write(self, record: Dict):
+        """写入一条记录"""
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        self.records += 1
+        self.raw_bytes += len(line)
+        self._buffer += self._compressor.compress(line)
+        if len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer))
+            self._buffer.clear()
+
+    def write_many(self, records: Iterable[Dict]):
+        for record in records:
+            self.write(record)
+
+    def _upload_part(self, data: bytes):
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                ContentType='application/x-ndjson',
+                ContentEncoding='gzip'
+            )
+            self._upload_id = response['UploadId']
+
+        part_number = len(self._parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        self._parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+        self.compressed_bytes += len(data)
+
+    def close(self) -> Dict:
+        """写完剩余数据并完成上传，返回写入统计"""
+        if self.closed:
+            return self.summary()
+        self._buffer += self._compressor.flush()
+        data = bytes(self._buffer)
+        self._buffer.clear()
+
+        if self._upload_id is None:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                Body=data,
+                ContentType='application/x-ndjson',
+                ContentEncoding='gzip'
+            )
+            self.compressed_bytes += len(data)
+        else:
+            self._upload_part(data)
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={'Parts': self._parts}
+            )
+        self.closed = True
+        return self.summary()
+
+    def abort(self):
+        """放弃上传（出错时调用，避免遗留未完成的multipart分段）"""
+        if self._upload_id is not None and not self.closed:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, UploadId=self._upload_id
+            )
+        self.closed = True
+
+    def summary(self) -> Dict:
+        return {
+            'key': self.key,
+            'records': self.records,
+            'raw_bytes': self.raw_bytes,
+            'compressed_bytes': self.compressed_bytes,
+            'parts': max(len(self._parts), 1)
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class NDJSONSnapshotSink:
+    """快照流式输出：原始职位和澳大利亚职位分别写入gzip NDJSON，结束时写入清单（manifest）"""
+
+    def __init__(self, bucket_name: str, timestamp: str, s3_client=None, part_size: int = 8 * 1024 * 1024):
+        self.bucket_name = bucket_name
+        self.s3_client = s3_client or boto3.client('s3')
+        self.raw_key = f"raw_data/jobs_{timestamp}.ndjson.gz"
+        self.australian_key = f"australian_jobs/jobs_{timestamp}.ndjson.gz"
+        self.manifest_key = f"raw_data/jobs_{timestamp}.manifest.json"
+        self.raw_writer = S3NDJSONStreamWriter(bucket_name, self.raw_key, self.s3_client, part_size)
+        self.australian_writer = S3NDJSONStreamWriter(bucket_name, self.australian_key, self.s3_client, part_size)
+
+    @property
+    def total_jobs(self) -> int:
+        return self.raw_writer.records
+
+    def add(self, jobs: List[Dict], australian_jobs: List[Dict]):
+        """写入一家公司的职位"""
+        self.raw_writer.write_many(jobs)
+        self.australian_writer.write_many(australian_jobs)
+
+    def close(self, companies_processed: List[str], extra: Optional[Dict] = None) -> Dict:
+        """完成上传并写入清单，返回清单内容"""
+        raw = self.raw_writer.close()
+        australian = self.australian_writer.close()
+        manifest = {
+            'scraped_at': datetime.now().isoformat(),
+            'format': 'ndjson.gz',
+            'total_jobs': raw['records'],
+            'australian_jobs': australian['records'],
+            'companies_processed': companies_processed,
+            'files': {'raw': raw, 'australian': australian},
+            **(extra or {})
+        }
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=self.manifest_key,
+            Body=json.dumps(manifest, ensure_ascii=False, indent=2),
+            ContentType='application/json'
+        )
+        logger.info(f"快照已写入 s3://{self.bucket_name}/{self.raw_key}（{raw['records']} 条）")
+        return manifest
+
+    def abort(self):
+        self.raw_writer.abort()
+        self.australian_writer.abort()
@@ -8,12 +8,20 @@ import time
 from typing import List, Dict, Optional
 import logging
 
+from utils.lever_api import LeverPostingsClient
+from utils.job_extractor import JobPageExtractor, PARSED_VERSION
+from utils.keyword_matcher import AustralianClassifier
+
 logger = logging.getLogger(__name__)
 
 class LeverScraperUtils:
     """Lever网站爬虫工具类"""
     
-    def __init__(self):
+    def __init__(self, extractor_backend: str = 'html', cache=None):
+        # 提取后端: html（列表页+详情页解析）或 json（postings API）
+        self.extractor_backend = extractor_backend
+        # 可选的条件请求缓存（ConditionalRequestCache）
+        self.cache = cache
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -23,6 +31,9 @@ class LeverScraperUtils:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         })
+        self.postings_client = LeverPostingsClient(session=self.session)
+        self.extractor = JobPageExtractor()
+        self.classifier = AustralianClassifier()
     
     def get_company_list_from_api(self) -> List[str]:
         """从Lever API获取公司列表"""
@@ -71,84 +82,87 @@ class LeverScraperUtils:
     
     def get_jobs_from_company_page(self, company_slug: str) -> List[Dict]:
         """从公司页面获取职位列表"""
+        if self.extractor_backend == 'json':
+            return self.get_jobs_from_postings_api(company_slug)
+        
         jobs = []
         try:
             url = f"https://jobs.lever.co/{company_slug}"
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # 查找职位链接
-            job_links = soup.find_all('a', href=re.compile(r'/job/'))
             
-            for link in job_links:
-                job_url = link.get('href')
-                if job_url:
-                    if job_url.startswith('/'):
-                        job_url = f"https://jobs.lever.co{job_url}"
+            for job_url in self._get_parsed(url, self.parse_job_links, 'utils_job_links'):
+                job_data = self.extract_job_data(job_url)
+                if job_data:
+                    jobs.append(job_data)
                     
-                    job_data = self.extract_job_data(job_url)
-                    if job_data:
-                        jobs.append(job_data)
-                        
-                    # 添加延迟避免被限制
-                    time.sleep(0.5)
+                # 添加延迟避免被限制
+                time.sleep(0.5)
                     
         except Exception as e:
             logger.error(f"获取公司 {company_slug} 职位失败: {str(e)}")
             
         return jobs
     
+    def get_jobs_from_postings_api(self, company_slug: str) -> List[Dict]:
+        """通过postings JSON API获取公司职位列表（每家公司约一次请求）"""
+        try:
+            return self.postings_client.get_company_jobs(company_slug)
+        except Exception as e:
+            logger.error(f"通过API获取公司 {company_slug} 职位失败: {str(e)}")
+            return []
+    
+    def parse_job_links(self, html: bytes) -> List[str]:
+        """从公司页面解析职位链接"""
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # 查找职位链接
+        job_urls = []
+        for link in soup.find_all('a', href=re.compile(r'/job/')):
+            job_url = link.get('href')
+            if job_url:
+                if job_url.startswith('/'):
+                    job_url = f"https://jobs.lever.co{job_url}"
+                job_urls.append(job_url)
+        return job_urls
+    
     def extract_job_data(self, job_url: str) -> Optional[Dict]:
         """提取职位详细信息"""
         try:
-            response = self.session.get(job_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # 提取职位信息 - 根据Lever的实际HTML结构调整
-            job_title = self.extract_text(soup.find('h2', class_='posting-headline')) or \
-                       self.extract_text(soup.find('h1', class_='posting-headline')) or \
-                       self.extract_text(soup.find('h1'))
-            
-            company_name = self.extract_text(soup.find('a', class_='company-link')) or \
-                          self.extract_text(soup.find('div', class_='company-name'))
-            
-            location = self.extract_text(soup.find('div', class_='posting-categories')) or \
-                      self.extract_text(soup.find('div', class_='location'))
-            
-            # 提取职位描述
-            description_elements = soup.find_all('div', class_='section page-centered')
-            description = ""
-            for element in description_elements:
-                description += self.extract_text(element) + "\n"
-            
-            # 提取其他信息
-            department = self.extract_text(soup.find('div', class_='department'))
-            team = self.extract_text(soup.find('div', class_='team'))
-            
-            if not job_title or not company_name:
-                return None
-            
-            job_data = {
-                'job_title': job_title,
-                'company_name': company_name,
-                'location': location,
-                'department': department,
-                'team': team,
-                'description': description.strip(),
-                'job_url': job_url,
-                'scraped_at': time.time()
-            }
-            
+            job_data = self._get_parsed(job_url, lambda html: self.parse_job_data(html, job_url), 'utils_job_data')
+            if job_data:
+                # 缓存命中时解析结果来自之前的抓取，需要刷新抓取时间
+                job_data['scraped_at'] = time.time()
             return job_data
             
         except Exception as e:
             logger.error(f"提取职位数据失败 {job_url}: {str(e)}")
             return None
     
+    def parse_job_data(self, html: bytes, job_url: str) -> Optional[Dict]:
+        """从职位详情页解析职位信息"""
+        fields = self.extractor.extract(html)
+        
+        if not fields['job_title'] or not fields['company_name']:
+            return None
+        
+        return {
+            'job_title': fields['job_title'],
+            'company_name': fields['company_name'],
+            'location': fields['location'],
+            'department': fields['department'],
+            'team': fields['team'],
+            'description': fields['description'],
+            'job_url': job_url,
+            'scraped_at': time.time()
+        }
+    
+    def _get_parsed(self, url: str, parse, namespace: str):
+        """获取页面并解析，配置了缓存时使用条件请求"""
+        if self.cache is not None:
+            return self.cache.fetch(self.session, url, parse, namespace=namespace, timeout=30, version=PARSED_VERSION)
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        return parse(response.content)
+    
     def extract_text(self, element) -> str:
         """安全提取文本内容"""
         if element:
@@ -159,16 +173,5 @@ class LeverScraperUtils:
         """判断是否为澳洲职位"""
         if not job_data:
             return False
-            
-        text_to_check = f"{job_data.get('company_name', '')} {job_data.get('location', '')} {job_data.get('description', '')}".lower()
-        
-        australian_keywords = [
-            'australia', 'australian', 'sydney', 'melbourne', 'brisbane', 
-            'perth', 'adelaide', 'canberra', 'darwin', 'hobart',
-            'nsw', 'vic', 'qld', 'wa', 'sa', 'tas', 'nt', 'act',
-            'australia', 'australian', 'sydney', 'melbourne', 'brisbane', 
-            'perth', 'adelaide', 'canberra', 'darwin', 'hobart',
-            'nsw', 'vic', 'qld', 'wa', 'sa', 'tas', 'nt', 'act'
-        ]
         
-        return any(keyword in text_to_check for keyword in australian_keywords) 
\ No newline at end of file
+        return self.classifier.classify(job_data) is not None
@@ -0,0 +1,150 @@
+"""
+分片并行执行工具
+协调者将公司列表划分为多个分片，分发给并行的worker执行，每个worker写出自己的部分结果，最后合并
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+import logging
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+
+def partition_companies(companies: List[str], shard_count: int) -> List[List[str]]:
+    """将公司列表划分为分片（排序后轮询分配，结果稳定且各分片大小均衡）"""
+    ordered = sorted(set(companies))
+    shard_count = max(1, min(shard_count, len(ordered)))
+    return [ordered[i::shard_count] for i in range(shard_count)]
+
+
+def shard_partial_key(run_id: str, shard_id: int) -> str:
+    return f"partials/{run_id}/shard_{shard_id:04d}.json"
+
+
+def merge_claim_key(run_id: str) -> str:
+    return f"merge_claims/{run_id}.json"
+
+
+class LocalOutputStore:
+    """本地目录输出存储，键即相对路径"""
+
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+
+    def write_json(self, key: str, data):
+        path = os.path.join(self.base_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def read_json(self, key: str):
+        with open(os.path.join(self.base_dir, key), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def claim(self, key: str, data) -> bool:
+        """仅当键不存在时写入（排他创建），返回是否写入成功"""
+        path = os.path.join(self.base_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            with open(path, 'x', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        except FileExistsError:
+            return False
+        return True
+
+    def list_keys(self, prefix: str) -> List[str]:
+        directory = os.path.join(self.base_dir, prefix)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(prefix, name) for name in os.listdir(directory))
+
+    def describe(self, key: str) -> str:
+        return os.path.join(self.base_dir, key)
+
+
+class S3OutputStore:
+    """S3输出存储"""
+
+    def __init__(self, bucket_name: str, s3_client=None):
+        self.bucket_name = bucket_name
+        self.s3_client = s3_client or boto3.client('s3')
+
+    def write_json(self, key: str, data):
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=json.dumps(data, ensure_ascii=False, indent=2),
+            ContentType='application/json'
+        )
+
+    def read_json(self, key: str):
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        return json.loads(response['Body'].read().decode('utf-8'))
+
+    def claim(self, key: str, data) -> bool:
+        """仅当键不存在时写入（S3条件写入 If-None-Match: *），返回是否写入成功"""
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=json.dumps(data, ensure_ascii=False),
+                ContentType='application/json',
+                IfNoneMatch='*'
+            )
+        except self.s3_client.exceptions.ClientError as e:
+            if e.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                return False
+            raise
+        return True
+
+    def list_keys(self, prefix: str) -> List[str]:
+        keys = []
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            keys.extend(obj['Key'] for obj in page.get('Contents', []))
+        return sorted(keys)
+
+    def describe(self, key: str) -> str:
+        return f"s3://{self.bucket_name}/{key}"
+
+
+class LocalShardExecutor:
+    """本地进程池执行器 - 在单机上代替Lambda扇出，等待所有分片完成后返回结果
+
+    Lambda运行环境不支持多进程共享内存，此执行器仅用于本地运行和测试。
+    """
+
+    waits_for_results = True
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+
+    def run(self, worker: Callable[[Dict], Dict], shard_events: List[Dict]) -> List[Dict]:
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(worker, shard_events))
+
+
+class LambdaShardExecutor:
+    """Lambda扇出执行器 - 异步调用worker函数，不等待结果
+
+    由看到所有分片都已完成的worker负责合并，合并权通过 claim() 原子获取，只有一个worker会合并。
+    """
+
+    waits_for_results = False
+
+    def __init__(self, function_name: str, lambda_client=None):
+        self.function_name = function_name
+        self.lambda_client = lambda_client or boto3.client('lambda')
+
+    def run(self, worker: Callable[[Dict], Dict], shard_events: List[Dict]) -> List[Dict]:
+        for event in shard_events:
+            self.lambda_client.invoke(
+                FunctionName=self.function_name,
+                InvocationType='Event',
+                Payload=json.dumps(event).encode('utf-8')
+            )
+            logger.info(f"已分发分片 {event['shard_id']} ({len(event['companies'])} 家公司)")
+        return []
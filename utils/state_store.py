@@ -0,0 +1,203 @@
+"""
+增量爬取状态存储
+记录每个职位ID对应的列表项内容哈希和最后出现时间，以及每家公司最近一次写入的快照，只有新增或变化的职位才需要抓取详情页
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+_POSTING_ID_RE = re.compile(r'/job/([^/?#]+)')
+
+
+def extract_posting_id(job_url: str) -> str:
+    """从职位URL中提取职位ID（/job/<id>，否则取路径最后一段）"""
+    match = _POSTING_ID_RE.search(job_url or '')
+    if match:
+        return match.group(1)
+    return (job_url or '').split('?')[0].split('#')[0].rstrip('/').rsplit('/', 1)[-1]
+
+
+def content_hash(value) -> str:
+    """计算内容哈希（16位十六进制，足以区分同一职位的不同版本）"""
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class PostingStateStore:
+    """职位状态存储 - 保存在S3或本地的gzip压缩JSON
+
+    postings: {posting_id: [内容哈希, company_path, 最后出现时间戳]}
+    snapshots: {company_path: 最近一次包含该公司职位的快照key}
+    状态中不保存职位数据，未变化的职位从所属公司的快照中复用；部分运行（断点分段、分片、
+    公司数量上限）只更新本次列出的公司，其他公司仍指向各自之前的快照。
+    snapshot_key 仅用于读取旧版本状态（所有公司共用单个快照）。
+    """
+
+    def __init__(self, bucket_name: Optional[str] = None, key: str = 'state/postings.json.gz',
+                 path: Optional[str] = None, s3_client=None):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.path = path
+        self.s3_client = s3_client or (boto3.client('s3') if bucket_name else None)
+        self.postings: Dict[str, List] = {}
+        self.snapshots: Dict[str, str] = {}
+        self.snapshot_key: Optional[str] = None
+
+    def load(self):
+        """加载状态，不存在时从空状态开始"""
+        try:
+            if self.path:
+                with open(self.path, 'rb') as f:
+                    raw = f.read()
+            else:
+                response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.key)
+                raw = response['Body'].read()
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"未找到增量状态，从空状态开始: {str(e)}")
+            return
+
+        state = json.loads(gzip.decompress(raw).decode('utf-8'))
+        # 版本2的条目附带职位数据，只保留哈希和最后出现时间
+        self.postings = {posting_id: entry[:3] for posting_id, entry in state.get('postings', {}).items()}
+        self.snapshots = state.get('snapshots', {})
+        self.snapshot_key = state.get('snapshot_key')
+
+    def save(self):
+        """保存状态"""
+        raw = gzip.compress(json.dumps({
+            'version': 3,
+            'postings': self.postings,
+            'snapshots': self.snapshots,
+        }, separators=(',', ':')).encode('utf-8'))
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'wb') as f:
+                f.write(raw)
+        else:
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=self.key, Body=raw,
+                                      ContentType='application/json', ContentEncoding='gzip')
+
+    def get_hash(self, posting_id: str) -> Optional[str]:
+        entry = self.postings.get(posting_id)
+        return entry[0] if entry else None
+
+    def update(self, posting_id: str, entry_hash: str, company_path: str, seen_at: float):
+        self.postings[posting_id] = [entry_hash, company_path, seen_at]
+
+    def snapshot_keys(self, company_paths: List[str]) -> List[str]:
+        """返回这些公司的未变化职位所在的快照（去重，保持顺序）"""
+        keys = (self.snapshots.get(company_path, self.snapshot_key) for company_path in company_paths)
+        return list(dict.fromkeys(key for key in keys if key))
+
+    def set_snapshot(self, company_path: str, snapshot_key: str):
+        self.snapshots[company_path] = snapshot_key
+
+    def touch(self, posting_id: str, seen_at: float):
+        """职位仍在列表中但本次未能抓取详情：只更新最后出现时间，保留原有哈希"""
+        entry = self.postings.get(posting_id)
+        if entry:
+            entry[2] = seen_at
+
+    def remove(self, posting_id: str):
+        self.postings.pop(posting_id, None)
+
+
+class IncrementalRun:
+    """一次增量爬取的上下文 - 决定哪些职位需要抓取，并汇总新增/变化/删除的职位"""
+
+    def __init__(self, state: PostingStateStore, previous_jobs: Optional[Dict[str, Dict]] = None):
+        self.state = state
+        # 未变化的职位从所属公司的快照（previous_jobs）中复用，找不到时重新抓取详情
+        self.previous_jobs = previous_jobs or {}
+        self.started_at = time.time()
+        self.listed_companies = set()
+        self.listed = set()
+        self.seen = set()
+        self.added: List[Dict] = []
+        self.changed: List[Dict] = []
+        self.unchanged_count = 0
+
+    def plan(self, company_path: str, listing: List) -> Tuple[List[Dict], List]:
+        """根据公司列表页内容返回 (可直接复用的职位, 需要抓取详情的列表项)"""
+        self.listed_companies.add(company_path)
+        reused, pending = [], []
+        for job_url, entry_text in listing:
+            posting_id = extract_posting_id(job_url)
+            self.listed.add(posting_id)
+            previous = self.previous_jobs.get(posting_id)
+            if previous and self.state.get_hash(posting_id) == content_hash([job_url, entry_text]):
+                self._observe(posting_id, self.state.get_hash(posting_id), company_path)
+                reused.append(previous)
+            else:
+                pending.append((job_url, entry_text))
+        return reused, pending
+
+    def record(self, company_path: str, job_url: str, entry_text: str, job_data: Dict):
+        """记录抓取到详情的列表项"""
+        self._record_job(company_path, extract_posting_id(job_url), content_hash([job_url, entry_text]), job_data)
+
+    def record_listed_jobs(self, company_path: str, jobs: List[Dict]):
+        """记录一次性获取到的全部职位（JSON API后端），以职位内容本身计算哈希"""
+        self.listed_companies.add(company_path)
+        for job in jobs:
+            entry = {k: v for k, v in job.items() if k != 'scraped_at'}
+            self.listed.add(extract_posting_id(job.get('job_url', '')))
+            self._record_job(company_path, extract_posting_id(job.get('job_url', '')), content_hash(entry), job)
+
+    def _record_job(self, company_path: str, posting_id: str, entry_hash: str, job_data: Dict):
+        previous_hash = self.state.get_hash(posting_id)
+        if previous_hash is None:
+            self.added.append(job_data)
+        elif previous_hash != entry_hash:
+            self.changed.append(job_data)
+        self._observe(posting_id, entry_hash, company_path)
+
+    def _observe(self, posting_id: str, entry_hash: str, company_path: str):
+        if posting_id in self.seen:
+            return
+        if self.state.get_hash(posting_id) == entry_hash:
+            self.unchanged_count += 1
+        self.seen.add(posting_id)
+        self.state.update(posting_id, entry_hash, company_path, self.started_at)
+
+    def finish(self, snapshot_key: Optional[str] = None) -> Dict:
+        """结束本次爬取
+
+        本次成功列出的公司中，不在列表里的职位视为已删除；在列表中但详情抓取失败的职位
+        只更新最后出现时间，保留原有状态，下一次运行会重新抓取。
+        snapshot_key 为本次写出的快照，本次列出的公司之后从该快照复用未变化的职位。
+        """
+        if snapshot_key:
+            for company_path in self.listed_companies:
+                self.state.set_snapshot(company_path, snapshot_key)
+        removed = []
+        fetch_failed = 0
+        for posting_id, entry in list(self.state.postings.items()):
+            company_path = entry[1]
+            if company_path not in self.listed_companies or posting_id in self.seen:
+                continue
+            if posting_id in self.listed:
+                self.state.touch(posting_id, self.started_at)
+                fetch_failed += 1
+            else:
+                removed.append({'posting_id': posting_id, 'company_path': company_path})
+                self.state.remove(posting_id)
+
+        return {
+            'added': self.added,
+            'changed': self.changed,
+            'removed': removed,
+            'unchanged_count': self.unchanged_count,
+            'fetch_failed_count': fetch_failed
+        }